@@ -0,0 +1,2 @@
+""" Benchmarks, run with `python -m benchmarks.<name>` from the project root
+"""
@@ -0,0 +1,37 @@
+""" Synthetic catalogs for the benchmarks
+"""
+
+import json
+import random
+from typing import TextIO
+
+
+def write_catalog(fo: TextIO, albums: int, tracks_per_album: int = 12, artists: int = 0,
+                  seed: int = 1) -> int:
+    """ Write a sample_data.json style catalog
+    :param fo: Where to write the JSON
+    :param albums: Number of albums
+    :param tracks_per_album: Number of songs on each album
+    :param artists: Number of distinct artists, defaults to one per ten albums
+    :returns: The number of tracks written
+    """
+    rand = random.Random(seed)
+    artists = artists or max(albums // 10, 1)
+    fo.write('{"albums": [')
+    for index in range(albums):
+        if index:
+            fo.write(",")
+        album = {
+            "title": f"Album {index} {rand.randrange(1_000_000)}",
+            "artist": f"Artist {rand.randrange(artists)}",
+            "songs": [
+                {
+                    "title": f"Song {number} of album {index}",
+                    "duration": f"{rand.randrange(1, 12)}:{rand.randrange(60):02d}",
+                }
+                for number in range(tracks_per_album)
+            ],
+        }
+        json.dump(album, fo)
+    fo.write("]}")
+    return albums * tracks_per_album
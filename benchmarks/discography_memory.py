@@ -0,0 +1,45 @@
+""" Compare the memory used per track by the discography backends
+
+    python -m benchmarks.discography_memory [albums]
+"""
+
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from jukebox.discography import JsonDiscography
+from jukebox.discography.columnar import ColumnarDiscography
+from .catalog import write_catalog
+
+
+def measure(name: str, factory, tracks: int) -> None:
+    """ Report the memory retained by the discography `factory` builds
+    """
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    repo = factory()
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<10} {current / tracks:8.1f} bytes/track  "
+          f"peak {peak / 2**20:8.1f} MiB  load {elapsed:6.2f}s")
+    del repo
+
+
+def main() -> None:
+    albums = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "catalog.json")
+        with open(path, "w", encoding="utf-8") as fo:
+            tracks = write_catalog(fo, albums)
+        print(f"{albums} albums, {tracks} tracks, {os.path.getsize(path) / 2**20:.1f} MiB json")
+        measure("json", lambda: JsonDiscography(f"file://{path}", snapshot=False), tracks)
+        measure("columnar", lambda: ColumnarDiscography(f"mem://{path}"), tracks)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+""" Measure how long the directory discography takes to scan a library, on
+first scan with different numbers of workers and on rescans
+
+    python -m benchmarks.discography_scan [files]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import wave
+
+from jukebox.discography.directory import INDEX_NAME
+from jukebox.discography.directory import DirectoryDiscography
+
+TRACKS_PER_ALBUM = 10
+
+
+def write_library(root: str, files: int) -> None:
+    """ Write `files` short WAV files, ten to an album
+    """
+    for number in range(files):
+        album, track = divmod(number, TRACKS_PER_ALBUM)
+        album_dir = os.path.join(root, f"Artist {album % 97} - Album {album:06d}")
+        if track == 0:
+            os.mkdir(album_dir)
+        with wave.open(os.path.join(album_dir, f"{track + 1:02d} Track {number}.wav"), "wb") as fo:
+            fo.setnchannels(1)
+            fo.setsampwidth(1)
+            fo.setframerate(8000)
+            fo.writeframes(b"\x80" * 8000 * (1 + number % 5))
+
+
+def main() -> None:
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    with tempfile.TemporaryDirectory() as root:
+        write_library(root, files)
+        print(f"{files} files on {os.cpu_count()} cores")
+        url = f"dir://{root}"
+        cores = os.cpu_count() or 1
+        for workers in sorted({1, 2, 4, 8, cores} & set(range(1, cores + 1))):
+            index_path = os.path.join(root, INDEX_NAME)
+            if os.path.exists(index_path):
+                os.remove(index_path)
+            start = time.perf_counter()
+            # one worker reads the files in this process
+            DirectoryDiscography(url, workers=workers, parallel_after=1 if workers > 1 else files + 1)
+            elapsed = time.perf_counter() - start
+            print(f"first scan  {workers:3d} workers  {elapsed:7.2f}s  {files / elapsed:9.0f} files/s")
+
+        repo = DirectoryDiscography(url)
+        report = repo.rescan()
+        print(f"rescan  {report.probed:6d} changed  {report.seconds:7.2f}s")
+        for number in range(0, files, 100):
+            path = os.path.join(root, f"Artist {number // TRACKS_PER_ALBUM % 97} - "
+                                      f"Album {number // TRACKS_PER_ALBUM:06d}",
+                                f"{number % TRACKS_PER_ALBUM + 1:02d} Track {number}.wav")
+            stat = os.stat(path)
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        report = repo.rescan()
+        print(f"rescan  {report.probed:6d} changed  {report.seconds:7.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+""" Compare starting the JSON discography by parsing the catalog with
+starting it from a snapshot
+
+    python -m benchmarks.discography_startup [albums]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from jukebox.discography import JsonDiscography
+from jukebox.discography.snapshot import snapshot_path
+from .catalog import write_catalog
+
+
+def timed(name: str, factory, repeat: int = 3) -> None:
+    """ Report the best of `repeat` runs of `factory`
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        factory()
+        best = min(best, time.perf_counter() - start)
+    print(f"{name:<24} {best:7.3f}s")
+
+
+def main() -> None:
+    albums = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "catalog.json")
+        with open(path, "w", encoding="utf-8") as fo:
+            tracks = write_catalog(fo, albums)
+        url = f"file://{path}"
+        print(f"{albums} albums, {tracks} tracks, {os.path.getsize(path) / 2**20:.1f} MiB json")
+        timed("parse json", lambda: JsonDiscography(url, snapshot=False))
+        timed("parse and write snapshot", lambda: (
+            os.remove(snapshot_path(path)) if os.path.exists(snapshot_path(path)) else None,
+            JsonDiscography(url, snapshot=True),
+        ))
+        print(f"{'snapshot size':<24} {os.path.getsize(snapshot_path(path)) / 2**20:7.1f} MiB")
+        timed("load snapshot", lambda: JsonDiscography(url, snapshot=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+""" Measure the memory and CPU a `PlayerPool` uses as the number of
+jukeboxes playing at once grows
+
+Every jukebox has its own queue of short tracks and they all play for the
+same wall clock time, so the CPU used per track change should stay flat.
+
+    python -m benchmarks.player_pool [seconds]
+"""
+
+import random
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+
+from jukebox.player import PlayerPool
+from jukebox.queue import ListQueue
+from jukebox.service import Track
+
+
+class Finder:
+    """ Makes up a 1 to 3 second track for any id
+    """
+    def __init__(self, seed: int) -> None:
+        self.rand = random.Random(seed)
+
+    def get_track(self, track_id: str) -> Track:
+        return Track(track_id, "Track", "0:01", "file://01/01.mp4", self.rand.randint(1, 3))
+
+
+def run(players: int, seconds: float) -> None:
+    tracemalloc.start()
+    pool = PlayerPool()
+    pool.start()
+    queues = []
+    for number in range(players):
+        que = ListQueue()
+        pool.add(que, Finder(number)).start()
+        queues.append(que)
+    threads = threading.active_count()
+    start_cpu = time.process_time()
+    for que in queues:
+        que.enque_many(["01-01"] * 100)
+    time.sleep(seconds)
+    cpu = time.process_time() - start_cpu
+    played = sum(100 - len(que.queue) for que in queues)
+    memory = tracemalloc.get_traced_memory()[0]
+    pool.stop()
+    tracemalloc.stop()
+    print(f"{players:>6} players {threads:>2} threads {played:>7} tracks started"
+          f" {cpu / played * 1e6:7.1f} us cpu/track {memory / players:7.0f} bytes/player")
+
+
+def main() -> None:
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+    for players in (100, 1_000, 10_000):
+        run(players, seconds)
+    print(f"max rss {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+""" Measure how fast the subprocess player streams media into its sink, and
+how much CPU this process spends doing it
+
+Compares `os.sendfile` into the sink's pipe with copying through a buffer.
+
+    python -m benchmarks.player_proc [megabytes per track] [tracks]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from jukebox import queue
+from jukebox.player import SubprocessPlayer
+from jukebox.service import Track
+
+
+class Finder:
+    def __init__(self, tracks):
+        self.tracks = {track.track_id: track for track in tracks}
+
+    def get_track(self, track_id: str) -> Track:
+        return self.tracks[track_id]
+
+
+def main() -> None:
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    with tempfile.TemporaryDirectory() as root:
+        tracks = []
+        for n in range(1, count + 1):
+            path = os.path.join(root, f"{n:02d}.mp4")
+            with open(path, "wb") as fo:
+                fo.write(os.urandom(1 << 20) * megabytes)
+            tracks.append(Track(f"01-{n:02d}", "Track", "0:00", f"file://{n:02d}.mp4", 0))
+        finder = Finder(tracks)
+        for zero_copy in (True, False):
+            que = queue.ListQueue()
+            play = SubprocessPlayer(que, finder, "cat > /dev/null", media_root=root,
+                                    zero_copy=zero_copy)
+            play.start()
+            # start the sink before timing
+            que.enque("01-01")
+            while play.metrics.tracks < 1:
+                time.sleep(0.001)
+            cpu = time.process_time()
+            start = time.perf_counter()
+            que.enque_many([track.track_id for track in tracks])
+            while play.metrics.tracks < count + 1:
+                time.sleep(0.001)
+            elapsed = time.perf_counter() - start
+            cpu = time.process_time() - cpu
+            play.stop()
+            total = megabytes * count
+            print(f"{'sendfile' if zero_copy else 'buffered'}  {total / elapsed:8.0f} MB/s"
+                  f"  {cpu / total * 1e3:6.3f} ms cpu per MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+""" Measure the cost of queue operations as the queue grows, and the
+throughput of the durable log backed queue against the in memory one
+
+    python -m benchmarks.queue [max entries]
+"""
+
+import sys
+import tempfile
+import threading
+import time
+
+from jukebox.queue import ListQueue
+from jukebox.queue import WalQueue
+from jukebox.service import Page
+from jukebox.service.cursor import encode_cursor
+
+
+def per_op(limit: int) -> None:
+    que = ListQueue()
+    size = 1_000
+    while size <= limit:
+        while len(que.queue) < size:
+            que.enque("01-01")
+        runs = 10_000
+        start = time.perf_counter()
+        for _ in range(runs):
+            que.enque("01-01")
+            que.deque()
+        elapsed = (time.perf_counter() - start) / runs
+        print(f"{size:>9} entries {elapsed * 1e9:9.0f} ns/enque+deque")
+        size *= 10
+
+
+def snapshots(size: int) -> None:
+    que = ListQueue()
+    for _ in range(size):
+        que.enque("01-01")
+    pages = [
+        ("first", Page("", 15, False)),
+        ("middle", Page(encode_cursor(str(que.head + size // 2)), 15, False)),
+        ("last", Page("", 15, True)),
+    ]
+    for name, page in pages:
+        runs = 1_000
+        start = time.perf_counter()
+        for _ in range(runs):
+            que.snapshot(page)
+            que.position(que.head + size - 1)
+        elapsed = (time.perf_counter() - start) / runs
+        print(f"{name:<8} page of {size} entries {elapsed * 1e6:9.1f} us/snapshot+position")
+
+
+def throughput(name: str, que: ListQueue, threads: int, per_thread: int) -> None:
+    workers = [
+        threading.Thread(target=lambda: [que.enque("01-01") for _ in range(per_thread)])
+        for _ in range(threads)
+    ]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    line = f"{name:<8} {threads:>2} threads {threads * per_thread / elapsed:11.0f} enqueues/s"
+    if isinstance(que, WalQueue):
+        line += f"  {que.syncs} fsyncs"
+    print(line)
+
+
+def main() -> None:
+    limit = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    per_op(limit)
+    snapshots(limit)
+    for threads in (1, 8, 32):
+        per_thread = 4_000 // threads
+        throughput("memory", ListQueue(), threads, per_thread)
+        with tempfile.TemporaryDirectory() as tmp:
+            que = WalQueue(f"file://{tmp}/queue.log", compact_after=1_000_000)
+            throughput("wal", que, threads, per_thread)
+            que.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+""" Measure the latency of handing a track between processes through the
+shared memory queue
+
+Two processes bounce a track between a pair of queues, so each round trip is
+two cross-process enqueue/dequeue hand offs.
+
+    python -m benchmarks.queue_shm [round trips]
+"""
+
+import multiprocessing
+import os
+import statistics
+import sys
+import time
+
+from jukebox.queue import ShmQueue
+
+
+def echo(ping_url: str, pong_url: str, rounds: int, poll: float) -> None:
+    ping = ShmQueue(ping_url, poll=poll)
+    pong = ShmQueue(pong_url, poll=poll)
+    for _ in range(rounds):
+        pong.enque(ping.deque(timeout=None))
+    ping.close()
+    pong.close()
+
+
+def main() -> None:
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+    for poll in (0.001, 0.0001):
+        ping_url = f"shm://jukebox-bench-ping-{os.getpid()}"
+        pong_url = f"shm://jukebox-bench-pong-{os.getpid()}"
+        ping = ShmQueue(ping_url, max_size=16, poll=poll)
+        pong = ShmQueue(pong_url, max_size=16, poll=poll)
+        process = multiprocessing.get_context("spawn").Process(
+            target=echo, args=(ping_url, pong_url, rounds, poll)
+        )
+        process.start()
+        # let the echo process start up before timing
+        ping.enque("01-01")
+        pong.deque(timeout=None)
+        latencies = []
+        for _ in range(rounds - 1):
+            start = time.perf_counter()
+            ping.enque("01-01")
+            pong.deque(timeout=None)
+            latencies.append((time.perf_counter() - start) / 2)
+        process.join()
+        latencies.sort()
+        print(f"poll {poll * 1e6:6.0f} us  median {statistics.median(latencies) * 1e6:7.1f} us"
+              f"  p99 {latencies[int(len(latencies) * 0.99)] * 1e6:7.1f} us per hand off")
+        for que in (ping, pong):
+            que.unlink()
+            que.close()
+
+
+if __name__ == "__main__":
+    main()
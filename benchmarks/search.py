@@ -0,0 +1,53 @@
+""" Measure search latency over a large synthetic catalog
+
+    python -m benchmarks.search [tracks]
+"""
+
+import random
+import sys
+import time
+
+from jukebox.discography.search import SearchIndex
+from jukebox.service import Page
+
+WORDS = [f"word{n}" for n in range(50_000)]
+
+
+def main() -> None:
+    tracks = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rand = random.Random(1)
+    index = SearchIndex()
+    start = time.perf_counter()
+    for doc in range(tracks):
+        album, number = divmod(doc, 12)
+        index.add(
+            f"{album+1:02d}-{number+1:02d}",
+            " ".join(rand.choices(WORDS, k=3)),
+            f"album {album} {rand.choice(WORDS)}",
+            f"artist{album // 10}",
+        )
+    index.finish()
+    print(f"indexed {tracks} tracks in {time.perf_counter() - start:.1f}s")
+    index.search("warmup")
+
+    queries = [
+        ("rare word", "word12345"),
+        ("two words", f"{WORDS[7]} {WORDS[99]}"),
+        ("prefix", "word4999"),
+        ("artist", "artist777"),
+        ("common", "album"),
+    ]
+    # every result, then the first page of them as the service asks for it
+    for name, query in queries:
+        for page in (None, Page("", 15, False)):
+            runs = 200
+            start = time.perf_counter()
+            for _ in range(runs):
+                results = index.search(query, page)
+            elapsed = (time.perf_counter() - start) / runs
+            shown = "all" if page is None else f"{page.size:>3}"
+            print(f"{name:<10} {shown} {elapsed * 1e6:9.1f} us/query  {len(results)} results")
+
+
+if __name__ == "__main__":
+    main()
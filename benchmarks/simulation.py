@@ -0,0 +1,87 @@
+""" Simulate a day of jukebox traffic on a virtual clock
+
+Every jukebox has its own credits, queue and `Service`, and they share one
+discography and one `PlayerPool`.  Patrons turn up at random, pay and pick
+a few tracks, and the clock jumps straight to the next arrival or track
+change, so the run measures the Service, queue and player code rather than
+sleeping through the songs.  The same seed gives the same run.
+
+    python -m benchmarks.simulation [jukeboxes] [hours]
+"""
+
+import heapq
+import os
+import random
+import sys
+import tempfile
+import time
+
+from jukebox.credit import InMemory
+from jukebox.discography import JsonDiscography
+from jukebox.player import PlayerPool
+from jukebox.player import VirtualClock
+from jukebox.queue import ListQueue
+from jukebox.queue import QueueFullException
+from jukebox.service import Charge
+from jukebox.service import Service
+from .catalog import write_catalog
+
+# average seconds between patrons at each jukebox
+ARRIVAL = 900.0
+
+
+def main() -> None:
+    jukeboxes = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    hours = float(sys.argv[2]) if len(sys.argv) > 2 else 24.0
+    rand = random.Random(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "catalog.json")
+        with open(path, "w", encoding="utf-8") as fo:
+            write_catalog(fo, 1_000)
+        disc = JsonDiscography(f"file://{path}", snapshot=False)
+    track_ids = [track.track_id for album in disc.get_albums() for track in album.tracks]
+
+    clock = VirtualClock()
+    pool = PlayerPool(clock)
+    services = []
+    for _ in range(jukeboxes):
+        que = ListQueue(200)
+        play = pool.add(que, disc)
+        play.start()
+        services.append(Service(disc, que, play, InMemory()))
+    arrivals = [(rand.expovariate(1 / ARRIVAL), number) for number in range(jukeboxes)]
+    heapq.heapify(arrivals)
+
+    end = hours * 3600
+    patrons = selections = rejected = changes = 0
+    start = time.perf_counter()
+    while True:
+        deadline = pool.next_deadline()
+        now = min(arrivals[0][0], end if deadline is None else deadline)
+        if now >= end:
+            break
+        clock.advance(now - clock.monotonic())
+        changes += pool.run_pending()
+        while arrivals[0][0] <= now:
+            _, number = heapq.heappop(arrivals)
+            heapq.heappush(arrivals, (now + rand.expovariate(1 / ARRIVAL), number))
+            serv = services[number]
+            serv.add_balance(Charge(1, "usd"))
+            picks = rand.sample(track_ids, 3)
+            try:
+                serv.enqueue_tracks(picks)
+            except QueueFullException:
+                rejected += 1
+            else:
+                selections += len(picks)
+            serv.current_and_next_tracks()
+            patrons += 1
+    elapsed = time.perf_counter() - start
+    print(f"{jukeboxes} jukeboxes, {hours:g} virtual hours in {elapsed:.2f}s "
+          f"({end / elapsed:,.0f}x real time)")
+    print(f"{patrons} patrons, {selections} tracks queued, {rejected} turned away by a full queue, "
+          f"{changes} player changes, {(patrons + changes) / elapsed:,.0f} events/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -31,6 +31,8 @@ class Player:
     """
     # Identifies which service to use in order to play the audio
     url: str
+    # directory the tracks' relative media urls are resolved against
+    media_root: str = ""
 
 
 @dataclass
@@ -41,6 +43,13 @@ class Discography:
     # these two could be turned into a more generic Authentication object
     user_name: str
     secret: str
+    # number of results to cache in front of the backend, 0 disables caching
+    cache_size: int = 0
+    # seconds a cached result is kept
+    cache_ttl: float = 60.0
+    # save a snapshot of the built catalog next to the source, and start from
+    # it while the source is unchanged
+    snapshot: bool = False
 
 
 @dataclass
@@ -111,6 +120,12 @@ class Config:
                             self.discography.user_name = value
                         case "SECRET":
                             self.discography.secret = value
+                        case "CACHESIZE":
+                            self.discography.cache_size = int(value)
+                        case "CACHETTL":
+                            self.discography.cache_ttl = float(value)
+                        case "SNAPSHOT":
+                            self.discography.snapshot = value.lower() in ("1", "true", "yes")
                         case _:
                             LOGGER.error("unsupported configuration environment variable: %s", key)
                 case "QUEUE":
@@ -118,7 +133,7 @@ class Config:
                         case "URL":
                             self.queue.url = value
                         case "SIZE":
-                            self.queue.max_size = float(value)
+                            self.queue.max_size = int(value)
                         case _:
                             LOGGER.error("unsupported configuration environment variable: %s", key)
 
@@ -126,6 +141,8 @@ class Config:
                     match spl[2]:
                         case "URL":
                             self.player.url = value
+                        case "MEDIAROOT":
+                            self.player.media_root = value
                         case _:
                             LOGGER.error("unsupported configuration environment variable: %s", key)
                 # service level config
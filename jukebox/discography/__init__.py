@@ -1,42 +1,64 @@
 """ Repository of albums
 """
 
-import json
-import re
-from token import OP
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict
+from typing import Iterable
 from typing import List
 from typing import Optional
 from typing import Protocol
+from typing import Tuple
 
 from jukebox.service import Album
 from jukebox.service import Page
+from jukebox.service import PageResult
 from jukebox.service import Track
+from jukebox.service.cursor import InvalidCursorException
 from jukebox.config import Config
 from jukebox.config import ConfigurationException
+from .binary import BinaryDiscography
+from .cache import CachedDiscography
+from .columnar import ColumnarDiscography
+from .directory import DirectoryDiscography
+from .directory import ScanReport
+from .common import ALBUM_ID_REG
+from .common import TRACK_ID_REG
+from .common import CatalogDiscography
+from .common import album_key
+from .common import paginate
+from .common import parse_duration
+from .common import track_key
+from .common import track_url
 from .exception import InvalidAlbumIdException
+from .exception import InvalidDurationException
 from .exception import InvalidTrackIdException
 from .exception import NotFoundException
+from .search import LazySearchIndex
+from .snapshot import fingerprint
+from .snapshot import load_snapshot
+from .snapshot import paused_gc
+from .snapshot import write_snapshot
+from .sql import SqlDiscography
+from .stream import iter_albums
 
-
-ALBUM_ID_REG = re.compile(r"^\d\d+$")
-# NOTE: is it a safe assumption that an album won't have more than 99 tracks?
-TRACK_ID_REG = re.compile(r"^\d\d+-\d\d$")
+LOGGER = logging.getLogger(__name__)
 
 
 class Discography(Protocol):
     """ Interface contract for what a discography will provide
     """
-    def get_albums(self, page: Optional[Page]) -> List[Album]:
-        """ Retrieve a list of albums
-        TODO: Needs a cursor for pagination
+    def get_albums(self, page: Optional[Page] = None) -> PageResult[Album]:
+        """ Retrieve a page of albums
         :param page: pagination options
         :rtype page: Page
-        :returns: List of `Album`s
+        :returns: `Album`s, with the cursors of the neighbouring pages
         """
 
-    def get_album_tracks(self, album_id: str, page: Optional[Page]) -> List[Track]:
+    def get_album_tracks(self, album_id: str, page: Optional[Page] = None) -> PageResult[Track]:
         """ Get the tracks for a given album
-        TODO: Maybe add cursor for pagination??
         :param album_id: Album id
         :type album_id: str
         :param page: Pagination options
@@ -55,50 +77,206 @@ class Discography(Protocol):
         :raises NotFoundException: if the track was not found for the given id
         """
 
+    def get_tracks(self, track_ids: Iterable[str]) -> List[Track]:
+        """ Get several tracks by their ids in one lookup
+        :param track_ids: Ids of the tracks
+        :type track_ids: Iterable[str]
+        :returns: The `Track`s, in the order of `track_ids`
+        :raises InvalidTrackIdException: if a track_id is incorrectly formatted
+        :raises NotFoundException: if a track was not found for its id
+        """
+
+    def search(self, query: str, page: Optional[Page] = None) -> PageResult[Track]:
+        """ Find tracks by their name, album title or artist
+        :param query: Words to search for
+        :type query: str
+        :param page: Pagination options
+        :rtype page: Page
+        :returns: Ranked list of `Track`s
+        """
+
+
+@dataclass
+class ReloadReport:
+    """ What changed when a discography was reloaded
+    :param added: Ids of albums which are new
+    :param removed: Ids of albums which are gone
+    :param changed: Ids of albums whose details or tracks changed
+    :param seconds: How long building the new catalog took
+    :param old_tracks: Number of tracks in the catalog that was replaced
+    :param new_tracks: Number of tracks in the new catalog
+    :param overlap_tracks: Number of tracks held by both catalogs at the swap,
+        albums which didn't change are shared rather than copied
+    """
+    added: List[str]
+    removed: List[str]
+    changed: List[str]
+    seconds: float
+    old_tracks: int
+    new_tracks: int
+    overlap_tracks: int
 
-class JsonDiscography:
+
+class _Catalog:
+    """ Immutable snapshot of a loaded discography
+
+    Readers take a reference to the current snapshot and use only that, so a
+    reload swapping in a new one never blocks them or shows them a partially
+    built catalog.  The search index is built by the first search.
+    """
+    def __init__(self, albums: Dict[str, Album], search: Optional[tuple] = None) -> None:
+        self.albums: Dict[str, Album] = albums
+        # albums ordered by numeric id, built once so a page is just a slice
+        self.index: Tuple[Album, ...] = tuple(
+            sorted(albums.values(), key=lambda x: int(x.album_id))
+        )
+        self.search: LazySearchIndex = LazySearchIndex(lambda: self.index, search)
+        self.track_count: int = sum(len(album.tracks) for album in self.index)
+
+    def to_state(self) -> tuple:
+        """ The catalog as plain values which `marshal` can save
+        """
+        albums = tuple(
+            (album.album_id, album.artist, album.title, tuple(
+                (track.track_id, track.name, track.duration, track.url, track.seconds)
+                for track in album.tracks
+            ))
+            for album in self.index
+        )
+        return albums, self.search.to_state()
+
+    @classmethod
+    def from_state(cls, state: tuple) -> "_Catalog":
+        """ Rebuild a catalog saved with `to_state`
+        """
+        albums, search = state
+        return cls(
+            {album_id: Album(album_id, artist, title, [Track(*track) for track in tracks])
+             for album_id, artist, title, tracks in albums},
+            search,
+        )
+
+
+class JsonDiscography(CatalogDiscography[_Catalog]):
     """ Simple discography that reads from the sample JSON file
     :param url: Location of the discography
     :type url: str
+    :param snapshot: Start from a snapshot of the catalog saved next to the
+        file, if the file hasn't changed since, and save one if it has
+    :type snapshot: bool
     """
-    def __init__(self, url: str):
+    def __init__(self, url: str, snapshot: bool = False):
         self.url = url
+        self.snapshot: bool = snapshot
+        self._reload_lock = threading.Lock()
+        self._catalog: _Catalog = self._load_snapshot() if snapshot else self._load()
+
+    def _load_snapshot(self) -> _Catalog:
+        """ Load the catalog from its snapshot, building it and saving a new
+        snapshot if the JSON file changed
+        """
         file_path = self.url.replace("file://", "")
-        self._albums: dict[str,Album] = {}
-        # this all assumes a small json, obviously
+        with paused_gc():
+            state, built_from = load_snapshot(file_path)
+            if state is not None:
+                try:
+                    catalog = _Catalog.from_state(state)
+                except (TypeError, ValueError) as exc:
+                    LOGGER.warning("ignoring snapshot of %s with the wrong shape: %s",
+                                   file_path, exc)
+                else:
+                    LOGGER.debug("loaded %s from its snapshot", file_path)
+                    return catalog
+        if built_from is None:
+            built_from = fingerprint(file_path)
+        catalog = self._load()
+        write_snapshot(file_path, catalog.to_state(), built_from)
+        return catalog
+
+    def _load(self, previous: Optional[_Catalog] = None) -> _Catalog:
+        """ Build a catalog from the JSON file, reusing the albums of `previous`
+        which haven't changed
+        """
+        file_path = self.url.replace("file://", "")
+        albums: Dict[str, Album] = {}
+        # albums are parsed one record at a time, so the raw parse tree of the
+        # whole file is never held in memory
         with open(file_path, "r", encoding="utf-8") as fo:
-            albums = json.load(fo)["albums"]
-        for index, data in enumerate(albums):
-            album_id = f"{index+1:02d}"
-            tracks: List[Track] = []
-            for track_number, track_data in enumerate(data["songs"]):
-                track = Track(
-                    f"{album_id}-{track_number+1:02d}",
-                    track_data["title"],
-                    track_data["duration"],
-                    f"file://{album_id}/{track_number+1:02d}.mp4"
-                )
-                tracks.append(track)
-
-            self._albums[album_id] = Album(album_id, data["artist"], data["title"], tracks)
-
-    def get_albums(self, page: Optional[Page] = None) -> List[Album]:
+            for index, data in enumerate(iter_albums(fo)):
+                album = self._build_album(f"{index+1:02d}", data)
+                if previous is not None and previous.albums.get(album.album_id) == album:
+                    album = previous.albums[album.album_id]
+                albums[album.album_id] = album
+        return _Catalog(albums)
+
+    def reload(self) -> ReloadReport:
+        """ Rebuild the catalog from the JSON file and atomically swap it in
+
+        Readers carry on using the old catalog until the swap.  Albums which
+        haven't changed are shared between the old and new catalogs.
+        """
+        with self._reload_lock:
+            old = self._catalog
+            start = time.perf_counter()
+            new = self._load(old)
+            elapsed = time.perf_counter() - start
+            self._catalog = new
+        report = ReloadReport(
+            added=[album_id for album_id in new.albums if album_id not in old.albums],
+            removed=[album_id for album_id in old.albums if album_id not in new.albums],
+            changed=[
+                album_id for album_id, album in new.albums.items()
+                if album_id in old.albums and old.albums[album_id] is not album
+            ],
+            seconds=elapsed,
+            old_tracks=old.track_count,
+            new_tracks=new.track_count,
+            overlap_tracks=old.track_count + new.track_count - sum(
+                len(album.tracks) for album_id, album in new.albums.items()
+                if old.albums.get(album_id) is album
+            ),
+        )
+        LOGGER.info(
+            "reloaded %s in %.3fs: %d added, %d removed, %d changed, "
+            "%d tracks held during the swap",
+            self.url, report.seconds, len(report.added), len(report.removed),
+            len(report.changed), report.overlap_tracks,
+        )
+        return report
+
+    def reload_in_background(self) -> threading.Thread:
+        """ Run `reload` on a separate thread
+        :returns: The started thread
+        """
+        task = threading.Thread(target=self.reload, daemon=True)
+        task.start()
+        return task
+
+    @staticmethod
+    def _build_album(album_id: str, data: dict) -> Album:
+        """ Construct an `Album` and its `Track`s from a JSON album record
+        :raises InvalidDurationException: if a track duration is incorrectly formatted
+        """
+        tracks: List[Track] = []
+        for track_number, track_data in enumerate(data["songs"]):
+            track_id = f"{album_id}-{track_number+1:02d}"
+            track = Track(
+                track_id,
+                track_data["title"],
+                track_data["duration"],
+                track_url(album_id, track_number + 1),
+                parse_duration(track_data["duration"], track_id),
+            )
+            tracks.append(track)
+        return Album(album_id, data["artist"], data["title"], tracks)
+
+    def get_albums(self, page: Optional[Page] = None) -> PageResult[Album]:
         """ Retrieve a list of albums
-        TODO: Needs a cursor for pagination
         :returns: List of `Album`s
         """
-        albums = sorted(self._albums.values(), key=lambda x: int(x.album_id))
-        if page is not None:
-            start = 0
-            if page.cursor != "":
-                start = int(page.cursor)
-                if page.before:
-                    start = max(start - (page.size + 1), 0)
-            end = min(start + page.size, len(albums))
-            albums = albums[start:end]
-        return list(albums)
-
-    def get_album_tracks(self, album_id: str, page: Optional[Page] = None) -> List[Track]:
+        return paginate(self._catalog.index, page, album_key)
+
+    def get_album_tracks(self, album_id: str, page: Optional[Page] = None) -> PageResult[Track]:
         """ Returns the list of tracks contained in the album of 'album_id'
         :raises InvalidAlbumIdException: if the album_id is incorrectly formatted
         :raises NotFoundException: if the album was not found for the given album_id
@@ -106,32 +284,23 @@ class JsonDiscography:
         if ALBUM_ID_REG.match(album_id) is None:
             raise InvalidAlbumIdException(f"{album_id} is an invalid album id")
         try:
-            tracks = self._albums[album_id].tracks
+            tracks = self._catalog.albums[album_id].tracks
         except KeyError as exc:
             raise NotFoundException(f"{album_id} album not found") from exc
-        if page is not None:
-            start = 0
-            if page.cursor != "":
-                start = int(page.cursor)
-                if page.before:
-                    start = max(start - (page.size + 1), 0)
-            end = min(start + page.size, len(tracks))
-            tracks = tracks[start:end]
-        return tracks
+        return paginate(tracks, page, track_key)
 
-    def get_track(self, track_id: str) -> Track:
-        """ Get a specific track by its id
-        :raises InvalidTrackIdException: if the track_id is incorrectly formatted
-        :raises NotFoundException: if the track was not found for the given id
-        """
+    @staticmethod
+    def _find_track(catalog: _Catalog, track_id: str) -> Track:
         if TRACK_ID_REG.match(track_id) is None:
             raise InvalidTrackIdException(f"{track_id} is an invalid track id")
         spl = track_id.split("-")
         try:
-            album = self._albums[spl[0]]
+            album = catalog.albums[spl[0]]
         except KeyError as exc:
             raise NotFoundException(f"{track_id} album not found") from exc
         index = int(spl[1]) - 1
+        if index < 0:
+            raise NotFoundException(f"{track_id} track not found")
         try:
             track = album.tracks[index]
         except IndexError as exc:
@@ -139,15 +308,32 @@ class JsonDiscography:
         return track
 
 
+
 def from_config(conf: Config) -> Discography:
-    """ Constructs a Discography from the configuration options
+    """ Constructs a Discography from the configuration options, behind a
+    cache if one is configured
     """
+    disc = _from_url(conf)
+    if conf.discography.cache_size > 0:
+        return CachedDiscography(
+            disc, max_size=conf.discography.cache_size, ttl=conf.discography.cache_ttl
+        )
+    return disc
+
+
+def _from_url(conf: Config) -> Discography:
     url = conf.discography.url
     if url.startswith("file://"):
         if url.endswith(".json"):
-            return JsonDiscography(url)
-        # elif url.endswith(".sql"):
-        #     return SqlDiscography(url)
+            return JsonDiscography(url, snapshot=conf.discography.snapshot)
+        if url.endswith(".jbx"):
+            return BinaryDiscography(url)
+        if url.endswith(".sql") or url.endswith(".sqlite"):
+            return SqlDiscography(url)
+    if url.startswith("mem://") and url.endswith(".json"):
+        return ColumnarDiscography(url)
+    if url.startswith("dir://"):
+        return DirectoryDiscography(url)
     # elif src.startswith("postgres://"):
     #     return PostgresDiscography(
     #         url=url,
@@ -161,6 +347,10 @@ __all__ = (
     "Discography",
     "ConfigurationException",
     "InvalidAlbumIdException",
+    "InvalidCursorException",
+    "InvalidDurationException",
     "InvalidTrackIdException",
-    "NotFoundException"
+    "NotFoundException",
+    "ReloadReport",
+    "ScanReport",
 )
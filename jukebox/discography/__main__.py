@@ -0,0 +1,43 @@
+""" Discography maintenance tools
+
+    python -m jukebox.discography compile sample_data.json sample_data.jbx
+    python -m jukebox.discography import sample_data.json sample_data.sql
+"""
+
+import argparse
+import sys
+from typing import List
+from typing import Optional
+
+from .binary import compile_json
+from .sql import import_json
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """ Command line entry point
+    """
+    parser = argparse.ArgumentParser(prog="python -m jukebox.discography")
+    commands = parser.add_subparsers(dest="command", required=True)
+    compile_cmd = commands.add_parser(
+        "compile", help="Compile a JSON discography into a .jbx file"
+    )
+    compile_cmd.add_argument("source", help="JSON discography to compile")
+    compile_cmd.add_argument("destination", help="Path of the .jbx file to write")
+    import_cmd = commands.add_parser(
+        "import", help="Load a JSON discography into a sqlite database"
+    )
+    import_cmd.add_argument("source", help="JSON discography to import")
+    import_cmd.add_argument("destination", help="Path of the sqlite database to write")
+    args = parser.parse_args(argv)
+    match args.command:
+        case "compile":
+            albums, tracks = compile_json(args.source, args.destination)
+            print(f"wrote {albums} albums and {tracks} tracks to {args.destination}")
+        case "import":
+            albums, tracks = import_json(args.source, args.destination)
+            print(f"imported {albums} albums and {tracks} tracks into {args.destination}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+""" Compiled binary discography
+
+A `.jbx` file is laid out as::
+
+    header | string heap | album table | track table
+
+The album and track tables are fixed width, so any album or track can be found
+by its index without parsing the rest of the file.  Strings are utf-8 encoded
+in the heap and durations are stored as whole seconds.  The file is opened
+with mmap, so many processes can share one page cached copy, and `Album` and
+`Track` objects are only created when they are asked for.
+
+Compile a JSON catalog with::
+
+    python -m jukebox.discography compile sample_data.json sample_data.jbx
+"""
+
+import mmap
+import os
+import struct
+from typing import BinaryIO
+from typing import Dict
+from typing import Optional
+from typing import Tuple
+
+from jukebox.service import Album
+from jukebox.service import Page
+from jukebox.service import PageResult
+from jukebox.service import Track
+from .common import TableDiscography
+from .common import format_duration
+from .common import parse_duration
+from .common import track_url
+from .search import LazySearchIndex
+from .stream import iter_albums
+
+MAGIC = b"JBX1"
+VERSION = 1
+# magic, version, album count, track count, album table, track table, heap offsets
+HEADER = struct.Struct("<4sIIIQQQ")
+# artist offset, artist length, title offset, title length, first track, track count
+ALBUM = struct.Struct("<QIQIII")
+# name offset, name length, duration in seconds
+TRACK = struct.Struct("<QII")
+
+
+class BinaryDiscography(TableDiscography):
+    """ Discography backed by a memory mapped `.jbx` file
+    :param url: Location of the compiled discography
+    :type url: str
+    """
+    def __init__(self, url: str):
+        self.url = url
+        file_path = self.url.replace("file://", "")
+        with open(file_path, "rb") as fo:
+            self._map = mmap.mmap(fo.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, albums, tracks, album_off, track_off, _ = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{file_path} is not a version {VERSION} jbx file")
+        self._album_count: int = albums
+        self._track_count: int = tracks
+        self._album_off: int = album_off
+        self._track_off: int = track_off
+        self._search: LazySearchIndex = LazySearchIndex(self.get_albums)
+
+    def close(self) -> None:
+        """ Release the memory map
+        """
+        self._map.close()
+
+    def _string(self, offset: int, length: int) -> str:
+        return self._map[offset:offset + length].decode("utf-8")
+
+    def _album_entry(self, index: int) -> Tuple[int, int, int, int, int, int]:
+        return ALBUM.unpack_from(self._map, self._album_off + index * ALBUM.size)
+
+    def _track(self, album_id: str, first: int, number: int) -> Track:
+        name_off, name_len, seconds = TRACK.unpack_from(
+            self._map, self._track_off + (first + number - 1) * TRACK.size
+        )
+        return Track(
+            f"{album_id}-{number:02d}",
+            self._string(name_off, name_len),
+            format_duration(seconds),
+            track_url(album_id, number),
+            seconds,
+        )
+
+    def _album(self, index: int) -> Album:
+        artist_off, artist_len, title_off, title_len, first, count = self._album_entry(index)
+        album_id = f"{index+1:02d}"
+        tracks = [self._track(album_id, first, number) for number in range(1, count + 1)]
+        return Album(
+            album_id,
+            self._string(artist_off, artist_len),
+            self._string(title_off, title_len),
+            tracks,
+        )
+
+    def _album_total(self) -> int:
+        return self._album_count
+
+    def _album_tracks(self, index: int) -> Tuple[int, int]:
+        first, count = self._album_entry(index)[4:]
+        return first, count
+
+    def _search_ids(self, query: str, page: Optional[Page]) -> PageResult[str]:
+        return self._search.search(query, page)
+
+
+class _Heap:
+    """ Appends strings to the heap section of the output file
+    """
+    def __init__(self, fo: BinaryIO, offset: int) -> None:
+        self.fo = fo
+        self.offset = offset
+        self.interned: Dict[str, Tuple[int, int]] = {}
+
+    def add(self, value: str, intern: bool = False) -> Tuple[int, int]:
+        """ Write `value` and return its offset and length
+        """
+        if intern and value in self.interned:
+            return self.interned[value]
+        data = value.encode("utf-8")
+        entry = (self.offset, len(data))
+        self.fo.write(data)
+        self.offset += len(data)
+        if intern:
+            self.interned[value] = entry
+        return entry
+
+
+def compile_json(json_path: str, jbx_path: str) -> Tuple[int, int]:
+    """ Compile a JSON discography into a `.jbx` file
+
+    The JSON is streamed, and only the fixed width tables are kept in memory.
+    The output is written next to its destination and renamed into place.
+
+    :param json_path: The source JSON discography
+    :param jbx_path: Where to write the compiled discography
+    :returns: The number of albums and tracks written
+    :raises InvalidDurationException: if a duration is incorrectly formatted
+    """
+    albums = bytearray()
+    tracks = bytearray()
+    album_count = track_count = 0
+    tmp_path = f"{jbx_path}.tmp"
+    try:
+        with open(json_path, "r", encoding="utf-8") as src, open(tmp_path, "wb") as out:
+            out.write(bytes(HEADER.size))
+            heap = _Heap(out, HEADER.size)
+            for data in iter_albums(src):
+                first = track_count
+                for number, song in enumerate(data["songs"], 1):
+                    seconds = parse_duration(song["duration"], f"{album_count+1:02d}-{number:02d}")
+                    tracks += TRACK.pack(*heap.add(song["title"]), seconds)
+                    track_count += 1
+                artist = heap.add(data["artist"], intern=True)
+                title = heap.add(data["title"])
+                albums += ALBUM.pack(*artist, *title, first, track_count - first)
+                album_count += 1
+            album_off = heap.offset
+            track_off = album_off + len(albums)
+            out.write(albums)
+            out.write(tracks)
+            out.seek(0)
+            out.write(HEADER.pack(
+                MAGIC, VERSION, album_count, track_count, album_off, track_off, HEADER.size
+            ))
+            out.flush()
+            os.fsync(out.fileno())
+    except:
+        # the source may not have opened, in which case there's nothing to remove
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, jbx_path)
+    return album_count, track_count
+
+
+__all__ = (
+    "BinaryDiscography",
+    "compile_json",
+)
@@ -0,0 +1,317 @@
+""" Read-through cache in front of a discography backend
+
+Results are kept in a bounded LRU with a time to live.  Concurrent misses
+for the same key are coalesced so only one of them goes to the backend, the
+rest wait for its result.  A `NotFoundException` is cached too, for a
+shorter time, so repeated lookups of a missing track don't reach the backend.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from dataclasses import replace
+from functools import partial
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Hashable
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Protocol
+from typing import Tuple
+
+from jukebox.service import Album
+from jukebox.service import Page
+from jukebox.service import PageResult
+from jukebox.service import Track
+from .exception import NotFoundException
+
+
+class Backend(Protocol):
+    """ The discography being cached
+    """
+    def get_albums(self, page: Optional[Page] = None) -> PageResult[Album]:
+        """ Retrieve a list of albums
+        """
+
+    def get_album_tracks(self, album_id: str, page: Optional[Page] = None) -> PageResult[Track]:
+        """ Get the tracks for a given album
+        """
+
+    def get_track(self, track_id: str) -> Track:
+        """ Get a specific track by id
+        """
+
+    def get_tracks(self, track_ids: Iterable[str]) -> List[Track]:
+        """ Get several tracks by their ids
+        """
+
+    def search(self, query: str, page: Optional[Page] = None) -> PageResult[Track]:
+        """ Find tracks by their name, album title or artist
+        """
+
+
+@dataclass
+class CacheStats:
+    """ Counters for how the cache is being used
+    :param hits: Lookups answered from the cache
+    :param negative_hits: Hits which were a cached `NotFoundException`
+    :param misses: Lookups which had to go to the backend
+    :param coalesced: Misses which waited on another thread's backend call
+    :param evictions: Entries dropped to make room for new ones
+    """
+    hits: int = 0
+    negative_hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    evictions: int = 0
+
+
+class _Entry:
+    __slots__ = ("value", "error", "expires")
+
+    def __init__(self, value: Any, error: Optional[NotFoundException], expires: float) -> None:
+        self.value = value
+        self.error = error
+        self.expires = expires
+
+
+class _Flight:
+    """ A backend call other threads can wait on
+    """
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class CachedDiscography:
+    """ Discography which caches the results of another one
+
+    :param backend: The discography to cache
+    :type backend: Backend
+    :param max_size: Maximum number of cached results
+    :type max_size: int
+    :param ttl: Seconds a result is cached for
+    :type ttl: float
+    :param negative_ttl: Seconds a `NotFoundException` is cached for
+    :type negative_ttl: float
+    :param clock: Source of the current time in seconds
+    """
+    def __init__(self, backend: Backend, max_size: int = 1024, ttl: float = 60.0,
+                 negative_ttl: float = 5.0, clock: Callable[[], float] = time.monotonic) -> None:
+        self.backend: Backend = backend
+        self.max_size: int = max_size
+        self.ttl: float = ttl
+        self.negative_ttl: float = negative_ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._stats = CacheStats()
+
+    @property
+    def stats(self) -> CacheStats:
+        """ A copy of the current counters
+        """
+        with self._lock:
+            return replace(self._stats)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def clear(self) -> None:
+        """ Drop every cached result
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def _lookup(self, key: Hashable, now: float) -> Optional[_Entry]:
+        """ Return the live entry for `key`, must be called holding the lock
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires <= now:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        self._stats.hits += 1
+        if entry.error is not None:
+            self._stats.negative_hits += 1
+        return entry
+
+    def _store(self, key: Hashable, entry: _Entry) -> None:
+        """ Cache an entry, evicting the least recently used, must be called
+        holding the lock
+        """
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self._stats.evictions += 1
+
+    @staticmethod
+    def _result(entry: _Entry) -> Any:
+        if entry.error is not None:
+            raise NotFoundException(entry.error.message)
+        return entry.value
+
+    def _claim(self, key: Hashable, now: float) -> Tuple[Optional[_Entry], Optional[_Flight], bool]:
+        """ Find the cached entry for `key`, or the flight loading it, starting
+        a new flight if there isn't one, must be called holding the lock
+        :returns: The entry, or the flight along with whether this caller
+            started it and so has to load it
+        """
+        entry = self._lookup(key, now)
+        if entry is not None:
+            return entry, None, False
+        flight = self._flights.get(key)
+        if flight is not None:
+            self._stats.coalesced += 1
+            return None, flight, False
+        flight = self._flights[key] = _Flight()
+        self._stats.misses += 1
+        return None, flight, True
+
+    def _land(self, key: Hashable, flight: _Flight, value: Any = None,
+              error: Optional[BaseException] = None) -> None:
+        """ Cache the result of a flight and release the threads waiting on it.
+        A `NotFoundException` is cached for `negative_ttl`, other failures are
+        likely transient so they aren't cached.
+        """
+        flight.value = value
+        flight.error = error
+        with self._lock:
+            if error is None:
+                self._store(key, _Entry(value, None, self._clock() + self.ttl))
+            elif isinstance(error, NotFoundException):
+                self._store(key, _Entry(None, error, self._clock() + self.negative_ttl))
+            del self._flights[key]
+        flight.done.set()
+
+    def _fly(self, key: Hashable, flight: _Flight, load: Callable[[], Any]) -> None:
+        """ Load the result of a flight this thread started
+        """
+        try:
+            value = load()
+        except BaseException as exc:
+            self._land(key, flight, error=exc)
+            if not isinstance(exc, Exception):
+                raise
+        else:
+            self._land(key, flight, value)
+
+    @staticmethod
+    def _await(flight: _Flight) -> Any:
+        """ Wait for a flight to land and return its result
+        """
+        flight.done.wait()
+        if isinstance(flight.error, NotFoundException):
+            raise NotFoundException(flight.error.message)
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    def _get(self, key: Hashable, load: Callable[[], Any]) -> Any:
+        """ Return the cached result for `key`, calling `load` on a miss unless
+        another thread is already loading it
+        """
+        with self._lock:
+            entry, flight, leader = self._claim(key, self._clock())
+        if entry is not None:
+            return self._result(entry)
+        assert flight is not None
+        if leader:
+            self._fly(key, flight, load)
+        return self._await(flight)
+
+    @staticmethod
+    def _page_key(page: Optional[Page]) -> Hashable:
+        return None if page is None else (page.cursor, page.size, page.before)
+
+    def get_albums(self, page: Optional[Page] = None) -> PageResult[Album]:
+        """ Retrieve a list of albums
+        :returns: List of `Album`s
+        """
+        key = ("albums", self._page_key(page))
+        return self._get(key, lambda: self.backend.get_albums(page)).copy()
+
+    def get_album_tracks(self, album_id: str, page: Optional[Page] = None) -> PageResult[Track]:
+        """ Returns the list of tracks contained in the album of 'album_id'
+        :raises InvalidAlbumIdException: if the album_id is incorrectly formatted
+        :raises NotFoundException: if the album was not found for the given album_id
+        """
+        key = ("album_tracks", album_id, self._page_key(page))
+        return self._get(key, lambda: self.backend.get_album_tracks(album_id, page)).copy()
+
+    def get_track(self, track_id: str) -> Track:
+        """ Get a specific track by its id
+        :raises InvalidTrackIdException: if the track_id is incorrectly formatted
+        :raises NotFoundException: if the track was not found for the given id
+        """
+        return self._get(("track", track_id), lambda: self.backend.get_track(track_id))
+
+    def get_tracks(self, track_ids: Iterable[str]) -> List[Track]:
+        """ Get several tracks by their ids, in the order given.  The tracks
+        which aren't cached, or being loaded by another thread, are fetched
+        from the backend in one batch.
+        :raises InvalidTrackIdException: if a track_id is incorrectly formatted
+        :raises NotFoundException: if a track was not found for its id
+        """
+        ids = list(track_ids)
+        entries: Dict[str, _Entry] = {}
+        flights: Dict[str, _Flight] = {}
+        led: Dict[str, _Flight] = {}
+        with self._lock:
+            now = self._clock()
+            for track_id in dict.fromkeys(ids):
+                entry, flight, leader = self._claim(("track", track_id), now)
+                if entry is not None:
+                    entries[track_id] = entry
+                    continue
+                assert flight is not None
+                flights[track_id] = flight
+                if leader:
+                    led[track_id] = flight
+        if led:
+            self._fly_tracks(led)
+        return [
+            self._result(entries[track_id]) if track_id in entries
+            else self._await(flights[track_id])
+            for track_id in ids
+        ]
+
+    def _fly_tracks(self, led: Dict[str, _Flight]) -> None:
+        """ Load the tracks of the flights this thread started in one batch
+        """
+        try:
+            tracks = self.backend.get_tracks(list(led))
+        except Exception:
+            # the batch doesn't say which track failed, so find out one by one
+            for track_id, flight in led.items():
+                self._fly(("track", track_id), flight, partial(self.backend.get_track, track_id))
+        except BaseException as exc:
+            for track_id, flight in led.items():
+                self._land(("track", track_id), flight, error=exc)
+            raise
+        else:
+            for (track_id, flight), track in zip(led.items(), tracks):
+                self._land(("track", track_id), flight, track)
+
+    def search(self, query: str, page: Optional[Page] = None) -> PageResult[Track]:
+        """ Find tracks by their name, album title or artist.  Queries are too
+        varied to be worth caching, so this goes straight to the backend.
+        """
+        return self.backend.search(query, page)
+
+
+__all__ = (
+    "CacheStats",
+    "CachedDiscography",
+)
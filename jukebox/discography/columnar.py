@@ -0,0 +1,115 @@
+""" Column oriented, in memory discography
+
+Rather than one `Track` object per song, each field is kept in its own
+compact column:
+
+* track names are utf-8 encoded into one heap, addressed by an offset column
+* durations are an array of whole seconds
+* artists are interned into a table and albums keep an index into it
+* track ids and urls are derived from the album and track numbers
+
+`Track` and `Album` objects are only created for the items a caller asks
+for, and since they are slotted they don't carry a `__dict__` either.
+"""
+
+from array import array
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from jukebox.service import Album
+from jukebox.service import Page
+from jukebox.service import PageResult
+from jukebox.service import Track
+from .common import TableDiscography
+from .common import format_duration
+from .common import parse_duration
+from .common import track_url
+from .search import SearchIndex
+from .stream import iter_albums
+
+
+class ColumnarDiscography(TableDiscography):
+    """ Discography which loads the sample JSON format into array backed columns
+    :param url: Location of the discography, `mem://path/to/catalog.json`
+    :type url: str
+    """
+    def __init__(self, url: str):
+        self.url = url
+        file_path = self.url.replace("mem://", "")
+        self._artists: List[str] = []
+        self._artist_ids: Dict[str, int] = {}
+        self._album_artist: array = array("I")
+        self._album_titles: List[str] = []
+        # index of each album's first track, with a trailing sentinel
+        self._album_first: array = array("I", [0])
+        self._name_heap: bytearray = bytearray()
+        # offset of each track name in the heap, with a trailing sentinel
+        self._name_offsets: array = array("Q", [0])
+        self._seconds: array = array("I")
+        self._search: SearchIndex = SearchIndex()
+        with open(file_path, "r", encoding="utf-8") as fo:
+            for data in iter_albums(fo):
+                self._add_album(data)
+        self._search.finish()
+
+    def _add_album(self, data: dict) -> None:
+        artist = data["artist"]
+        artist_id = self._artist_ids.get(artist)
+        if artist_id is None:
+            artist_id = self._artist_ids[artist] = len(self._artists)
+            self._artists.append(artist)
+        self._album_artist.append(artist_id)
+        self._album_titles.append(data["title"])
+        album_id = f"{len(self._album_titles):02d}"
+        for number, song in enumerate(data["songs"], 1):
+            track_id = f"{album_id}-{number:02d}"
+            self._seconds.append(parse_duration(song["duration"], track_id))
+            self._search.add(track_id, song["title"], data["title"], artist)
+            self._name_heap += song["title"].encode("utf-8")
+            self._name_offsets.append(len(self._name_heap))
+        self._album_first.append(len(self._seconds))
+
+    @property
+    def track_count(self) -> int:
+        """ Total number of tracks in the store
+        """
+        return len(self._seconds)
+
+    def _track(self, album_id: str, first: int, number: int) -> Track:
+        index = first + number - 1
+        start, end = self._name_offsets[index], self._name_offsets[index + 1]
+        seconds = self._seconds[index]
+        return Track(
+            f"{album_id}-{number:02d}",
+            self._name_heap[start:end].decode("utf-8"),
+            format_duration(seconds),
+            track_url(album_id, number),
+            seconds,
+        )
+
+    def _album(self, index: int) -> Album:
+        album_id = f"{index+1:02d}"
+        first, count = self._album_tracks(index)
+        return Album(
+            album_id,
+            self._artists[self._album_artist[index]],
+            self._album_titles[index],
+            [self._track(album_id, first, number) for number in range(1, count + 1)],
+        )
+
+    def _album_total(self) -> int:
+        return len(self._album_titles)
+
+    def _album_tracks(self, index: int) -> Tuple[int, int]:
+        first = self._album_first[index]
+        return first, self._album_first[index + 1] - first
+
+    def _search_ids(self, query: str, page: Optional[Page]) -> PageResult[str]:
+        return self._search.search(query, page)
+
+
+__all__ = (
+    "ColumnarDiscography",
+)
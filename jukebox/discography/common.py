@@ -0,0 +1,290 @@
+""" Helpers shared by the discography backends
+"""
+
+import re
+from typing import Callable
+from typing import Generic
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Protocol
+from typing import Sequence
+from typing import Tuple
+from typing import TypeVar
+
+from jukebox.service import Album
+from jukebox.service import Page
+from jukebox.service import PageResult
+from jukebox.service import Track
+from jukebox.service.cursor import decode_cursor
+from jukebox.service.cursor import encode_cursor
+from .exception import InvalidAlbumIdException
+from .exception import InvalidDurationException
+from .exception import InvalidTrackIdException
+from .exception import NotFoundException
+
+
+ALBUM_ID_REG = re.compile(r"^\d\d+$")
+# NOTE: is it a safe assumption that an album won't have more than 99 tracks?
+TRACK_ID_REG = re.compile(r"^\d\d+-\d\d$")
+DURATION_REG = re.compile(r"^(?:(\d+):)?(\d+):([0-5]\d)$")
+
+T = TypeVar("T")
+
+
+def page_window(page: Optional[Page], total: int) -> Tuple[int, int]:
+    """ Work out the [start, end) slice of a collection for a page.  Pages
+    after a cursor start with the item following it, pages before a cursor
+    end with the item preceding it.  A page before an empty cursor is the
+    last page.  Album and track ids are numbered by their position, so the
+    number a cursor holds is also where its item is in the collection.
+    :param page: pagination options
+    :type page: Page
+    :param total: Number of items in the collection
+    :type total: int
+    :returns: start and end indexes
+    :raises InvalidCursorException: if the page's cursor is invalid
+    """
+    if page is None:
+        return 0, total
+    size = max(page.size, 0)
+    if page.before:
+        end = total if page.cursor == "" else min(decode_cursor(page.cursor) - 1, total)
+        return max(end - size, 0), max(end, 0)
+    start = 0 if page.cursor == "" else min(decode_cursor(page.cursor), total)
+    return start, min(start + size, total)
+
+
+def page_result(items: List[T], start: int, end: int, total: int,
+                key: Optional[Callable[[T], str]] = None) -> PageResult[T]:
+    """ Wrap the items of a window with the cursors of its neighbouring pages
+    :param items: The items from `start` to `end`
+    :param total: Number of items in the collection
+    :param key: Returns an item's id, without one the item's position is used
+    """
+    def cursor(index: int) -> str:
+        return encode_cursor(key(items[index - start]) if key else str(index + 1))
+
+    if not items:
+        return PageResult(items)
+    return PageResult(
+        items,
+        next_cursor=cursor(end - 1) if end < total else "",
+        prev_cursor=cursor(start) if start > 0 else "",
+    )
+
+
+def paginate(items: Sequence[T], page: Optional[Page],
+             key: Optional[Callable[[T], str]] = None) -> PageResult[T]:
+    """ Copy only the window of `items` the page asks for
+    """
+    start, end = page_window(page, len(items))
+    return page_result(list(items[start:end]), start, end, len(items), key)
+
+
+def album_key(album: Album) -> str:
+    """ Cursor key of an album
+    """
+    return album.album_id
+
+
+def track_key(track: Track) -> str:
+    """ Cursor key of a track
+    """
+    return track.track_id
+
+
+def parse_duration(duration: str, track_id: str = "") -> int:
+    """ Convert a "m:ss" or "h:mm:ss" duration into whole seconds
+    :param duration: The formatted duration
+    :param track_id: Id of the track the duration belongs to, for the error message
+    :raises InvalidDurationException: if the duration is incorrectly formatted
+    """
+    match = DURATION_REG.match(duration)
+    if match is None:
+        prefix = f"{track_id} has " if track_id else ""
+        raise InvalidDurationException(f"{prefix}{duration!r} is an invalid duration")
+    hours, minutes, seconds = match.groups()
+    return (int(hours or 0) * 60 + int(minutes)) * 60 + int(seconds)
+
+
+def format_duration(seconds: int) -> str:
+    """ Convert whole seconds into the "m:ss" format used by `Track.duration`
+    """
+    minutes, seconds = divmod(seconds, 60)
+    if minutes >= 60:
+        hours, minutes = divmod(minutes, 60)
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
+
+
+def track_url(album_id: str, track_number: int) -> str:
+    """ Location of the media for a track
+    """
+    return f"file://{album_id}/{track_number:02d}.mp4"
+
+
+class TableDiscography:
+    """ Lookups for backends which keep their albums and tracks in tables in
+    catalog order, so an id is turned straight into a table index.  Each
+    album's tracks are a contiguous run of the track table.
+
+    Subclasses read the tables by providing `_album_total`, `_album`,
+    `_album_tracks`, `_track` and `_search_ids`.
+    """
+    def _album_total(self) -> int:
+        """ Number of albums in the album table
+        """
+        raise NotImplementedError
+
+    def _album(self, index: int) -> Album:
+        """ Build the album at `index` in the album table, with its tracks
+        """
+        raise NotImplementedError
+
+    def _album_tracks(self, index: int) -> Tuple[int, int]:
+        """ Where the tracks of the album at `index` are in the track table
+        :returns: The index of its first track and its number of tracks
+        """
+        raise NotImplementedError
+
+    def _track(self, album_id: str, first: int, number: int) -> Track:
+        """ Build a track of an album
+        :param first: Index of the album's first track in the track table
+        :param number: The track's number within the album, from 1
+        """
+        raise NotImplementedError
+
+    def _search_ids(self, query: str, page: Optional[Page]) -> PageResult[str]:
+        """ Ids of the tracks matching a query, best match first, just those
+        on the page
+        """
+        raise NotImplementedError
+
+    def _album_index(self, album_id: str) -> Optional[int]:
+        index = int(album_id) - 1
+        if f"{index+1:02d}" != album_id or not 0 <= index < self._album_total():
+            return None
+        return index
+
+    def get_albums(self, page: Optional[Page] = None) -> PageResult[Album]:
+        """ Retrieve a list of albums
+        :returns: List of `Album`s
+        """
+        total = self._album_total()
+        start, end = page_window(page, total)
+        albums = [self._album(index) for index in range(start, end)]
+        return page_result(albums, start, end, total, album_key)
+
+    def get_album_tracks(self, album_id: str, page: Optional[Page] = None) -> PageResult[Track]:
+        """ Returns the list of tracks contained in the album of 'album_id'
+        :raises InvalidAlbumIdException: if the album_id is incorrectly formatted
+        :raises NotFoundException: if the album was not found for the given album_id
+        """
+        if ALBUM_ID_REG.match(album_id) is None:
+            raise InvalidAlbumIdException(f"{album_id} is an invalid album id")
+        index = self._album_index(album_id)
+        if index is None:
+            raise NotFoundException(f"{album_id} album not found")
+        first, count = self._album_tracks(index)
+        start, end = page_window(page, count)
+        tracks = [self._track(album_id, first, number) for number in range(start + 1, end + 1)]
+        return page_result(tracks, start, end, count, track_key)
+
+    def get_track(self, track_id: str) -> Track:
+        """ Get a specific track by its id
+        :raises InvalidTrackIdException: if the track_id is incorrectly formatted
+        :raises NotFoundException: if the track was not found for the given id
+        """
+        if TRACK_ID_REG.match(track_id) is None:
+            raise InvalidTrackIdException(f"{track_id} is an invalid track id")
+        album_id, track_number = track_id.split("-")
+        index = self._album_index(album_id)
+        if index is None:
+            raise NotFoundException(f"{track_id} album not found")
+        first, count = self._album_tracks(index)
+        number = int(track_number)
+        if not 1 <= number <= count:
+            raise NotFoundException(f"{track_id} track not found")
+        return self._track(album_id, first, number)
+
+    def get_tracks(self, track_ids: Iterable[str]) -> List[Track]:
+        """ Get several tracks by their ids, in the order given
+        :raises InvalidTrackIdException: if a track_id is incorrectly formatted
+        :raises NotFoundException: if a track was not found for its id
+        """
+        return [self.get_track(track_id) for track_id in track_ids]
+
+    def search(self, query: str, page: Optional[Page] = None) -> PageResult[Track]:
+        """ Find tracks by their name, album title or artist
+        :param query: Words to search for
+        :param page: Pagination options
+        :returns: Ranked list of `Track`s
+        """
+        track_ids = self._search_ids(query, page)
+        return track_ids.with_items(self.get_tracks(track_ids))
+
+
+class TrackSearch(Protocol):
+    """ Index finding tracks by their name, album title or artist
+    """
+    def search(self, query: str, page: Optional[Page] = None) -> PageResult[str]:
+        """ Ids of the tracks matching a query, best match first, just those
+        on the page
+        """
+
+
+class Catalog(Protocol):
+    """ A whole catalog held in memory
+    """
+    @property
+    def search(self) -> TrackSearch:
+        """ Index of the catalog's tracks
+        """
+
+
+C = TypeVar("C", bound=Catalog)
+
+
+class CatalogDiscography(Generic[C]):
+    """ Lookups for backends which build their whole catalog in memory and
+    swap a new one in at once.  Each call reads the catalog once, so a call
+    running across a swap still sees just one of them.
+
+    Subclasses keep the current catalog in `_catalog` and look tracks up in
+    it by providing `_find_track`.
+    """
+    _catalog: C
+
+    @staticmethod
+    def _find_track(catalog: C, track_id: str) -> Track:
+        """ Look a track up in a catalog
+        :raises InvalidTrackIdException: if the track_id is incorrectly formatted
+        :raises NotFoundException: if the track was not found for the given id
+        """
+        raise NotImplementedError
+
+    def get_track(self, track_id: str) -> Track:
+        """ Get a specific track by its id
+        :raises InvalidTrackIdException: if the track_id is incorrectly formatted
+        :raises NotFoundException: if the track was not found for the given id
+        """
+        return self._find_track(self._catalog, track_id)
+
+    def get_tracks(self, track_ids: Iterable[str]) -> List[Track]:
+        """ Get several tracks by their ids, all from the same catalog
+        :raises InvalidTrackIdException: if a track_id is incorrectly formatted
+        :raises NotFoundException: if a track was not found for its id
+        """
+        catalog = self._catalog
+        return [self._find_track(catalog, track_id) for track_id in track_ids]
+
+    def search(self, query: str, page: Optional[Page] = None) -> PageResult[Track]:
+        """ Find tracks by their name, album title or artist
+        :param query: Words to search for
+        :param page: Pagination options
+        :returns: Ranked list of `Track`s
+        """
+        catalog = self._catalog
+        track_ids = catalog.search.search(query, page)
+        return track_ids.with_items(self._find_track(catalog, track_id) for track_id in track_ids)
@@ -0,0 +1,332 @@
+""" Discography built by scanning a directory of audio files
+
+The library is laid out one directory per album::
+
+    <root>/<artist> - <album title>/<track number> <track name>.wav
+
+Artists, titles and names come from the file names, and durations are read
+from the files' headers by `jukebox.discography.media`.
+
+Reading files is the slow part of a scan, so it's spread over a process pool.
+What was read is saved to a scan index, `.jukebox-scan.json` in the root,
+keyed by each file's path, modification time and size, so a rescan only
+reads the files which changed since the last one.
+
+The index also keeps the number given to each album directory and track file,
+so ids stay the same as the library changes.  On the first scan albums are
+numbered in the order of their directory names and tracks in the order of
+their track numbers.  Albums and tracks added later get the next unused
+number, and the numbers of removed ones aren't given out again, so a track
+id saved in a queue never comes to mean a different track.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from bisect import bisect_right
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+from jukebox.service import Album
+from jukebox.service import Page
+from jukebox.service import PageResult
+from jukebox.service import Track
+from .common import ALBUM_ID_REG
+from .common import TRACK_ID_REG
+from .common import CatalogDiscography
+from .common import album_key
+from .common import decode_cursor
+from .common import encode_cursor
+from .common import format_duration
+from .common import paginate
+from .common import track_key
+from .exception import InvalidAlbumIdException
+from .exception import InvalidTrackIdException
+from .exception import NotFoundException
+from .media import READERS
+from .media import probe
+from .search import LazySearchIndex
+
+LOGGER = logging.getLogger(__name__)
+
+INDEX_NAME = ".jukebox-scan.json"
+INDEX_VERSION = 2
+AUDIO_EXTENSIONS = frozenset(READERS) | {".wav"}
+# "07 Name", "07 - Name", "07.Name"
+TRACK_NAME_REG = re.compile(r"^(\d+)[\s._-]*(.*)$")
+MAX_TRACKS = 99
+
+
+def parse_track_name(file_name: str) -> Tuple[int, str]:
+    """ Split a track's file name into its track number and name, files
+    without a number sort after the numbered ones
+    """
+    stem = os.path.splitext(file_name)[0]
+    match = TRACK_NAME_REG.match(stem)
+    if match is None or not match.group(2):
+        return MAX_TRACKS + 1, stem
+    return int(match.group(1)), match.group(2)
+
+
+@dataclass
+class ScanReport:
+    """ What a scan of the library found
+    :param files: Number of audio files in the library
+    :param probed: Number of files read, because they were new or changed
+    :param removed: Number of files in the scan index which are gone
+    :param seconds: How long the scan took
+    """
+    files: int
+    probed: int
+    removed: int
+    seconds: float
+
+
+def _page_at(page: Optional[Page], numbers: Sequence[int]) -> Optional[Page]:
+    """ Move a page's cursor from the number of the item it points at to the
+    position `paginate` expects, as numbers have gaps where albums or tracks
+    were removed
+    :param numbers: The numbers of the items in the collection, in order
+    """
+    if page is None or page.cursor == "":
+        return page
+    number = decode_cursor(page.cursor)
+    if page.before:
+        position = bisect_left(numbers, number) + 1
+    else:
+        position = bisect_right(numbers, number)
+    return Page(encode_cursor(str(position)), page.size, page.before)
+
+
+class _Catalog:
+    """ Immutable snapshot of the scanned library, swapped in whole by a rescan
+    """
+    def __init__(self, albums: List[Album]) -> None:
+        self.index: Tuple[Album, ...] = tuple(albums)
+        self.numbers: Tuple[int, ...] = tuple(int(album.album_id) for album in albums)
+        self.albums: Dict[str, Album] = {album.album_id: album for album in albums}
+        self.tracks: Dict[str, Track] = {
+            track.track_id: track for album in albums for track in album.tracks
+        }
+        self.search: LazySearchIndex = LazySearchIndex(lambda: self.index)
+
+
+class DirectoryDiscography(CatalogDiscography[_Catalog]):
+    """ Discography scanned from a directory of albums
+    :param url: Location of the library, `dir://path/to/music`
+    :type url: str
+    :param workers: Size of the process pool, defaults to the number of cores
+    :type workers: int
+    :param parallel_after: Number of files to read before a process pool is
+        worth starting, fewer are read in this process
+    :type parallel_after: int
+    """
+    def __init__(self, url: str, workers: Optional[int] = None, parallel_after: int = 256):
+        self.url = url
+        self.root: str = self.url.replace("dir://", "")
+        self.workers: Optional[int] = workers
+        self.parallel_after: int = parallel_after
+        self.index_path: str = os.path.join(self.root, INDEX_NAME)
+        self._scan_lock = threading.Lock()
+        self._catalog: _Catalog = _Catalog([])
+        self.last_scan: ScanReport = self.rescan()
+
+    def _read_index(self) -> dict:
+        empty = {"version": INDEX_VERSION, "next_album": 1, "albums": {}, "files": {}}
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as fo:
+                data = json.load(fo)
+        except FileNotFoundError:
+            return empty
+        except ValueError:
+            LOGGER.warning("ignoring unreadable scan index %s", self.index_path)
+            return empty
+        if data.get("version") != INDEX_VERSION:
+            return empty
+        return data
+
+    def _write_index(self, index: dict) -> None:
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fo:
+            json.dump(index, fo, separators=(",", ":"))
+        os.replace(tmp_path, self.index_path)
+
+    def _walk(self) -> List[Tuple[str, List[os.DirEntry]]]:
+        """ List the album directories and their audio files, albums in name
+        order and tracks in track number order
+        """
+        with os.scandir(self.root) as entries:
+            album_dirs = sorted(
+                (entry for entry in entries if entry.is_dir() and not entry.name.startswith(".")),
+                key=lambda entry: entry.name,
+            )
+        albums = []
+        for album_dir in album_dirs:
+            with os.scandir(album_dir.path) as entries:
+                files = [
+                    entry for entry in entries
+                    if entry.is_file()
+                    and os.path.splitext(entry.name)[1].lower() in AUDIO_EXTENSIONS
+                ]
+            if files:
+                files.sort(key=lambda entry: parse_track_name(entry.name) + (entry.name,))
+                albums.append((album_dir.name, files))
+        return albums
+
+    def _probe_all(self, paths: List[str]) -> List[int]:
+        if len(paths) < self.parallel_after:
+            return [probe(path) for path in paths]
+        workers = self.workers or os.cpu_count() or 1
+        # a few chunks per worker keeps them busy without a round trip per file
+        chunksize = max(1, len(paths) // (workers * 4))
+        with ProcessPoolExecutor(workers) as pool:
+            return list(pool.map(probe, paths, chunksize=chunksize))
+
+    @staticmethod
+    def _number(known: dict, layout: List[Tuple[str, List[os.DirEntry]]]) -> Tuple[dict, List[str]]:
+        """ Match the files found against the scan index, numbering the new
+        albums and tracks
+        :param known: The scan index from the last scan
+        :returns: The new scan index, with the durations of new or changed
+            files still to be read, and the keys of those files
+        """
+        index = {"version": INDEX_VERSION, "next_album": known["next_album"],
+                 "albums": {}, "files": {}}
+        changed: List[str] = []
+        for album_name, entries in layout:
+            album = known["albums"].get(album_name)
+            if album is None:
+                album = {"number": index["next_album"], "next_track": 1}
+                index["next_album"] += 1
+            album = index["albums"][album_name] = dict(album)
+            for entry in entries:
+                key = f"{album_name}/{entry.name}"
+                stat = entry.stat()
+                record = known["files"].get(key)
+                if record is None:
+                    if album["next_track"] > MAX_TRACKS:
+                        LOGGER.warning("%s has no track numbers left, ignoring %s",
+                                       album_name, entry.name)
+                        continue
+                    number = album["next_track"]
+                    album["next_track"] += 1
+                elif record["mtime"] == stat.st_mtime_ns and record["size"] == stat.st_size:
+                    index["files"][key] = record
+                    continue
+                else:
+                    number = record["track"]
+                index["files"][key] = {
+                    "track": number, "mtime": stat.st_mtime_ns, "size": stat.st_size, "seconds": 0,
+                }
+                changed.append(key)
+        return index, changed
+
+    def rescan(self) -> ScanReport:
+        """ Scan the library and swap in the new catalog, only reading the
+        files which changed since the last scan
+        :returns: What the scan found
+        """
+        with self._scan_lock:
+            start = time.perf_counter()
+            known = self._read_index()
+            layout = self._walk()
+            index, changed = self._number(known, layout)
+            files: Dict[str, dict] = index["files"]
+            durations = self._probe_all([os.path.join(self.root, key) for key in changed])
+            for key, seconds in zip(changed, durations):
+                files[key]["seconds"] = seconds
+            self._warn_unreadable(key for key, seconds in zip(changed, durations) if not seconds)
+            removed = len(known["files"].keys() - files.keys())
+            if changed or removed:
+                self._write_index(index)
+            self._catalog = _Catalog(self._build_albums(layout, index["albums"], files))
+            report = ScanReport(len(files), len(changed), removed, time.perf_counter() - start)
+        LOGGER.info("scanned %s in %.3fs: %d files, %d read, %d removed",
+                    self.root, report.seconds, report.files, report.probed, report.removed)
+        return report
+
+    @staticmethod
+    def _warn_unreadable(keys: Iterable[str]) -> None:
+        """ Warn once for each format which had files whose duration couldn't
+        be read, they're listed as being 0 seconds long
+        """
+        formats = Counter(os.path.splitext(key)[1].lower() for key in keys)
+        for extension, count in sorted(formats.items()):
+            LOGGER.warning("couldn't read the duration of %d %s file(s), listing them as 0:00",
+                           count, extension)
+
+    def _build_albums(self, layout: List[Tuple[str, List[os.DirEntry]]], albums: Dict[str, dict],
+                      files: Dict[str, dict]) -> List[Album]:
+        built = []
+        for album_name, entries in layout:
+            album_id = f"{albums[album_name]['number']:02d}"
+            artist, _, title = album_name.partition(" - ")
+            if not title:
+                artist, title = "", album_name
+            tracks = []
+            for entry in entries:
+                record = files.get(f"{album_name}/{entry.name}")
+                if record is None:
+                    continue
+                seconds = record["seconds"]
+                tracks.append(Track(
+                    f"{album_id}-{record['track']:02d}",
+                    parse_track_name(entry.name)[1],
+                    format_duration(seconds),
+                    f"file://{entry.path}",
+                    seconds,
+                ))
+            tracks.sort(key=lambda track: track.track_id)
+            built.append(Album(album_id, artist, title, tracks))
+        built.sort(key=lambda album: int(album.album_id))
+        return built
+
+    def get_albums(self, page: Optional[Page] = None) -> PageResult[Album]:
+        """ Retrieve a list of albums
+        :returns: List of `Album`s
+        """
+        catalog = self._catalog
+        return paginate(catalog.index, _page_at(page, catalog.numbers), album_key)
+
+    def get_album_tracks(self, album_id: str, page: Optional[Page] = None) -> PageResult[Track]:
+        """ Returns the list of tracks contained in the album of 'album_id'
+        :raises InvalidAlbumIdException: if the album_id is incorrectly formatted
+        :raises NotFoundException: if the album was not found for the given album_id
+        """
+        if ALBUM_ID_REG.match(album_id) is None:
+            raise InvalidAlbumIdException(f"{album_id} is an invalid album id")
+        catalog = self._catalog
+        try:
+            tracks = catalog.albums[album_id].tracks
+        except KeyError as exc:
+            raise NotFoundException(f"{album_id} album not found") from exc
+        numbers = [int(track.track_id.split("-")[1]) for track in tracks]
+        return paginate(tracks, _page_at(page, numbers), track_key)
+
+    @staticmethod
+    def _find_track(catalog: _Catalog, track_id: str) -> Track:
+        if TRACK_ID_REG.match(track_id) is None:
+            raise InvalidTrackIdException(f"{track_id} is an invalid track id")
+        track = catalog.tracks.get(track_id)
+        if track is not None:
+            return track
+        if track_id.split("-")[0] not in catalog.albums:
+            raise NotFoundException(f"{track_id} album not found")
+        raise NotFoundException(f"{track_id} track not found")
+
+
+__all__ = (
+    "DirectoryDiscography",
+    "ScanReport",
+)
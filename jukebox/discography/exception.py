@@ -18,6 +18,13 @@ class InvalidTrackIdException(Exception):
     message: str
 
 
+@dataclass
+class InvalidDurationException(Exception):
+    """ The track duration is incorrectly formatted
+    """
+    message: str
+
+
 @dataclass
 class NotFoundException(Exception):
     """ The item was not found in the repository
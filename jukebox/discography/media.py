@@ -0,0 +1,211 @@
+""" Read the duration of audio files from their headers
+
+Only as much of each format is understood as it takes to find the length:
+
+* WAV, with the standard library's `wave`
+* FLAC, from the sample rate and sample count in the STREAMINFO block
+* MP4 and M4A, from the time scale and duration in the movie header atom
+* MP3, from the frame count in a Xing, Info or VBRI header when the file has
+  one, otherwise from the file size and the first frame's bit rate
+* Ogg Vorbis and Opus, from the granule position of the last page
+
+Nothing is decoded, and at most the start and end of a file are read.
+"""
+
+import os
+import struct
+import wave
+from typing import BinaryIO
+from typing import Callable
+from typing import Dict
+from typing import Optional
+
+# MPEG audio layer III bit rates in kbit/s by bit rate index, for MPEG 1 and
+# for MPEG 2 and 2.5
+MP3_BITRATES = {
+    1: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+# sample rates by MPEG version bits, 0 is MPEG 2.5, 2 is MPEG 2, 3 is MPEG 1
+MP3_SAMPLE_RATES = {
+    3: (44100, 48000, 32000),
+    2: (22050, 24000, 16000),
+    0: (11025, 12000, 8000),
+}
+# how far an Ogg file's last page is looked for from its end
+OGG_TAIL = 1 << 16
+# how far into an MP3 file the first frame is looked for, after any ID3 tag
+MP3_SYNC_SEARCH = 1 << 16
+
+
+def _wav(path: str) -> float:
+    with wave.open(path, "rb") as fo:
+        return fo.getnframes() / fo.getframerate()
+
+
+def _flac(fo: BinaryIO) -> float:
+    if fo.read(4) != b"fLaC":
+        return 0.0
+    # STREAMINFO is always the first metadata block, after its 4 byte header
+    info = fo.read(4 + 18)
+    if len(info) < 22 or info[0] & 0x7F != 0:
+        return 0.0
+    # 20 bits of sample rate, 3 of channels, 5 of sample size, 36 of samples
+    packed = int.from_bytes(info[4 + 10:4 + 18], "big")
+    rate = packed >> 44
+    samples = packed & ((1 << 36) - 1)
+    return samples / rate if rate else 0.0
+
+
+def _atoms(fo: BinaryIO, start: int, end: int):
+    """ Yield the type, data offset and end of each MP4 atom between two offsets
+    """
+    offset = start
+    while offset + 8 <= end:
+        fo.seek(offset)
+        header = fo.read(8)
+        if len(header) < 8:
+            return
+        size, kind = struct.unpack(">I4s", header)
+        data = offset + 8
+        if size == 1:
+            size = struct.unpack(">Q", fo.read(8))[0]
+            data += 8
+        elif size == 0:
+            size = end - offset
+        if size < data - offset:
+            return
+        yield kind, data, offset + size
+        offset += size
+
+
+def _mp4(fo: BinaryIO) -> float:
+    end = os.fstat(fo.fileno()).st_size
+    for kind, data, moov_end in _atoms(fo, 0, end):
+        if kind != b"moov":
+            continue
+        for child, child_data, _ in _atoms(fo, data, moov_end):
+            if child != b"mvhd":
+                continue
+            fo.seek(child_data)
+            version = fo.read(4)[0]
+            if version == 1:
+                _, _, scale, duration = struct.unpack(">QQIQ", fo.read(28))
+            else:
+                _, _, scale, duration = struct.unpack(">IIII", fo.read(16))
+            return duration / scale if scale else 0.0
+    return 0.0
+
+
+def _id3_size(fo: BinaryIO) -> int:
+    """ Length of the ID3v2 tag at the start of a file, 0 if there isn't one
+    """
+    header = fo.read(10)
+    if len(header) < 10 or header[:3] != b"ID3":
+        return 0
+    # the size is stored 7 bits to a byte so it can't look like a frame sync
+    size = 0
+    for byte in header[6:10]:
+        size = (size << 7) | (byte & 0x7F)
+    footer = 10 if header[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _mp3(fo: BinaryIO) -> float:
+    start = _id3_size(fo)
+    fo.seek(start)
+    data = fo.read(MP3_SYNC_SEARCH)
+    position = 0
+    while True:
+        position = data.find(b"\xff", position)
+        if position < 0 or position + 4 > len(data):
+            return 0.0
+        header = int.from_bytes(data[position:position + 4], "big")
+        version = (header >> 19) & 3
+        layer = (header >> 17) & 3
+        bitrate_index = (header >> 12) & 0xF
+        rate_index = (header >> 10) & 3
+        # 11 sync bits, a known version, layer III, a usable bit and sample rate
+        if (header >> 21 == 0x7FF and version != 1 and layer == 1
+                and 0 < bitrate_index < 15 and rate_index < 3):
+            break
+        position += 1
+    rate = MP3_SAMPLE_RATES[version][rate_index]
+    samples_per_frame = 1152 if version == 3 else 576
+    mono = (header >> 6) & 3 == 3
+    if version == 3:
+        side_info = 17 if mono else 32
+    else:
+        side_info = 9 if mono else 17
+    xing = position + 4 + side_info
+    frames: Optional[int] = None
+    if data[xing:xing + 4] in (b"Xing", b"Info"):
+        flags = int.from_bytes(data[xing + 4:xing + 8], "big")
+        if flags & 1:
+            frames = int.from_bytes(data[xing + 8:xing + 12], "big")
+    elif data[position + 36:position + 40] == b"VBRI":
+        frames = int.from_bytes(data[position + 50:position + 54], "big")
+    if frames is not None:
+        return frames * samples_per_frame / rate
+    # without a frame count it's assumed to be constant bit rate
+    bitrate = MP3_BITRATES[1 if version == 3 else 2][bitrate_index] * 1000
+    audio = os.fstat(fo.fileno()).st_size - start - position
+    return audio * 8 / bitrate
+
+
+def _ogg(fo: BinaryIO) -> float:
+    first = fo.read(128)
+    if first[:4] != b"OggS":
+        return 0.0
+    # the first packet starts after the page header and its segment table
+    packet = 27 + first[26]
+    pre_skip = 0
+    if first[packet:packet + 7] == b"\x01vorbis":
+        rate = struct.unpack_from("<I", first, packet + 12)[0]
+    elif first[packet:packet + 8] == b"OpusHead":
+        # Opus granule positions always count 48kHz samples
+        rate = 48000
+        pre_skip = struct.unpack_from("<H", first, packet + 10)[0]
+    else:
+        return 0.0
+    size = os.fstat(fo.fileno()).st_size
+    fo.seek(max(size - OGG_TAIL, 0))
+    tail = fo.read()
+    last = tail.rfind(b"OggS")
+    if last < 0 or last + 14 > len(tail) or not rate:
+        return 0.0
+    granule = struct.unpack_from("<q", tail, last + 6)[0]
+    return max(granule - pre_skip, 0) / rate
+
+
+READERS: Dict[str, Callable[[BinaryIO], float]] = {
+    ".flac": _flac,
+    ".m4a": _mp4,
+    ".mp3": _mp3,
+    ".mp4": _mp4,
+    ".ogg": _ogg,
+    ".opus": _ogg,
+}
+
+
+def probe(path: str) -> int:
+    """ Read the duration of an audio file
+    :returns: Whole seconds, 0 if the file can't be read
+    """
+    extension = os.path.splitext(path)[1].lower()
+    try:
+        if extension == ".wav":
+            return round(_wav(path))
+        reader = READERS.get(extension)
+        if reader is None:
+            return 0
+        with open(path, "rb") as fo:
+            return round(reader(fo))
+    except (OSError, EOFError, wave.Error, struct.error, IndexError, ZeroDivisionError):
+        return 0
+
+
+__all__ = (
+    "READERS",
+    "probe",
+)
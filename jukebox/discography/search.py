@@ -0,0 +1,296 @@
+""" Inverted index for searching tracks by name, album title and artist
+
+Text is split into case folded word tokens.  Each token maps to a postings
+list of the tracks containing it along with the weight of the field it came
+from, so a query only ever touches the postings of the words it matches.
+The last query word is the one still being typed, so unless the query ends
+in whitespace it also matches as a prefix, found with a binary search of the
+sorted vocabulary.
+
+Tracks have to match every query word.  They're ranked by the sum of the
+weights of the fields each word matched, with exact word matches counting
+double, then by their position in the catalog.  Words are matched rarest
+first, and once few tracks are left the rest are looked up in the sorted
+postings rather than read through.  Only the tracks on the requested page
+are picked out of the ranking, rather than sorting every match.
+"""
+
+import heapq
+import logging
+import re
+import threading
+from array import array
+from bisect import bisect_left
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from jukebox.service import Album
+from jukebox.service import Page
+from jukebox.service import PageResult
+from .common import page_result
+from .common import page_window
+
+LOGGER = logging.getLogger(__name__)
+
+TOKEN_REG = re.compile(r"\w+")
+
+NAME_WEIGHT = 3
+TITLE_WEIGHT = 2
+ARTIST_WEIGHT = 1
+# once the candidates are this many times fewer than a word's postings,
+# they're found in the postings by binary search instead of a scan
+LOOKUP_RATIO = 16
+# a page's results are picked out with a heap once the matches are this many
+# times more than the results needed, below that sorting them all is quicker
+HEAP_RATIO = 32
+
+
+def tokenize(text: str) -> List[str]:
+    """ Split text into case folded words
+    """
+    return TOKEN_REG.findall(text.casefold())
+
+
+class SearchIndex:
+    """ Inverted index from words to the tracks that contain them
+
+    Call `finish` once every track has been added, which sorts the vocabulary
+    for prefix matching, so searches only ever read the index and can run
+    from any number of threads.  `from_albums` and `from_state` return
+    finished indexes.
+    """
+    def __init__(self) -> None:
+        self._ids: List[str] = []
+        # word -> (track positions, field weights)
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        # sorted by `finish`, None while words have been added since
+        self._vocabulary: Optional[List[str]] = []
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, track_id: str, name: str, title: str, artist: str) -> None:
+        """ Index a track
+        :param track_id: Id of the track
+        :param name: Name of the track
+        :param title: Title of the album the track is on
+        :param artist: The album's artist
+        """
+        doc = len(self._ids)
+        self._ids.append(track_id)
+        weights: Dict[str, int] = {}
+        for text, weight in ((artist, ARTIST_WEIGHT), (title, TITLE_WEIGHT), (name, NAME_WEIGHT)):
+            for word in tokenize(text):
+                weights[word] = max(weight, weights.get(word, 0))
+        for word, weight in weights.items():
+            postings = self._postings.get(word)
+            if postings is None:
+                postings = self._postings[word] = (array("I"), array("B"))
+                self._vocabulary = None
+            postings[0].append(doc)
+            postings[1].append(weight)
+
+    def add_album(self, album: Album) -> None:
+        """ Index every track of an album
+        """
+        for track in album.tracks:
+            self.add(track.track_id, track.name, album.title, album.artist)
+
+    @classmethod
+    def from_albums(cls, albums: Iterable[Album]) -> "SearchIndex":
+        """ Build an index of every track in `albums`
+        """
+        index = cls()
+        for album in albums:
+            index.add_album(album)
+        index.finish()
+        return index
+
+    def finish(self) -> None:
+        """ Sort the vocabulary, call once the tracks have been added
+        """
+        self._vocabulary = sorted(self._postings)
+
+    def to_state(self) -> tuple:
+        """ The index as plain values which `marshal` can save, the postings
+        arrays as their raw bytes
+        """
+        postings = {word: (docs.tobytes(), weights.tobytes())
+                    for word, (docs, weights) in self._postings.items()}
+        return tuple(self._ids), postings
+
+    @classmethod
+    def from_state(cls, state: tuple) -> "SearchIndex":
+        """ Rebuild an index saved with `to_state`
+        """
+        index = cls()
+        ids, postings = state
+        index._ids = list(ids)
+        for word, (docs, weights) in postings.items():
+            index._postings[word] = (array("I", docs), array("B", weights))
+        index.finish()
+        return index
+
+    def _expand(self, word: str) -> Iterator[str]:
+        """ Yield the indexed words starting with `word`
+        """
+        vocabulary = self._vocabulary
+        if vocabulary is None:
+            # not finished, which is correct but sorts on every prefix search
+            vocabulary = sorted(self._postings)
+        position = bisect_left(vocabulary, word)
+        while position < len(vocabulary) and vocabulary[position].startswith(word):
+            yield vocabulary[position]
+            position += 1
+
+    def _terms(self, query: str) -> List[List[str]]:
+        """ Indexed words each query word matches, smallest postings first
+        """
+        words = tokenize(query)
+        terms: Dict[str, List[str]] = {}
+        for word in words[:-1]:
+            terms[word] = [word] if word in self._postings else []
+        if words:
+            last = words[-1]
+            if query[-1:].isspace():
+                terms[last] = [last] if last in self._postings else []
+            else:
+                terms[last] = list(self._expand(last))
+        return sorted(
+            terms.values(), key=lambda matched: sum(len(self._postings[t][0]) for t in matched)
+        )
+
+    def _matches(self, matched: List[str], words: List[str],
+                 within: Optional[Dict[int, int]]) -> Dict[int, int]:
+        """ Score the tracks containing any of the matched words
+        :param words: The query words, exact matches of which count double
+        :param within: Only score these tracks, if given
+        """
+        matches: Dict[int, int] = {}
+        for term in matched:
+            bonus = 2 if term in words else 1
+            docs, weights = self._postings[term]
+            postings: Iterable[Tuple[int, int]] = zip(docs, weights)
+            if within is not None and len(within) * LOOKUP_RATIO < len(docs):
+                postings = self._lookup(docs, weights, within)
+            for doc, weight in postings:
+                if within is not None and doc not in within:
+                    continue
+                if weight * bonus > matches.get(doc, 0):
+                    matches[doc] = weight * bonus
+        return matches
+
+    @staticmethod
+    def _lookup(docs: array, weights: array, tracks: Iterable[int]) -> List[Tuple[int, int]]:
+        """ Find the postings of a few tracks by binary search, rather than
+        reading through them all; tracks are added in order, so each word's
+        postings are sorted
+        """
+        found = []
+        for doc in tracks:
+            position = bisect_left(docs, doc)
+            if position < len(docs) and docs[position] == doc:
+                found.append((doc, weights[position]))
+        return found
+
+    def search(self, query: str, page: Optional[Page] = None) -> PageResult[str]:
+        """ Find the tracks matching every word of the query
+        :param query: Words to search for
+        :param page: Pagination options, the cursors hold result positions
+        :returns: Ranked track ids
+        :raises InvalidCursorException: if the page's cursor is invalid
+        """
+        scores = self._score(query)
+        start, end = page_window(page, len(scores))
+
+        def rank(doc: int) -> Tuple[int, int]:
+            return -scores[doc], doc
+
+        # only the best `end` tracks are needed, or for a page near the end
+        # only the worst, so when that's a small part of the matches pick
+        # whichever is fewer out with a heap rather than sorting them all
+        if end * HEAP_RATIO <= len(scores):
+            ranked = heapq.nsmallest(end, scores, key=rank)[start:]
+        elif (len(scores) - start) * HEAP_RATIO <= len(scores):
+            ranked = heapq.nlargest(len(scores) - start, scores, key=rank)[::-1][:end - start]
+        else:
+            ranked = sorted(scores, key=rank)[start:end]
+        return page_result([self._ids[doc] for doc in ranked], start, end, len(scores))
+
+    def _score(self, query: str) -> Dict[int, int]:
+        """ Score the tracks matching every word of the query
+        """
+        terms = self._terms(query)
+        if not terms:
+            return {}
+        words = tokenize(query)
+        scores = self._matches(terms[0], words, None)
+        for matched in terms[1:]:
+            if not scores:
+                return {}
+            matches = self._matches(matched, words, scores)
+            scores = {
+                doc: score + matches[doc] for doc, score in scores.items() if doc in matches
+            }
+        return scores
+
+
+class LazySearchIndex:
+    """ Builds a `SearchIndex` the first time it's searched, for backends that
+    don't load the whole catalog up front, or don't want to pay for indexing
+    it until somebody searches
+    :param albums: Returns every album in the catalog
+    :type albums: Callable[[], Iterable[Album]]
+    :param state: An index saved with `SearchIndex.to_state`, to rebuild it
+        from instead of the albums
+    :type state: tuple
+    """
+    def __init__(self, albums: Callable[[], Iterable[Album]],
+                 state: Optional[tuple] = None) -> None:
+        self._albums = albums
+        self._state: Optional[tuple] = state
+        self._index: Optional[SearchIndex] = None
+        self._lock = threading.Lock()
+
+    def index(self) -> SearchIndex:
+        """ The index, built on the first call
+        """
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = self._build()
+                    self._state = None
+        return self._index
+
+    def _build(self) -> SearchIndex:
+        if self._state is not None:
+            try:
+                return SearchIndex.from_state(self._state)
+            except (TypeError, ValueError) as exc:
+                LOGGER.warning("rebuilding a search index saved with the wrong shape: %s", exc)
+        return SearchIndex.from_albums(self._albums())
+
+    def to_state(self) -> tuple:
+        """ The index as plain values which `marshal` can save
+        """
+        state = self._state
+        return state if state is not None else self.index().to_state()
+
+    def search(self, query: str, page: Optional[Page] = None) -> PageResult[str]:
+        """ Find the tracks matching every word of the query
+        :returns: Ranked track ids
+        :raises InvalidCursorException: if the page's cursor is invalid
+        """
+        return self.index().search(query, page)
+
+
+__all__ = (
+    "LazySearchIndex",
+    "SearchIndex",
+    "tokenize",
+)
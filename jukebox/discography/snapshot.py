@@ -0,0 +1,124 @@
+""" Snapshots of a built catalog, saved next to the file it was built from
+
+Building a catalog means parsing the whole source, validating it and indexing
+it for search.  A snapshot holds the result as plain tuples, dicts and bytes,
+written with `marshal`, which reads them back much faster than `json` or
+`pickle` do, and can't run code while doing it.  It's two records, a header
+and then the value::
+
+    (version, marshal version, size, mtime, sha256) | value
+
+The header is checked against the source before the catalog is read.  The
+size and modification time are compared first, so the source is only hashed
+when they match.  Snapshots are written to a temporary file and renamed into
+place, so a reader never sees a partly written one.
+"""
+
+import gc
+import hashlib
+import logging
+import marshal
+import os
+from contextlib import contextmanager
+from typing import Any
+from typing import Iterator
+from typing import Optional
+from typing import Tuple
+
+LOGGER = logging.getLogger(__name__)
+
+# bump when the shape of the saved values changes
+VERSION = 1
+
+Fingerprint = Tuple[int, int, str]
+
+
+@contextmanager
+def paused_gc() -> Iterator[None]:
+    """ Pause the garbage collector while loading a snapshot and rebuilding
+    objects from it.  Nothing created is garbage, so collections triggered by
+    the allocations would only traverse the new objects for nothing.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def snapshot_path(source: str) -> str:
+    """ Where the snapshot of `source` is kept
+    """
+    return f"{source}.snapshot"
+
+
+def _digest(source: str) -> str:
+    with open(source, "rb") as fo:
+        return hashlib.file_digest(fo, "sha256").hexdigest()
+
+
+def fingerprint(source: str) -> Fingerprint:
+    """ The size, modification time and sha256 of a file
+    """
+    stat = os.stat(source)
+    return stat.st_size, stat.st_mtime_ns, _digest(source)
+
+
+def load_snapshot(source: str) -> Tuple[Optional[Any], Optional[Fingerprint]]:
+    """ Load the snapshot of `source`, if it was built from the file as it is now
+    :returns: The snapshot, or None, along with the fingerprint of `source` if
+        it had to be computed
+    """
+    stat = os.stat(source)
+    try:
+        with open(snapshot_path(source), "rb") as fo:
+            header = marshal.load(fo)
+            if header[:4] != (VERSION, marshal.version, stat.st_size, stat.st_mtime_ns):
+                return None, None
+            digest = _digest(source)
+            if header[4] != digest:
+                return None, (stat.st_size, stat.st_mtime_ns, digest)
+            # loading from bytes is much faster than from the file object
+            return marshal.loads(fo.read()), (stat.st_size, stat.st_mtime_ns, digest)
+    except FileNotFoundError:
+        return None, None
+    except Exception as exc:
+        LOGGER.warning("ignoring unreadable snapshot of %s: %s", source, exc)
+        return None, None
+
+
+def write_snapshot(source: str, value: Any, built_from: Optional[Fingerprint] = None) -> bool:
+    """ Save a snapshot of what was built from `source`
+    :param value: Plain values that `marshal` can write
+    :param built_from: Fingerprint of `source` when it was read, so changes made
+        while building aren't hidden behind a stale snapshot
+    :returns: Whether the snapshot was written
+    """
+    if built_from is None:
+        built_from = fingerprint(source)
+    path = snapshot_path(source)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as fo:
+            marshal.dump((VERSION, marshal.version) + built_from, fo)
+            marshal.dump(value, fo)
+        os.replace(tmp_path, path)
+    except OSError as exc:
+        LOGGER.warning("couldn't write a snapshot of %s: %s", source, exc)
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        return False
+    return True
+
+
+__all__ = (
+    "fingerprint",
+    "load_snapshot",
+    "paused_gc",
+    "snapshot_path",
+    "write_snapshot",
+)
@@ -0,0 +1,331 @@
+""" SQLite backed discography
+
+Albums and tracks are keyed by their integer numbers, so every lookup is a
+primary key search and pages are read with keyset ranges rather than OFFSET
+scans.  The SQL text is constant, so sqlite's per connection statement cache
+keeps every query prepared.
+
+Build a database from a JSON catalog with::
+
+    python -m jukebox.discography import sample_data.json sample_data.sql
+"""
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from queue import Empty
+from queue import LifoQueue
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from jukebox.service import Album
+from jukebox.service import Page
+from jukebox.service import PageResult
+from jukebox.service import Track
+from .common import ALBUM_ID_REG
+from .common import TRACK_ID_REG
+from .common import album_key
+from .common import page_result
+from .common import page_window
+from .common import parse_duration
+from .common import track_key
+from .common import track_url
+from .exception import InvalidAlbumIdException
+from .exception import InvalidTrackIdException
+from .exception import NotFoundException
+from .search import LazySearchIndex
+from .stream import iter_albums
+
+SCHEMA = """
+CREATE TABLE albums (
+    album_id INTEGER PRIMARY KEY,
+    artist TEXT NOT NULL,
+    title TEXT NOT NULL,
+    track_count INTEGER NOT NULL
+);
+CREATE TABLE tracks (
+    album_id INTEGER NOT NULL,
+    track_number INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    duration TEXT NOT NULL,
+    seconds INTEGER NOT NULL,
+    PRIMARY KEY (album_id, track_number)
+) WITHOUT ROWID;
+"""
+
+ALBUM_COUNT = "SELECT count(*) FROM albums"
+ALBUM_RANGE = """
+SELECT album_id, artist, title FROM albums
+WHERE album_id > ? AND album_id <= ? ORDER BY album_id
+"""
+ALBUM_TRACK_COUNT = "SELECT track_count FROM albums WHERE album_id = ?"
+TRACKS_FOR_ALBUMS = """
+SELECT album_id, track_number, name, duration, seconds FROM tracks
+WHERE album_id > ? AND album_id <= ? ORDER BY album_id, track_number
+"""
+TRACK_RANGE = """
+SELECT album_id, track_number, name, duration, seconds FROM tracks
+WHERE album_id = ? AND track_number > ? AND track_number <= ? ORDER BY track_number
+"""
+TRACK = """
+SELECT album_id, track_number, name, duration, seconds FROM tracks
+WHERE album_id = ? AND track_number = ?
+"""
+TRACKS_BY_KEY = """
+SELECT album_id, track_number, name, duration, seconds FROM tracks
+WHERE (album_id, track_number) IN (VALUES {})
+"""
+# number of tracks looked up per query, keeps well inside sqlite's parameter limit
+BATCH_SIZE = 400
+
+
+class ConnectionPool:
+    """ Small pool of sqlite connections shared by the player and service threads
+
+    A connection is only ever used by one thread at a time, the pool hands it
+    out and takes it back.
+
+    :param path: Path to the sqlite database
+    :type path: str
+    :param size: Maximum number of open connections
+    :type size: int
+    """
+    def __init__(self, path: str, size: int = 4) -> None:
+        self.path: str = path
+        self.size: int = size
+        self._idle: LifoQueue = LifoQueue()
+        self._lock = threading.Lock()
+        self._opened: int = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            f"file:{self.path}?mode=ro", uri=True, check_same_thread=False
+        )
+        conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """ Borrow a connection, opening a new one if none are idle and the
+        pool isn't full, otherwise waiting for one to be returned
+        """
+        try:
+            conn = self._idle.get_nowait()
+        except Empty:
+            with self._lock:
+                create = self._opened < self.size
+                if create:
+                    self._opened += 1
+            if create:
+                try:
+                    conn = self._connect()
+                except:
+                    with self._lock:
+                        self._opened -= 1
+                    raise
+            else:
+                conn = self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    def close(self) -> None:
+        """ Close the idle connections
+        """
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except Empty:
+                break
+            with self._lock:
+                self._opened -= 1
+
+
+def _track(row: Tuple[int, int, str, str, int]) -> Track:
+    album_number, number, name, duration, seconds = row
+    album_id = f"{album_number:02d}"
+    return Track(f"{album_id}-{number:02d}", name, duration, track_url(album_id, number), seconds)
+
+
+class SqlDiscography:
+    """ Discography stored in a sqlite database
+    :param url: Location of the database, `file://path/to/catalog.sql`
+    :type url: str
+    :param pool_size: Maximum number of open connections
+    :type pool_size: int
+    """
+    def __init__(self, url: str, pool_size: int = 4):
+        self.url = url
+        file_path = self.url.replace("file://", "")
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(file_path)
+        self.pool: ConnectionPool = ConnectionPool(file_path, pool_size)
+        with self.pool.connection() as conn:
+            self._album_count: int = conn.execute(ALBUM_COUNT).fetchone()[0]
+        self._search: LazySearchIndex = LazySearchIndex(self.get_albums)
+
+    @staticmethod
+    def _album_number(album_id: str) -> int:
+        number = int(album_id)
+        # only the canonical, zero padded form of an id is valid
+        return number if f"{number:02d}" == album_id else -1
+
+    def get_albums(self, page: Optional[Page] = None) -> PageResult[Album]:
+        """ Retrieve a list of albums
+        :returns: List of `Album`s
+        """
+        start, end = page_window(page, self._album_count)
+        with self.pool.connection() as conn:
+            albums: Dict[int, Album] = {
+                number: Album(f"{number:02d}", artist, title, [])
+                for number, artist, title in conn.execute(ALBUM_RANGE, (start, end))
+            }
+            for row in conn.execute(TRACKS_FOR_ALBUMS, (start, end)):
+                albums[row[0]].tracks.append(_track(row))
+        return page_result(list(albums.values()), start, end, self._album_count, album_key)
+
+    def get_album_tracks(self, album_id: str, page: Optional[Page] = None) -> PageResult[Track]:
+        """ Returns the list of tracks contained in the album of 'album_id'
+        :raises InvalidAlbumIdException: if the album_id is incorrectly formatted
+        :raises NotFoundException: if the album was not found for the given album_id
+        """
+        if ALBUM_ID_REG.match(album_id) is None:
+            raise InvalidAlbumIdException(f"{album_id} is an invalid album id")
+        number = self._album_number(album_id)
+        with self.pool.connection() as conn:
+            row = conn.execute(ALBUM_TRACK_COUNT, (number,)).fetchone()
+            if row is None:
+                raise NotFoundException(f"{album_id} album not found")
+            total = row[0]
+            start, end = page_window(page, total)
+            tracks = [_track(row) for row in conn.execute(TRACK_RANGE, (number, start, end))]
+        return page_result(tracks, start, end, total, track_key)
+
+    def get_track(self, track_id: str) -> Track:
+        """ Get a specific track by its id
+        :raises InvalidTrackIdException: if the track_id is incorrectly formatted
+        :raises NotFoundException: if the track was not found for the given id
+        """
+        if TRACK_ID_REG.match(track_id) is None:
+            raise InvalidTrackIdException(f"{track_id} is an invalid track id")
+        album_id, track_number = track_id.split("-")
+        number = self._album_number(album_id)
+        with self.pool.connection() as conn:
+            row = conn.execute(TRACK, (number, int(track_number))).fetchone()
+            if row is None:
+                if conn.execute(ALBUM_TRACK_COUNT, (number,)).fetchone() is None:
+                    raise NotFoundException(f"{track_id} album not found")
+                raise NotFoundException(f"{track_id} track not found")
+        return _track(row)
+
+    def get_tracks(self, track_ids: Iterable[str]) -> List[Track]:
+        """ Get several tracks by their ids, in the order given, with one query
+        per `BATCH_SIZE` tracks
+        :raises InvalidTrackIdException: if a track_id is incorrectly formatted
+        :raises NotFoundException: if a track was not found for its id
+        """
+        ids = list(track_ids)
+        keys: List[Tuple[int, int]] = []
+        for track_id in ids:
+            if TRACK_ID_REG.match(track_id) is None:
+                raise InvalidTrackIdException(f"{track_id} is an invalid track id")
+            album_id, track_number = track_id.split("-")
+            keys.append((self._album_number(album_id), int(track_number)))
+        unique = list(dict.fromkeys(keys))
+        found: Dict[Tuple[int, int], Track] = {}
+        with self.pool.connection() as conn:
+            for start in range(0, len(unique), BATCH_SIZE):
+                batch = unique[start:start + BATCH_SIZE]
+                query = TRACKS_BY_KEY.format(", ".join(["(?, ?)"] * len(batch)))
+                for row in conn.execute(query, [value for key in batch for value in key]):
+                    found[(row[0], row[1])] = _track(row)
+            for track_id, key in zip(ids, keys):
+                if key not in found:
+                    if conn.execute(ALBUM_TRACK_COUNT, (key[0],)).fetchone() is None:
+                        raise NotFoundException(f"{track_id} album not found")
+                    raise NotFoundException(f"{track_id} track not found")
+        return [found[key] for key in keys]
+
+    def search(self, query: str, page: Optional[Page] = None) -> PageResult[Track]:
+        """ Find tracks by their name, album title or artist
+        :param query: Words to search for
+        :param page: Pagination options
+        :returns: Ranked list of `Track`s
+        """
+        track_ids = self._search.search(query, page)
+        return track_ids.with_items(self.get_tracks(track_ids))
+
+
+def _album_rows(json_path: str, tracks: List[Tuple[Any, ...]]) -> Iterator[Tuple[Any, ...]]:
+    """ Stream album rows from the JSON catalog, collecting each album's track
+    rows into `tracks` as it goes
+    """
+    with open(json_path, "r", encoding="utf-8") as fo:
+        for album_number, data in enumerate(iter_albums(fo), 1):
+            for number, song in enumerate(data["songs"], 1):
+                seconds = parse_duration(song["duration"], f"{album_number:02d}-{number:02d}")
+                tracks.append((album_number, number, song["title"], song["duration"], seconds))
+            yield album_number, data["artist"], data["title"], len(data["songs"])
+
+
+def import_json(json_path: str, db_path: str, batch_size: int = 10_000) -> Tuple[int, int]:
+    """ Bulk load a JSON discography into a new sqlite database
+
+    Everything is written in one transaction to a temporary file, which is
+    synced and renamed into place once it's complete.
+
+    :param json_path: The source JSON discography
+    :param db_path: Where to write the database
+    :param batch_size: Number of track rows to buffer between inserts
+    :returns: The number of albums and tracks written
+    :raises InvalidDurationException: if a duration is incorrectly formatted
+    """
+    tmp_path = f"{db_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path, isolation_level=None)
+    album_count = track_count = 0
+    try:
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.executescript(SCHEMA)
+        conn.execute("BEGIN")
+        tracks: List[Tuple[Any, ...]] = []
+        for album in _album_rows(json_path, tracks):
+            conn.execute("INSERT INTO albums VALUES (?, ?, ?, ?)", album)
+            album_count += 1
+            if len(tracks) >= batch_size:
+                conn.executemany("INSERT INTO tracks VALUES (?, ?, ?, ?, ?)", tracks)
+                track_count += len(tracks)
+                tracks.clear()
+        conn.executemany("INSERT INTO tracks VALUES (?, ?, ?, ?, ?)", tracks)
+        track_count += len(tracks)
+        conn.execute("COMMIT")
+        conn.close()
+        # sqlite didn't sync anything, so make the file durable before it
+        # replaces the old database
+        fd = os.open(tmp_path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    except:
+        conn.close()
+        os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, db_path)
+    return album_count, track_count
+
+
+__all__ = (
+    "ConnectionPool",
+    "SqlDiscography",
+    "import_json",
+)
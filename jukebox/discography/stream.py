@@ -0,0 +1,141 @@
+""" Incremental reader for discography JSON files
+
+Only one album record is held in memory at a time, so the peak memory of
+loading a catalog is roughly the size of whatever the caller builds from the
+records, not the size of the raw parse tree.
+"""
+
+import json
+import re
+from typing import Any
+from typing import Dict
+from typing import Iterator
+from typing import TextIO
+
+CHUNK_SIZE = 64 * 1024
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+# an escape cut short by the end of the buffer, such as "\u00", is reported
+# at its start, which is at most this far from the end
+_LONGEST_ESCAPE = len("\\uXXXX")
+
+
+class _Reader:
+    """ Buffered cursor over a text stream which decodes one JSON value at a time
+
+    :param fo: The stream to read from
+    :type fo: TextIO
+    :param chunk_size: Number of characters to read per refill
+    :type chunk_size: int
+    """
+    def __init__(self, fo: TextIO, chunk_size: int) -> None:
+        self.fo: TextIO = fo
+        self.chunk_size: int = chunk_size
+        self.buf: str = ""
+        self.pos: int = 0
+        self.eof: bool = False
+
+    def fill(self, at_least: int = 0) -> bool:
+        """ Drop the consumed part of the buffer and read another chunk
+        :param at_least: Number of characters to read, if more than a chunk
+        :returns: False if the stream is exhausted
+        """
+        if self.eof:
+            return False
+        chunk = self.fo.read(max(self.chunk_size, at_least))
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """ Skip whitespace and return the next character without consuming it
+        :returns: The next character, or an empty string at the end of the stream
+        """
+        while True:
+            match = _WHITESPACE.match(self.buf, self.pos)
+            # the pattern matches the empty string, so it can't fail
+            assert match is not None
+            self.pos = match.end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        """ Consume the next character, which must be `char`
+        :raises json.JSONDecodeError: if something else is found
+        """
+        if self.peek() != char:
+            raise json.JSONDecodeError(f"expecting '{char}'", self.buf, self.pos)
+        self.pos += 1
+
+    def _cut_short(self, exc: json.JSONDecodeError) -> bool:
+        """ Whether a decode failed because the value runs past the end of the
+        buffer, rather than because it's malformed
+        """
+        # strings are reported from where they start, however far back that is
+        if exc.msg.startswith("Unterminated string"):
+            return True
+        return exc.pos >= len(self.buf) - _LONGEST_ESCAPE
+
+    def decode(self) -> Any:
+        """ Decode the next complete JSON value, reading more of the stream as needed.
+        Each retry at least doubles what's buffered of the value, so a value
+        spanning many chunks is only parsed a logarithmic number of times.
+        :raises json.JSONDecodeError: if the value is malformed
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError as exc:
+                if self._cut_short(exc) and self.fill(len(self.buf) - self.pos):
+                    continue
+                raise
+            # a number or literal running into the end of the buffer may be cut short
+            if end == len(self.buf) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_albums(fo: TextIO, chunk_size: int = CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """ Yield the records of the top level "albums" array one at a time
+    :param fo: Stream of the discography JSON document
+    :type fo: TextIO
+    :param chunk_size: Number of characters to read at a time
+    :type chunk_size: int
+    :raises json.JSONDecodeError: if the document is malformed
+    """
+    reader = _Reader(fo, chunk_size)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        key = reader.decode()
+        reader.expect(":")
+        if key == "albums":
+            reader.expect("[")
+            if reader.peek() == "]":
+                reader.pos += 1
+            else:
+                while True:
+                    yield reader.decode()
+                    if reader.peek() == "]":
+                        reader.pos += 1
+                        break
+                    reader.expect(",")
+        else:
+            reader.decode()
+        if reader.peek() == "}":
+            return
+        reader.expect(",")
+
+
+__all__ = (
+    "iter_albums",
+)
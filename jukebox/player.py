@@ -2,16 +2,26 @@
 """
 
 
+import errno
+import heapq
+import itertools
 import logging
+import os
+import subprocess
 import threading
 import time
-from datetime import datetime
+from dataclasses import dataclass
+from dataclasses import replace
+from typing import Callable
+from typing import List
 from typing import Optional
 from typing import Protocol
+from typing import Tuple
 
 from jukebox import queue
 from jukebox.config import Config
 from jukebox.config import ConfigurationException
+from jukebox.service import NowPlaying
 from jukebox.service import Track
 
 LOGGER = logging.getLogger(__name__)
@@ -28,10 +38,96 @@ class Player(Protocol):
         """Tells the player to start playback
         """
 
+    def skip(self):
+        """Tells the player to move on to the next track
+        """
+
     def current_track_id(self) -> str:
         """Returns the track id of the song that is currently being played.
         """
 
+    def now_playing(self) -> Optional[NowPlaying]:
+        """Returns the song that is currently being played and its progress.
+        """
+
+
+class Clock(Protocol):
+    """ Source of the time tracks are scheduled against
+    """
+    def monotonic(self) -> float:
+        """ Seconds since some fixed point, never going backwards
+        """
+
+    def wait_until(self, cond: threading.Condition, predicate: Callable[[], bool],
+                   deadline: float) -> None:
+        """ Wait on `cond` until `predicate` is true or the clock reaches
+        `deadline`, must be called holding `cond`
+        """
+
+
+class MonotonicClock:
+    """ The system's monotonic clock, unaffected by wall clock changes
+    """
+    def monotonic(self) -> float:
+        """ Seconds since some fixed point, never going backwards
+        """
+        return time.monotonic()
+
+    def wait_until(self, cond: threading.Condition, predicate: Callable[[], bool],
+                   deadline: float) -> None:
+        """ Wait on `cond` until `predicate` is true or the clock reaches
+        `deadline`, must be called holding `cond`
+        """
+        cond.wait_for(
+            lambda: predicate() or time.monotonic() >= deadline,
+            max(deadline - time.monotonic(), 0),
+        )
+
+
+class VirtualClock:
+    """ Clock which only moves when it's advanced, so hours of playback can
+    be simulated instantly
+
+    :param now: The current time
+    :type now: float
+    """
+    def __init__(self, now: float = 0.0) -> None:
+        self.now: float = now
+        self._lock = threading.Lock()
+        # conditions being waited on, woken each time the clock moves
+        self._waiters: List[threading.Condition] = []
+
+    def monotonic(self) -> float:
+        """ The current virtual time
+        """
+        return self.now
+
+    def wait_until(self, cond: threading.Condition, predicate: Callable[[], bool],
+                   deadline: float) -> None:
+        """ Wait on `cond` until `predicate` is true or the clock has been
+        advanced to `deadline`, must be called holding `cond`
+        """
+        with self._lock:
+            self._waiters.append(cond)
+        try:
+            cond.wait_for(lambda: predicate() or self.now >= deadline)
+        finally:
+            with self._lock:
+                self._waiters.remove(cond)
+
+    def advance(self, seconds: float) -> None:
+        """ Move the clock forward, waking anything waiting on it
+        :raises ValueError: if `seconds` is negative
+        """
+        if seconds < 0:
+            raise ValueError("a clock can't go backwards")
+        with self._lock:
+            self.now += seconds
+            waiters = list(self._waiters)
+        for cond in waiters:
+            with cond:
+                cond.notify_all()
+
 
 class TrackFinder(Protocol):
     """ Interface for something that can get a Track from its id
@@ -46,104 +142,761 @@ class TrackFinder(Protocol):
 class Queue(Protocol):
     """ Interface for getting a track id from a queue
     """
-    def deque(self) -> str:
-        """ Get the next track id and remove it from the queue
+    def deque(self, timeout: Optional[float] = 0.0,
+              cancel: Optional[threading.Event] = None) -> str:
+        """ Get the next track id and remove it from the queue, waiting up to
+        `timeout` seconds for one, or indefinitely if it's None, giving up
+        without one once `cancel` is set
+        :raises EmptyQueueException: If the queue is still empty after waiting
+        """
+
+    def peak(self) -> str:
+        """ Get the next track id without removing it from the queue
         :raises EmptyQueueException: If the queue is empty
         """
 
+    def task_done(self) -> None:
+        """ Marks the last dequeued track as finished playing
+        """
+
+    def subscribe(self, callback: Callable[[], None]) -> None:
+        """ Call `callback` whenever tracks are enqueued
+        """
+
+    def wakeup(self) -> None:
+        """ Interrupt any `deque` call waiting for a track
+        """
+
+
+class MediaLoader(Protocol):
+    """ Interface for reading a track's media
+    """
+    def load(self, url: str) -> bytes:
+        """ Read the start of the media at `url`
+        """
+
+
+class FileMediaLoader:
+    """ Reads media from local files, staging at most `max_bytes` of each
+
+    :param max_bytes: Most bytes of a track to hold in memory
+    :type max_bytes: int
+    """
+    def __init__(self, max_bytes: int = 1 << 20) -> None:
+        self.max_bytes: int = max_bytes
+
+    def load(self, url: str) -> bytes:
+        """ Read the start of the media at `url`, nothing if it doesn't exist
+        """
+        try:
+            with open(url.replace("file://", ""), "rb") as fo:
+                return fo.read(self.max_bytes)
+        except FileNotFoundError:
+            LOGGER.debug("no media at %s", url)
+            return b""
+
+
+@dataclass
+class PlayerMetrics:
+    """ How well the player is keeping up between tracks
+    :param prefetch_hits: Tracks which were ready before they were due
+    :param prefetch_misses: Tracks which had to be loaded when they were due
+    :param transitions: Number of tracks started
+    :param transition_seconds: Total time spent loading tracks once due
+    """
+    prefetch_hits: int = 0
+    prefetch_misses: int = 0
+    transitions: int = 0
+    transition_seconds: float = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        """ Fraction of tracks which were prefetched
+        """
+        return self.prefetch_hits / self.transitions if self.transitions else 0.0
+
+    @property
+    def mean_transition_seconds(self) -> float:
+        """ Average gap between taking a track from the queue and playing it
+        """
+        return self.transition_seconds / self.transitions if self.transitions else 0.0
+
 
 class TestPlayer:
     """ Example player which just writes the track url to stdout
 
+    The playback thread blocks on the queue until there's a track, then
+    sleeps until the track ends on its clock, or until it's woken by `stop`
+    or `skip`; with a `VirtualClock` tracks end as the clock is advanced.
+    While a track plays, the next one in the queue is looked up and the
+    start of its media is staged, so it can start as soon as the current
+    one ends.  The prefetch is redone whenever a track is enqueued, in case
+    the front of the queue has changed.
+
     :param queue: Queue storing the track ids to play
     :type queue: Queue
     :param finder: Interface to find track info from an id
     :type finder: TrackFinder
+    :param loader: Reads the tracks' media
+    :type loader: MediaLoader
+    :param clock: Time the tracks are played against
+    :type clock: Clock
     :param current_id: The id of the currently playing track
     :type current_id: str
     :param task: thread which runs the "playback"
     :type task: threading.Thread
 
     """
-    def __init__(self, que: Queue, finder: TrackFinder) -> None:
+    def __init__(self, que: Queue, finder: TrackFinder,
+                 loader: Optional[MediaLoader] = None,
+                 clock: Optional[Clock] = None) -> None:
         self.queue: Queue = que
         self.finder: TrackFinder = finder
+        self.loader: MediaLoader = loader or FileMediaLoader()
+        self.clock: Clock = clock or MonotonicClock()
         self.current_id: str = ""
         self.task: Optional[threading.Thread] = None
-        self._stopping: bool = False
+        self._wake = threading.Condition()
+        self._stopping = threading.Event()
+        self._skipping: bool = False
+        # replaced, never modified, so readers don't need the lock
+        self._now: Optional[NowPlaying] = None
+        # set when the queue may have changed since the last prefetch
+        self._stale: bool = False
+        self._prefetched: Optional[Tuple[Track, bytes]] = None
+        self._media: bytes = b""
+        self._metrics = PlayerMetrics()
+        que.subscribe(self._enqueued)
+
+    @property
+    def metrics(self) -> PlayerMetrics:
+        """ A copy of the current metrics
+        """
+        with self._wake:
+            return replace(self._metrics)
 
     def stop(self):
-        """ Tells playback to cease
+        """ Tells playback to cease, returning once the playback thread has
+        finished
         """
-        self._stopping = True
+        with self._wake:
+            self._stopping.set()
+            self._wake.notify_all()
+        self.queue.wakeup()
         if self.task is not None:
-            while self.task.is_alive():
-                LOGGER.debug("waiting for thread to stop")
-                time.sleep(1)
+            LOGGER.debug("waiting for thread to stop")
+            self.task.join()
         self.task = None
 
     def start(self):
         """ Tells playback to start
         """
+        self._stopping.clear()
         self.task = threading.Thread(target=self._loop, daemon=True)
         self.task.start()
 
+    def skip(self):
+        """ Ends the current track early and moves on to the next one
+        """
+        with self._wake:
+            if self.current_id != "":
+                self._skipping = True
+                self._wake.notify_all()
+
+    def _enqueued(self) -> None:
+        with self._wake:
+            self._stale = True
+            self._wake.notify_all()
+
+    def _prefetch(self) -> None:
+        """ Look up and stage the track at the front of the queue
+        """
+        try:
+            track_id = self.queue.peak()
+        except queue.EmptyQueueException:
+            self._prefetched = None
+            return
+        if self._prefetched is not None and self._prefetched[0].track_id == track_id:
+            return
+        try:
+            track = self.finder.get_track(track_id)
+            self._prefetched = (track, self.loader.load(track.url))
+        except Exception as e:
+            LOGGER.warning("can't prefetch %s: %s", track_id, e)
+            self._prefetched = None
+
+    def _load(self, track_id: str) -> Track:
+        """ Get a dequeued track ready to play, from the prefetch if possible
+        """
+        start = time.monotonic()
+        prefetched, self._prefetched = self._prefetched, None
+        hit = prefetched is not None and prefetched[0].track_id == track_id
+        if prefetched is not None and hit:
+            track, self._media = prefetched
+        else:
+            track = self.finder.get_track(track_id)
+            self._media = self.loader.load(track.url)
+        with self._wake:
+            if hit:
+                self._metrics.prefetch_hits += 1
+            else:
+                self._metrics.prefetch_misses += 1
+            self._metrics.transitions += 1
+            self._metrics.transition_seconds += time.monotonic() - start
+        return track
+
+    def _play(self, track: Track) -> bool:
+        """ Wait for the track to finish, prefetching the next one meanwhile
+        :returns: Whether it finished or was skipped, rather than stopped
+        """
+        LOGGER.info("playing: %s %s", track.track_id, track.url)
+        start = self.clock.monotonic()
+        end = start + track.seconds
+        with self._wake:
+            self.current_id = track.track_id
+            self._now = NowPlaying(track, start, 0.0, float(track.seconds))
+            self._stale = True
+        while True:
+            with self._wake:
+                self.clock.wait_until(
+                    self._wake,
+                    lambda: self._stopping.is_set() or self._skipping or self._stale,
+                    end,
+                )
+                if self._stopping.is_set() or self._skipping or self.clock.monotonic() >= end:
+                    self.current_id = ""
+                    self._now = None
+                    self._skipping = False
+                    return not self._stopping.is_set()
+                self._stale = False
+            self._prefetch()
+
     def _loop(self) -> None:
         LOGGER.debug("starting loop")
-        start: float = 0.0
-        seconds: float = 0.0
-        while self._stopping is False:
-            if self.current_id != "":
-                if datetime.now().timestamp() - start < seconds:
-                    LOGGER.info("playing: %s", self.current_id)
-                    time.sleep(1)
-                    continue
-                LOGGER.debug("playback complete")
-                start = 0.0
-                self.current_id = ""
-                seconds = 0.0
-            LOGGER.info("getting next track")
+        while not self._stopping.is_set():
             try:
-                track_id = self.queue.deque()
+                # blocks until a track is enqueued or stop cancels the wait
+                track_id = self.queue.deque(timeout=None, cancel=self._stopping)
             except queue.EmptyQueueException:
-                LOGGER.info("empty queue, wait")
-                time.sleep(2)
+                continue
             except Exception as e:
                 LOGGER.error("deque exception %s", e)
-            else:
-                track = self.finder.get_track(track_id)
-                for part in track.duration.split(":"):
-                    seconds = seconds * 60.0 + float(part)
+                continue
+            try:
+                track = self._load(track_id)
+            except Exception as e:
+                LOGGER.error("can't play %s: %s", track_id, e)
+                self.queue.task_done()
+                continue
+            if not self._play(track):
+                # the track stays in progress, so a durable queue replays it
+                break
+            LOGGER.debug("playback complete")
+            self.queue.task_done()
 
-                start = datetime.now().timestamp()
-                self.current_id = track_id
+    def current_track_id(self) -> str:
+        """ Returns the currently playing track id
+        """
+        return self.current_id
+
+    def now_playing(self) -> Optional[NowPlaying]:
+        """ Returns the currently playing track and its progress
+        """
+        playing = self._now
+        return None if playing is None else playing.at(self.clock.monotonic())
+
+
+class PooledPlayer:
+    """ A player driven by a `PlayerPool` rather than its own thread, create
+    them with `PlayerPool.add`
+
+    :param pool: The pool playing the tracks
+    :type pool: PlayerPool
+    :param queue: Queue storing the track ids to play
+    :type queue: Queue
+    :param finder: Interface to find track info from an id
+    :type finder: TrackFinder
+    :param current_id: The id of the currently playing track
+    :type current_id: str
+    """
+    __slots__ = ("pool", "queue", "finder", "current_id", "now", "active", "generation")
+
+    def __init__(self, pool: "PlayerPool", que: Queue, finder: TrackFinder) -> None:
+        self.pool: PlayerPool = pool
+        self.queue: Queue = que
+        self.finder: TrackFinder = finder
+        self.current_id: str = ""
+        # replaced, never modified, so readers don't need the lock
+        self.now: Optional[NowPlaying] = None
+        self.active: bool = False
+        # bumped whenever the player changes state, so scheduled work from
+        # before the change, such as the end of a skipped track, is ignored
+        self.generation: int = 0
+
+    def start(self):
+        """ Tells playback to start
+        """
+        self.pool.start_player(self)
+
+    def stop(self):
+        """ Tells playback to cease, leaving the current track in progress
+        """
+        self.pool.stop_player(self)
+
+    def skip(self):
+        """ Ends the current track early and moves on to the next one
+        """
+        self.pool.skip_player(self)
 
     def current_track_id(self) -> str:
         """ Returns the currently playing track id
         """
         return self.current_id
 
+    def now_playing(self) -> Optional[NowPlaying]:
+        """ Returns the currently playing track and its progress
+        """
+        playing = self.now
+        return None if playing is None else playing.at(self.pool.clock.monotonic())
+
+
+class PlayerPool:
+    """ Plays many queues from one scheduler thread
+
+    Rather than a thread sleeping through each track, the pool keeps a heap
+    of the times the playing tracks end.  The scheduler sleeps until the
+    earliest one, or until a queue gets a track or a player is skipped, so
+    its cost grows with the number of track changes rather than the number
+    of players.
+
+    Instead of starting the scheduler thread, a pool can be driven by
+    calling `run_pending`, which is how a `VirtualClock` is used.
+
+    :param clock: Time the tracks are scheduled against
+    :type clock: Clock
+    :param task: thread which runs the scheduler
+    :type task: threading.Thread
+    """
+    def __init__(self, clock: Optional[Clock] = None) -> None:
+        self.clock: Clock = clock or MonotonicClock()
+        self.task: Optional[threading.Thread] = None
+        self._wake = threading.Condition()
+        self._stopping: bool = False
+        # (end time, tie breaker, generation, player) of the playing tracks
+        self._deadlines: List[Tuple[float, int, int, PooledPlayer]] = []
+        # (player, generation, whether the current track has ended) to advance
+        self._ready: List[Tuple[PooledPlayer, int, bool]] = []
+        self._order = itertools.count()
+
+    def add(self, que: Queue, finder: TrackFinder) -> PooledPlayer:
+        """ Create a player for a queue, it plays once it's started
+        """
+        player = PooledPlayer(self, que, finder)
+        que.subscribe(lambda: self._enqueued(player))
+        return player
+
+    def start(self) -> None:
+        """ Start the scheduler thread
+        """
+        self._stopping = False
+        self.task = threading.Thread(target=self._loop, daemon=True)
+        self.task.start()
+
+    def stop(self) -> None:
+        """ Stop the scheduler, returning once its thread has finished
+        """
+        with self._wake:
+            self._stopping = True
+            self._wake.notify()
+        if self.task is not None:
+            self.task.join()
+        self.task = None
+
+    def _schedule(self, player: PooledPlayer, ended: bool) -> None:
+        """ Queue up work for the scheduler, must be called holding the lock
+        """
+        self._ready.append((player, player.generation, ended))
+        self._wake.notify()
+
+    def start_player(self, player: PooledPlayer) -> None:
+        """ Start playing a player's queue, `PooledPlayer.start` calls this
+        """
+        with self._wake:
+            if not player.active:
+                player.active = True
+                player.generation += 1
+                self._schedule(player, False)
+
+    def stop_player(self, player: PooledPlayer) -> None:
+        """ Stop playing a player's queue, leaving its current track in
+        progress, `PooledPlayer.stop` calls this
+        """
+        with self._wake:
+            player.active = False
+            player.generation += 1
+            player.current_id = ""
+            player.now = None
+
+    def skip_player(self, player: PooledPlayer) -> None:
+        """ End a player's current track early, `PooledPlayer.skip` calls this
+        """
+        with self._wake:
+            if player.active and player.current_id != "":
+                player.generation += 1
+                self._schedule(player, True)
+
+    def _enqueued(self, player: PooledPlayer) -> None:
+        with self._wake:
+            if player.active and player.current_id == "":
+                self._schedule(player, False)
+
+    def _take_due(self, now: float) -> List[Tuple[PooledPlayer, int, bool]]:
+        """ Collect the work that's due, must be called holding the lock
+        """
+        while self._deadlines and self._deadlines[0][0] <= now:
+            _, _, generation, player = heapq.heappop(self._deadlines)
+            self._ready.append((player, generation, True))
+        ready, self._ready = self._ready, []
+        return ready
+
+    def _due(self) -> List[Tuple[PooledPlayer, int, bool]]:
+        """ Wait for work, must be called holding the lock
+        :returns: The players to advance, empty when stopping
+        """
+        while not self._stopping:
+            now = self.clock.monotonic()
+            ready = self._take_due(now)
+            if ready:
+                return ready
+            self._wake.wait(self._deadlines[0][0] - now if self._deadlines else None)
+        return []
+
+    def next_deadline(self) -> Optional[float]:
+        """ When the pool next has work to do, if it has any scheduled
+        """
+        with self._wake:
+            if self._ready:
+                return self.clock.monotonic()
+            return self._deadlines[0][0] if self._deadlines else None
+
+    def run_pending(self) -> int:
+        """ Do all the work that's due by the clock's current time on the
+        calling thread, for pools without a scheduler thread
+        :returns: The number of players advanced
+        """
+        count = 0
+        while True:
+            with self._wake:
+                ready = self._take_due(self.clock.monotonic())
+            if not ready:
+                return count
+            for player, generation, ended in ready:
+                self._advance(player, generation, ended)
+            count += len(ready)
+
+    def _loop(self) -> None:
+        LOGGER.debug("starting scheduler")
+        while True:
+            with self._wake:
+                ready = self._due()
+            if not ready:
+                return
+            for player, generation, ended in ready:
+                self._advance(player, generation, ended)
+
+    def _advance(self, player: PooledPlayer, generation: int, ended: bool) -> None:
+        """ Finish the player's current track and start its next one
+        """
+        with self._wake:
+            if generation != player.generation or not player.active:
+                return
+            if not ended and player.current_id != "":
+                # woken for an enqueue while already playing
+                return
+            finished = player.current_id
+            player.current_id = ""
+            player.now = None
+            player.generation += 1
+            generation = player.generation
+        if finished != "":
+            LOGGER.debug("playback complete: %s", finished)
+            player.queue.task_done()
+        try:
+            track_id = player.queue.deque()
+        except queue.EmptyQueueException:
+            # the queue's subscription wakes the player up again
+            return
+        try:
+            track = player.finder.get_track(track_id)
+        except Exception as e:
+            LOGGER.error("can't play %s: %s", track_id, e)
+            player.queue.task_done()
+            with self._wake:
+                self._schedule(player, False)
+            return
+        with self._wake:
+            if generation != player.generation:
+                # stopped while the track was being looked up
+                return
+            LOGGER.info("playing: %s %s", track.track_id, track.url)
+            start = self.clock.monotonic()
+            player.current_id = track_id
+            player.now = NowPlaying(track, start, 0.0, float(track.seconds))
+            heapq.heappush(
+                self._deadlines, (start + track.seconds, next(self._order), generation, player)
+            )
+
+
+@dataclass
+class StreamMetrics:
+    """ How much media a `SubprocessPlayer` has streamed
+    :param tracks: Number of tracks streamed to the end
+    :param bytes: Bytes written to the sink
+    :param seconds: Time spent writing to the sink
+    :param restarts: Number of times the sink process was started
+    """
+    tracks: int = 0
+    bytes: int = 0
+    seconds: float = 0.0
+    restarts: int = 0
+
+
+class SubprocessPlayer:
+    """ Player which streams each track's media file into the stdin of a
+    long running sink process, such as a decoder writing to the sound card
+
+    The file is handed to the pipe with `os.sendfile`, so the bytes never
+    pass through Python.  Where the kernel can't sendfile into a pipe it
+    falls back to copying through one reused buffer of `chunk_size` bytes.
+    Tracks take as long as the sink takes to consume them.  One process is
+    used for every track, and it's restarted if it exits.
+
+    :param queue: Queue storing the track ids to play
+    :type queue: Queue
+    :param finder: Interface to find track info from an id
+    :type finder: TrackFinder
+    :param command: Shell command of the sink, e.g. `cat > /dev/null`
+    :type command: str
+    :param media_root: Directory the `file://` track urls are relative to
+    :type media_root: str
+    :param chunk_size: Bytes streamed between checks for stop and skip
+    :type chunk_size: int
+    :param zero_copy: Use `os.sendfile`, rather than copying through a buffer
+    :type zero_copy: bool
+    """
+    def __init__(self, que: Queue, finder: TrackFinder, command: str, media_root: str = "",
+                 chunk_size: int = 1 << 20, zero_copy: bool = True) -> None:
+        self.queue: Queue = que
+        self.finder: TrackFinder = finder
+        self.command: str = command
+        self.media_root: str = media_root
+        self.chunk_size: int = chunk_size
+        self.zero_copy: bool = zero_copy
+        self.current_id: str = ""
+        self.task: Optional[threading.Thread] = None
+        self.process: Optional[subprocess.Popen] = None
+        self._stopping = threading.Event()
+        self._skipping = threading.Event()
+        # replaced, never modified, so readers don't need a lock
+        self._now: Optional[NowPlaying] = None
+        self._buffer: Optional[bytearray] = None
+        self._metrics = StreamMetrics()
+
+    @property
+    def metrics(self) -> StreamMetrics:
+        """ A copy of the current metrics
+        """
+        return replace(self._metrics)
+
+    def start(self):
+        """ Tells playback to start
+        """
+        self._stopping.clear()
+        self.task = threading.Thread(target=self._loop, daemon=True)
+        self.task.start()
+
+    def stop(self):
+        """ Tells playback to cease, returning once the playback thread and
+        the sink process have finished
+        """
+        self._stopping.set()
+        self.queue.wakeup()
+        if self.task is not None:
+            self.task.join()
+        self.task = None
+        self._close_sink()
+
+    def skip(self):
+        """ Ends the current track early and moves on to the next one
+        """
+        if self.current_id != "":
+            self._skipping.set()
+
+    def current_track_id(self) -> str:
+        """ Returns the currently playing track id
+        """
+        return self.current_id
+
+    def now_playing(self) -> Optional[NowPlaying]:
+        """ Returns the currently playing track and its progress
+        """
+        playing = self._now
+        return None if playing is None else playing.at(time.monotonic())
+
+    def _sink(self) -> int:
+        """ The sink's stdin, starting the sink if it isn't running
+        """
+        if self.process is None or self.process.poll() is not None:
+            LOGGER.info("starting sink: %s", self.command)
+            self.process = subprocess.Popen(
+                self.command, shell=True, stdin=subprocess.PIPE, bufsize=0
+            )
+            self._metrics.restarts += 1
+        assert self.process.stdin is not None
+        return self.process.stdin.fileno()
+
+    def _close_sink(self) -> None:
+        """ Close the sink's stdin and wait for it to finish
+        """
+        if self.process is None:
+            return
+        if self.process.stdin is not None:
+            try:
+                self.process.stdin.close()
+            except BrokenPipeError:
+                pass
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self.process = None
+
+    def _copy(self, out: int, source: int, offset: int, count: int) -> int:
+        """ Copy part of the media file into the sink
+        :returns: The number of bytes copied
+        """
+        if self.zero_copy:
+            try:
+                return os.sendfile(out, source, offset, count)
+            except OSError as exc:
+                if exc.errno not in (errno.EINVAL, errno.ENOSYS):
+                    raise
+                LOGGER.info("sendfile into a pipe isn't supported, copying instead")
+                self.zero_copy = False
+        if self._buffer is None:
+            self._buffer = bytearray(self.chunk_size)
+        view = memoryview(self._buffer)[:count]
+        read = os.preadv(source, [view], offset)
+        written = 0
+        while written < read:
+            written += os.write(out, view[written:read])
+        return read
+
+    def _stream(self, path: str) -> bool:
+        """ Write a media file into the sink
+        :returns: Whether the whole file was written, rather than stopped or skipped
+        """
+        start = time.monotonic()
+        with open(path, "rb") as fo:
+            source = fo.fileno()
+            size = os.fstat(source).st_size
+            offset = 0
+            out = self._sink()
+            try:
+                while offset < size:
+                    if self._stopping.is_set() or self._skipping.is_set():
+                        return False
+                    offset += self._copy(out, source, offset, min(self.chunk_size, size - offset))
+            finally:
+                self._metrics.bytes += offset
+                self._metrics.seconds += time.monotonic() - start
+        self._metrics.tracks += 1
+        return True
+
+    def _play(self, track: Track) -> None:
+        path = os.path.join(self.media_root, track.url.replace("file://", ""))
+        LOGGER.info("playing: %s %s", track.track_id, path)
+        self.current_id = track.track_id
+        self._now = NowPlaying(track, time.monotonic(), 0.0, float(track.seconds))
+        try:
+            self._stream(path)
+        except FileNotFoundError:
+            LOGGER.error("no media for %s at %s", track.track_id, path)
+        except BrokenPipeError:
+            LOGGER.error("sink exited while playing %s", track.track_id)
+            self._close_sink()
+        except OSError as e:
+            # unreadable media or a sink that couldn't be started
+            LOGGER.error("can't play %s from %s: %s", track.track_id, path, e)
+        finally:
+            self._now = None
+            self.current_id = ""
+            self._skipping.clear()
+
+    def _loop(self) -> None:
+        LOGGER.debug("starting loop")
+        while not self._stopping.is_set():
+            try:
+                # blocks until a track is enqueued or stop cancels the wait
+                track_id = self.queue.deque(timeout=None, cancel=self._stopping)
+            except queue.EmptyQueueException:
+                continue
+            except Exception as e:
+                LOGGER.error("deque exception %s", e)
+                continue
+            try:
+                track = self.finder.get_track(track_id)
+            except Exception as e:
+                LOGGER.error("can't play %s: %s", track_id, e)
+                self.queue.task_done()
+                continue
+            self._play(track)
+            if self._stopping.is_set():
+                # the track stays in progress, so a durable queue replays it
+                break
+            self.queue.task_done()
+
 
 def from_config(conf: Config, finder: Optional[TrackFinder] = None,
-                que: Optional[Queue] = None) -> Player:
+                que: Optional[Queue] = None, clock: Optional[Clock] = None) -> Player:
     """ Constructs the appropriate Player based on the given Config
     :param conf: Configuration object
     :type conf: Config
     :param finder: A track finder
     :type finder: TrackFinder
     :param que: Track id que
+    :param clock: Time the test player plays against, the monotonic clock
+        if it isn't given
     :rtype: Player
     """
     if conf.player.url == "local://test-player":
         # TODO: how do we resolve the optional, mypy
-        player = TestPlayer(que, finder)
+        player = TestPlayer(que, finder, clock=clock)
         player.start()
         return player
+    if conf.player.url.startswith("proc://"):
+        if que is None or finder is None:
+            raise ConfigurationException("a proc:// player needs a queue and a track finder")
+        sink = SubprocessPlayer(que, finder, conf.player.url[len("proc://"):],
+                                media_root=conf.player.media_root)
+        sink.start()
+        return sink
     raise ConfigurationException("no player defined")
 
 
 __all__ = (
     "from_config",
+    "Clock",
     "ConfigurationException",
-    "Player"
+    "FileMediaLoader",
+    "MediaLoader",
+    "MonotonicClock",
+    "Player",
+    "PlayerMetrics",
+    "PlayerPool",
+    "PooledPlayer",
+    "StreamMetrics",
+    "SubprocessPlayer",
+    "VirtualClock",
 )
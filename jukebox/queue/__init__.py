@@ -0,0 +1,104 @@
+""" Playback queue
+"""
+
+from threading import Event
+from typing import Callable
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Protocol
+
+from jukebox.config import Config
+from jukebox.config import ConfigurationException
+from jukebox.service.cursor import InvalidCursorException
+from jukebox.service.data import Page
+from jukebox.service.data import PageResult
+from jukebox.service.data import QueueEntry
+from .exception import CorruptLogException
+from .exception import EmptyQueueException
+from .exception import EntryNotFoundException
+from .exception import QueueFullException
+from .memory import ListQueue
+from .shm import ShmQueue
+from .wal import WalQueue
+
+
+class Queue(Protocol):
+    """ Contract interface for what a constructed queue will provide
+    """
+    def enque(self, track_id: str) -> int:
+        """ Adds a track_id to the queue
+        :returns: The entry id of the queued track
+        :raises QueueFullException: if the queue is full
+        """
+
+    def enque_many(self, track_ids: Iterable[str]) -> List[int]:
+        """ Adds several track_ids to the queue, all or none of them
+        :returns: The entry ids of the queued tracks
+        :raises QueueFullException: if they don't all fit in the queue
+        """
+
+    def deque(self, timeout: Optional[float] = 0.0,
+              cancel: Optional[Event] = None) -> str:
+        """ Remove the next track_id from the queue and return it
+        :param timeout: Seconds to wait for a track, None to wait until one is
+            enqueued or `wakeup` is called
+        :param cancel: Once set, no track is taken; it's checked before
+            waiting, so setting it and then calling `wakeup` can't be missed
+        :raises EmptyQueueException: if the queue is still empty after waiting,
+            or `cancel` is set
+        """
+
+    def peak(self) -> str:
+        """Returns the next track_id in the queue with removing it from the queue.
+        :raises EmptyQueueException: if the queue is empty
+        """
+
+    def position(self, entry_id: int) -> int:
+        """ Where an entry is in the queue, 1 is the next track to play
+        :raises EntryNotFoundException: if the entry isn't queued
+        """
+
+    def snapshot(self, page: Optional[Page] = None) -> PageResult[QueueEntry]:
+        """ List the queued tracks in play order
+        :raises InvalidCursorException: if the page's cursor is invalid
+        """
+
+    def task_done(self) -> None:
+        """ Marks the last dequeued track as finished playing
+        """
+
+    def subscribe(self, callback: Callable[[], None]) -> None:
+        """ Call `callback` whenever tracks are enqueued
+        """
+
+    def wakeup(self) -> None:
+        """ Interrupt every `deque` call currently waiting for a track
+        """
+
+
+def from_config(conf: Config) -> Queue:
+    """ Constructs the appropriate Queue based on the configuration
+    """
+    if conf.queue.url == "mem://in-memory-queue":
+        return ListQueue(conf.queue.max_size)
+    if conf.queue.url.startswith("file://"):
+        return WalQueue(conf.queue.url, conf.queue.max_size)
+    if conf.queue.url.startswith("shm://"):
+        return ShmQueue(conf.queue.url, conf.queue.max_size)
+    raise ConfigurationException("unknown queue configuration")
+
+
+__all__ = (
+    "from_config",
+    "ConfigurationException",
+    "CorruptLogException",
+    "EmptyQueueException",
+    "EntryNotFoundException",
+    "InvalidCursorException",
+    "ListQueue",
+    "Queue",
+    "QueueFullException",
+    "ShmQueue",
+    "WalQueue",
+)
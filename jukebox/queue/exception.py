@@ -0,0 +1,32 @@
+""" Exceptions
+"""
+
+from dataclasses import dataclass
+
+
+@dataclass
+class EmptyQueueException(Exception):
+    """ When the queue is empty but you tried to get something from it
+    """
+    message: str
+
+
+@dataclass
+class QueueFullException(Exception):
+    """ When the queue already holds its maximum number of tracks
+    """
+    message: str
+
+
+@dataclass
+class EntryNotFoundException(Exception):
+    """ The entry isn't in the queue, it may have already been played
+    """
+    message: str
+
+
+@dataclass
+class CorruptLogException(Exception):
+    """ The queue's log contains a record that can't be replayed
+    """
+    message: str
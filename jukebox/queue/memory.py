@@ -0,0 +1,295 @@
+""" In memory queue
+
+Every enqueued track is given the next entry id, and tracks only leave from
+the front, so the queue always holds a contiguous run of ids.  An entry's
+position is its id minus the id at the front, and page cursors hold entry ids.
+"""
+
+from threading import Condition
+from threading import Event
+from threading import Lock
+from typing import Callable
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from jukebox.service.cursor import decode_cursor
+from jukebox.service.cursor import encode_cursor
+from jukebox.service.data import Page
+from jukebox.service.data import PageResult
+from jukebox.service.data import QueueEntry
+from .exception import EmptyQueueException
+from .exception import EntryNotFoundException
+from .exception import QueueFullException
+
+
+class Entries:
+    """ The queued track ids, in a list with an offset to the front entry,
+    so appending, removing from the front and reading any run of entries
+    all take constant time per entry.  Removed entries are dropped from the
+    list once they make up half of it, keeping that amortised constant too.
+    """
+    __slots__ = ("_items", "_front")
+
+    # removed entries are kept until there are at least this many
+    COMPACT_AFTER = 1024
+
+    def __init__(self, track_ids: Iterable[str] = ()) -> None:
+        self._items: List[str] = list(track_ids)
+        self._front: int = 0
+
+    def __len__(self) -> int:
+        return len(self._items) - self._front
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._items[self._front:])
+
+    def __getitem__(self, index: int) -> str:
+        if not 0 <= index < len(self):
+            raise IndexError("queue index out of range")
+        return self._items[self._front + index]
+
+    def window(self, start: int, end: int) -> List[str]:
+        """ Copy the entries from `start` up to `end`
+        """
+        return self._items[self._front + start:self._front + end]
+
+    def append(self, track_id: str) -> None:
+        """ Add an entry to the back
+        """
+        self._items.append(track_id)
+
+    def extend(self, track_ids: Iterable[str]) -> None:
+        """ Add several entries to the back
+        """
+        self._items.extend(track_ids)
+
+    def appendleft(self, track_id: str) -> None:
+        """ Put an entry back at the front
+        """
+        if self._front:
+            self._front -= 1
+            self._items[self._front] = track_id
+        else:
+            self._items.insert(0, track_id)
+
+    def popleft(self) -> str:
+        """ Remove and return the front entry
+        :raises IndexError: if there are no entries
+        """
+        if self._front == len(self._items):
+            raise IndexError("pop from an empty queue")
+        track_id = self._items[self._front]
+        self._front += 1
+        if self._front >= self.COMPACT_AFTER and self._front * 2 >= len(self._items):
+            del self._items[:self._front]
+            self._front = 0
+        return track_id
+
+
+class ListQueue:
+    """ Stores the track id queue in memory, every operation takes constant
+    time however long the queue gets, and listing a page takes time in
+    proportion to the page
+
+    :param max_size: Maximum number of queued tracks, 0 for no limit
+    :type max_size: int
+    :param lock: threading Lock
+    :type lock: Lock
+    :param queue:
+    :type queue: Entries
+    """
+    def __init__(self, max_size: int = 0) -> None:
+        self.max_size: int = max_size
+        self.lock = Lock()
+        self.queue: Entries = Entries()
+        # entry id of the track at the front of the queue
+        self.head: int = 1
+        self._ready = Condition(self.lock)
+        # bumped by wakeup, so waiters can tell they were interrupted
+        self._wakeups: int = 0
+        self._subscribers: List[Callable[[], None]] = []
+
+    def _check_space(self, count: int = 1) -> None:
+        """ Make sure `count` more tracks fit, must be called holding the lock
+        :raises QueueFullException: if the queue is full
+        """
+        if self.max_size and self._length() + count > self.max_size:
+            raise QueueFullException(
+                f"queue is full at {self.max_size} tracks, {count} would not fit"
+            )
+
+    def _length(self) -> int:
+        """ Number of tracks counted against `max_size`, must be called
+        holding the lock
+        """
+        return len(self.queue)
+
+    def subscribe(self, callback: Callable[[], None]) -> None:
+        """ Call `callback` after tracks are enqueued, from the enqueuing
+        thread, so it mustn't block
+        """
+        self._subscribers.append(callback)
+
+    def _publish(self) -> None:
+        """ Tell the subscribers about new tracks, must be called without the lock
+        """
+        for callback in self._subscribers:
+            callback()
+
+    def _pop(self, timeout: Optional[float], cancel: Optional[Event] = None) -> str:
+        """ Wait up to `timeout` for a track and remove it, must be called
+        holding the lock
+        :raises EmptyQueueException: if the queue is still empty after waiting,
+            or `cancel` is set
+        """
+        if not self.queue and timeout != 0:
+            wakeups = self._wakeups
+            self._ready.wait_for(
+                lambda: self.queue or self._wakeups != wakeups
+                or (cancel is not None and cancel.is_set()),
+                timeout,
+            )
+        if cancel is not None and cancel.is_set():
+            raise EmptyQueueException("deque was cancelled")
+        try:
+            track_id = self.queue.popleft()
+        except IndexError as exc:
+            raise EmptyQueueException("queue is empty") from exc
+        self.head += 1
+        return track_id
+
+    def enque(self, track_id: str) -> int:
+        """ Adds a track_id to the queue
+        :returns: The entry id of the queued track
+        :raises QueueFullException: if the queue is full
+        """
+        return self._add([track_id])[0]
+
+    def enque_many(self, track_ids: Iterable[str]) -> List[int]:
+        """ Adds several track_ids to the queue together, either they all fit
+        or none of them are added
+        :returns: The entry ids of the queued tracks
+        :raises QueueFullException: if they don't all fit in the queue
+        """
+        return self._add(list(track_ids))
+
+    def _add(self, track_ids: List[str]) -> List[int]:
+        """ Adds tracks to the back of the queue, all or none of them
+        :returns: The entry ids of the added tracks
+        :raises QueueFullException: if they don't all fit in the queue
+        """
+        with self.lock:
+            self._check_space(len(track_ids))
+            first, ticket = self._stage(track_ids)
+        self._commit(ticket)
+        self._publish()
+        return list(range(first, first + len(track_ids)))
+
+    def _stage(self, track_ids: List[str]) -> Tuple[int, int]:
+        """ Add tracks which are known to fit, must be called holding the lock
+        :returns: The first track's entry id, and the ticket to pass to `_commit`
+        """
+        first = self.head + len(self.queue)
+        self.queue.extend(track_ids)
+        self._ready.notify(len(track_ids))
+        return first, 0
+
+    def _commit(self, ticket: int) -> None:
+        """ Wait until staged tracks are stored, must be called without the
+        lock, in memory they're stored as soon as they're staged
+        """
+
+    def deque(self, timeout: Optional[float] = 0.0,
+              cancel: Optional[Event] = None) -> str:
+        """ Remove the next track_id from the queue and return it
+        :param timeout: Seconds to wait for a track, None to wait until one is
+            enqueued or `wakeup` is called
+        :param cancel: Once set, no track is taken; it's checked before
+            waiting, so setting it and then calling `wakeup` can't be missed
+        :raises EmptyQueueException: if the queue is still empty after waiting,
+            or `cancel` is set
+        """
+        with self.lock:
+            return self._pop(timeout, cancel)
+
+    def peak(self) -> str:
+        """Returns the next track_id in the queue with removing it from the queue.
+        :raises EmptyQueueException: if the queue is empty
+        """
+        with self.lock:
+            try:
+                track_id = self.queue[0]
+            except IndexError as exc:
+                raise EmptyQueueException("queue is empty") from exc
+        return track_id
+
+    def position(self, entry_id: int) -> int:
+        """ Where an entry is in the queue
+        :returns: The entry's position, 1 is the next track to play
+        :raises EntryNotFoundException: if the entry isn't queued
+        """
+        with self.lock:
+            index = entry_id - self.head
+            if not 0 <= index < len(self.queue):
+                raise EntryNotFoundException(f"{entry_id} is not in the queue")
+        return index + 1
+
+    def _window(self, page: Optional[Page]) -> Tuple[int, int]:
+        """ The [start, end) indexes of a page, must be called holding the lock
+        :raises InvalidCursorException: if the page's cursor is invalid
+        """
+        total = len(self.queue)
+        if page is None:
+            return 0, total
+        size = max(page.size, 0)
+        cursor = None if page.cursor == "" else decode_cursor(page.cursor) - self.head
+        if page.before:
+            end = total if cursor is None else min(max(cursor, 0), total)
+            return max(end - size, 0), end
+        start = 0 if cursor is None else min(max(cursor + 1, 0), total)
+        return start, min(start + size, total)
+
+    def snapshot(self, page: Optional[Page] = None) -> PageResult[QueueEntry]:
+        """ List the queued tracks in play order.  Only the page's entries are
+        copied while the queue is locked.
+        :param page: Pagination options, the cursors hold entry ids
+        :returns: List of `QueueEntry`s
+        :raises InvalidCursorException: if the page's cursor is invalid
+        """
+        with self.lock:
+            start, end = self._window(page)
+            total = len(self.queue)
+            head = self.head
+            track_ids = self.queue.window(start, end)
+        entries = [
+            QueueEntry(head + index, track_id, index + 1)
+            for index, track_id in enumerate(track_ids, start)
+        ]
+        if not entries:
+            return PageResult(entries)
+        return PageResult(
+            entries,
+            next_cursor=encode_cursor(str(entries[-1].entry_id)) if end < total else "",
+            prev_cursor=encode_cursor(str(entries[0].entry_id)) if start > 0 else "",
+        )
+
+    def task_done(self) -> None:
+        """ Marks the last dequeued track as finished, there's nothing to
+        record for an in memory queue
+        """
+
+    def wakeup(self) -> None:
+        """ Interrupt every `deque` call currently waiting for a track
+        """
+        with self.lock:
+            self._wakeups += 1
+            self._ready.notify_all()
+
+
+__all__ = (
+    "Entries",
+    "ListQueue",
+)
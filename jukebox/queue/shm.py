@@ -0,0 +1,300 @@
+""" Queue shared between processes
+
+The queue is a fixed capacity ring buffer in a `multiprocessing.shared_memory`
+segment, so every API worker and the player process see the same queue
+without a separate service.  It's laid out as::
+
+    header | slot 0 | slot 1 | ... | slot capacity-1
+
+The header holds the entry ids of the front and back of the queue, and entry
+`n` lives in slot `n % capacity`.  Track ids are stored as their album and
+track numbers.  Changes are made holding an `fcntl.flock` on a lock file next
+to the segment, along with a thread lock since flock doesn't exclude threads
+sharing one file descriptor.
+
+There's no cross-process condition variable, so a waiting `deque` polls,
+backing off from `poll` to `max_poll` seconds between checks so an idle
+reader costs next to nothing.  It's woken straight away by an enqueue or
+`wakeup` from its own process.  Subscribers are likewise only told about
+enqueues made by their own process.
+"""
+
+import fcntl
+import os
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Callable
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from jukebox.service.cursor import decode_cursor
+from jukebox.service.cursor import encode_cursor
+from jukebox.service.data import Page
+from jukebox.service.data import PageResult
+from jukebox.service.data import QueueEntry
+from .exception import EmptyQueueException
+from .exception import EntryNotFoundException
+from .exception import QueueFullException
+
+# front entry id, next entry id, wakeup count, capacity
+HEADER = struct.Struct("<QQQI")
+# album number, track number
+SLOT = struct.Struct("<IH")
+
+
+def _tracker_name(shm: SharedMemory) -> str:
+    """ The name the resource tracker knows a segment by, which on POSIX has
+    the leading slash that `SharedMemory.name` leaves off
+    """
+    return f"/{shm.name}"
+
+
+def _pack(track_id: str) -> Tuple[int, int]:
+    album, _, track = track_id.partition("-")
+    if not (album.isdigit() and track.isdigit()):
+        raise ValueError(f"{track_id} is an invalid track id")
+    numbers = int(album), int(track)
+    if f"{numbers[0]:02d}-{numbers[1]:02d}" != track_id:
+        raise ValueError(f"{track_id} is an invalid track id")
+    return numbers
+
+
+class ShmQueue:
+    """ Queue of track ids in shared memory
+    :param url: Name of the segment, `shm://jukebox-queue`
+    :type url: str
+    :param max_size: Capacity of the ring buffer, used when the segment is created
+    :type max_size: int
+    :param poll: Seconds before the first check while waiting for another process
+    :type poll: float
+    :param max_poll: Longest wait between checks, the wait doubles up to it
+    :type max_poll: float
+    """
+    def __init__(self, url: str, max_size: int = 200, poll: float = 0.001,
+                 max_poll: float = 0.05) -> None:
+        self.url = url
+        self.name: str = self.url.replace("shm://", "")
+        self.poll: float = poll
+        self.max_poll: float = max(max_poll, poll)
+        self._lock = threading.Lock()
+        self._local = threading.Condition(threading.Lock())
+        self._subscribers: List[Callable[[], None]] = []
+        self._lock_fd = os.open(
+            os.path.join(tempfile.gettempdir(), f"{self.name}.lock"), os.O_RDWR | os.O_CREAT
+        )
+        with self._locked():
+            created = False
+            try:
+                self._shm = SharedMemory(self.name)
+            except FileNotFoundError:
+                created = True
+                if max_size <= 0:
+                    raise ValueError("a shared memory queue needs a max_size") from None
+                self._shm = SharedMemory(self.name, create=True,
+                                         size=HEADER.size + max_size * SLOT.size)
+            buf = self._shm.buf
+            if buf is None:
+                raise ValueError(f"{self.name} shared memory isn't mapped")
+            self._buf: memoryview = buf
+            if created:
+                HEADER.pack_into(self._buf, 0, 1, 1, 0, max_size)
+            # the segment belongs to every process using it, so it mustn't be
+            # removed when the one that happened to create it exits
+            resource_tracker.unregister(_tracker_name(self._shm), "shared_memory")
+        self.max_size: int = HEADER.unpack_from(self._buf)[3]
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        with self._lock:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _header(self) -> Tuple[int, int, int, int]:
+        return HEADER.unpack_from(self._buf)
+
+    def _set_ends(self, head: int, tail: int) -> None:
+        struct.pack_into("<QQ", self._buf, 0, head, tail)
+
+    def _slot(self, entry_id: int) -> int:
+        return HEADER.size + (entry_id % self.max_size) * SLOT.size
+
+    def _read(self, entry_id: int) -> str:
+        album, track = SLOT.unpack_from(self._buf, self._slot(entry_id))
+        return f"{album:02d}-{track:02d}"
+
+    def _notify(self) -> None:
+        with self._local:
+            self._local.notify_all()
+
+    def subscribe(self, callback: Callable[[], None]) -> None:
+        """ Call `callback` after this process enqueues tracks, from the
+        enqueuing thread, so it mustn't block
+        """
+        self._subscribers.append(callback)
+
+    def close(self) -> None:
+        """ Detach from the shared memory
+        """
+        self._shm.close()
+        os.close(self._lock_fd)
+
+    def unlink(self) -> None:
+        """ Remove the shared memory, once no process needs the queue
+        """
+        # unlink tells the resource tracker it's gone, so it has to know of it
+        resource_tracker.register(_tracker_name(self._shm), "shared_memory")
+        self._shm.unlink()
+
+    def __len__(self) -> int:
+        with self._locked():
+            head, tail = self._header()[:2]
+        return tail - head
+
+    def enque(self, track_id: str) -> int:
+        """ Adds a track_id to the queue
+        :returns: The entry id of the queued track
+        :raises QueueFullException: if the queue is full
+        """
+        return self.enque_many([track_id])[0]
+
+    def enque_many(self, track_ids: Iterable[str]) -> List[int]:
+        """ Adds several track_ids to the queue, either they all fit or none
+        of them are added
+        :returns: The entry ids of the queued tracks
+        :raises QueueFullException: if they don't all fit in the queue
+        """
+        packed = [_pack(track_id) for track_id in track_ids]
+        with self._locked():
+            head, tail = self._header()[:2]
+            if tail - head + len(packed) > self.max_size:
+                raise QueueFullException(
+                    f"queue is full at {self.max_size} tracks, {len(packed)} would not fit"
+                )
+            for entry_id, numbers in enumerate(packed, tail):
+                SLOT.pack_into(self._buf, self._slot(entry_id), *numbers)
+            self._set_ends(head, tail + len(packed))
+        self._notify()
+        for callback in self._subscribers:
+            callback()
+        return list(range(tail, tail + len(packed)))
+
+    def _pop(self) -> Optional[str]:
+        with self._locked():
+            head, tail = self._header()[:2]
+            if head == tail:
+                return None
+            track_id = self._read(head)
+            self._set_ends(head + 1, tail)
+        return track_id
+
+    def deque(self, timeout: Optional[float] = 0.0,
+              cancel: Optional[threading.Event] = None) -> str:
+        """ Remove the next track_id from the queue and return it
+        :param timeout: Seconds to wait for a track, None to wait until one is
+            enqueued or `wakeup` is called
+        :param cancel: Once set, no track is taken; it's checked before
+            waiting, so setting it and then calling `wakeup` can't be missed
+        :raises EmptyQueueException: if the queue is still empty after waiting,
+            or `cancel` is set
+        """
+        wakeups = self._header()[2]
+        deadline = None if timeout is None else time.monotonic() + timeout
+        poll = self.poll
+        while True:
+            if cancel is not None and cancel.is_set():
+                break
+            track_id = self._pop()
+            if track_id is not None:
+                return track_id
+            if self._header()[2] != wakeups:
+                break
+            wait = poll
+            if deadline is not None:
+                wait = min(wait, deadline - time.monotonic())
+                if wait <= 0:
+                    break
+            with self._local:
+                notified = self._local.wait(wait)
+            # the longer nothing happens the less often it's worth checking
+            poll = self.poll if notified else min(poll * 2, self.max_poll)
+        raise EmptyQueueException("queue is empty")
+
+    def peak(self) -> str:
+        """Returns the next track_id in the queue with removing it from the queue.
+        :raises EmptyQueueException: if the queue is empty
+        """
+        with self._locked():
+            head, tail = self._header()[:2]
+            if head == tail:
+                raise EmptyQueueException("queue is empty")
+            return self._read(head)
+
+    def position(self, entry_id: int) -> int:
+        """ Where an entry is in the queue
+        :returns: The entry's position, 1 is the next track to play
+        :raises EntryNotFoundException: if the entry isn't queued
+        """
+        with self._locked():
+            head, tail = self._header()[:2]
+        if not head <= entry_id < tail:
+            raise EntryNotFoundException(f"{entry_id} is not in the queue")
+        return entry_id - head + 1
+
+    def snapshot(self, page: Optional[Page] = None) -> PageResult[QueueEntry]:
+        """ List the queued tracks in play order
+        :param page: Pagination options, the cursors hold entry ids
+        :returns: List of `QueueEntry`s
+        :raises InvalidCursorException: if the page's cursor is invalid
+        """
+        cursor = None if page is None or page.cursor == "" else decode_cursor(page.cursor)
+        with self._locked():
+            head, tail = self._header()[:2]
+            start, end = head, tail
+            if page is not None:
+                size = max(page.size, 0)
+                if page.before:
+                    end = tail if cursor is None else min(max(cursor, head), tail)
+                    start = max(end - size, head)
+                else:
+                    start = head if cursor is None else min(max(cursor + 1, head), tail)
+                    end = min(start + size, tail)
+            entries = [
+                QueueEntry(entry_id, self._read(entry_id), entry_id - head + 1)
+                for entry_id in range(start, end)
+            ]
+        if not entries:
+            return PageResult(entries)
+        return PageResult(
+            entries,
+            next_cursor=encode_cursor(str(end - 1)) if end < tail else "",
+            prev_cursor=encode_cursor(str(start)) if start > head else "",
+        )
+
+    def task_done(self) -> None:
+        """ Marks the last dequeued track as finished, there's nothing to record
+        """
+
+    def wakeup(self) -> None:
+        """ Interrupt every `deque` call currently waiting for a track, in
+        every process
+        """
+        with self._locked():
+            head, tail, wakeups, capacity = self._header()
+            HEADER.pack_into(self._buf, 0, head, tail, wakeups + 1, capacity)
+        self._notify()
+
+
+__all__ = (
+    "ShmQueue",
+)
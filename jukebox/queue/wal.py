@@ -0,0 +1,252 @@
+""" Durable queue backed by an append-only log
+
+Every change to the queue is appended to the log as one line::
+
+    H <entry id>    the entry id of the first track enqueued after it
+    E <track id>    a track was enqueued
+    D               the front track was dequeued and started playing
+    C               the playing track completed
+
+Replaying the log rebuilds the queue along with the track that was playing.
+A track which was dequeued but never completed is put back at the front, so
+it's played again after a restart.
+
+Records are written to the file straight away, but the fsync is shared: a
+writer which finds another thread already syncing waits for it, and if that
+sync covered its record it's done without syncing again.  Enqueued tracks
+only join the queue once their records are synced, so a track can't be
+played or listed before it's durable, and if the sync fails they're dropped
+and the log is rewritten without them.  Once the log holds many more records
+than the queue has entries it's compacted by writing the current state to a
+new file and renaming it over the old one.
+"""
+
+import errno
+import logging
+import os
+import threading
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+from .exception import CorruptLogException
+from .memory import ListQueue
+
+LOGGER = logging.getLogger(__name__)
+
+
+class WalQueue(ListQueue):
+    """ Queue which logs every change to a file before acknowledging it
+    :param url: Location of the log, `file://path/to/queue.log`
+    :type url: str
+    :param max_size: Maximum number of queued tracks, 0 for no limit
+    :type max_size: int
+    :param sync: fsync the log before acknowledging a change
+    :type sync: bool
+    :param compact_after: Number of records the log may grow to before
+        it's compacted
+    :type compact_after: int
+    """
+    def __init__(self, url: str, max_size: int = 0, sync: bool = True,
+                 compact_after: int = 4096) -> None:
+        super().__init__(max_size)
+        self.url = url
+        self.path: str = self.url.replace("file://", "")
+        self.sync: bool = sync
+        self.compact_after: int = compact_after
+        # the track which has been dequeued but not completed
+        self.in_progress: Optional[str] = None
+        # number of fsyncs, shows how many writers shared each one
+        self.syncs: int = 0
+        self._sync_lock = threading.Lock()
+        self._written: int = 0
+        self._synced: int = 0
+        self._records: int = 0
+        # (sequence number, track id) of enqueued tracks waiting to be synced
+        self._staged: List[Tuple[int, str]] = []
+        # sequence numbers of enqueue records dropped by a failed sync
+        self._lost: Set[int] = set()
+        # a failed sync may have left dropped records in the log
+        self._rewrite: bool = False
+        self._replay()
+        if self.in_progress is not None:
+            LOGGER.info("requeueing interrupted track %s", self.in_progress)
+            self.queue.appendleft(self.in_progress)
+            self.head -= 1
+            self.in_progress = None
+        self._fd: int = -1
+        with self._sync_lock, self.lock:
+            self._compact()
+
+    def _replay(self) -> None:
+        """ Rebuild the queue from the log, ignoring a partly written last record
+        :raises CorruptLogException: if a record can't be replayed
+        """
+        try:
+            with open(self.path, "rb") as fo:
+                data = fo.read()
+        except FileNotFoundError:
+            return
+        lines = data.split(b"\n")
+        if lines[-1]:
+            LOGGER.warning("ignoring incomplete record at the end of %s", self.path)
+        for number, line in enumerate(lines[:-1], 1):
+            record = line.decode("utf-8")
+            if record.startswith("E "):
+                self.queue.append(record[2:])
+            elif record.startswith("H ") and record[2:].isdigit() and not self.queue:
+                self.head = int(record[2:])
+            elif record == "D" and self.queue:
+                self.in_progress = self._pop(0)
+            elif record == "C":
+                self.in_progress = None
+            else:
+                raise CorruptLogException(f"{self.path}:{number} bad record {record!r}")
+
+    def _append(self, record: str, count: int = 1) -> int:
+        """ Write records to the log, must be called holding the lock
+        :param record: One or more newline terminated records
+        :param count: The number of records
+        :returns: The last record's sequence number, to pass to `_wait_durable`
+        """
+        os.write(self._fd, record.encode("utf-8"))
+        self._records += count
+        self._written += count
+        return self._written
+
+    def _wait_durable(self, seq: int) -> None:
+        """ Wait until the record numbered `seq` has been synced, syncing it
+        along with everything written since if nobody else is, then move the
+        tracks the sync covered into the queue.  Compacts the log once it has
+        grown too long, or when a failed sync has left dropped records in it.
+        :raises OSError: if the record couldn't be synced, an enqueue record's
+            tracks are dropped along with every other unsynced one
+        """
+        with self._sync_lock:
+            if seq in self._lost:
+                self._lost.discard(seq)
+                raise OSError(errno.EIO, f"{self.path} could not be synced")
+            if self._synced >= seq:
+                return
+            try:
+                with self.lock:
+                    written = self._written
+                    compact = self._rewrite or self._records > max(
+                        self.compact_after, 2 * (self._length() + 1)
+                    )
+                    if compact:
+                        self._compact()
+                if self.sync and not compact:
+                    os.fsync(self._fd)
+                    self.syncs += 1
+            except OSError:
+                with self.lock:
+                    self._lost.update(number for number, _ in self._staged)
+                    self._staged.clear()
+                    self._rewrite = True
+                self._lost.discard(seq)
+                raise
+            self._synced = written
+            with self.lock:
+                durable = 0
+                while durable < len(self._staged) and self._staged[durable][0] <= written:
+                    durable += 1
+                self.queue.extend(track_id for _, track_id in self._staged[:durable])
+                del self._staged[:durable]
+                self._ready.notify(durable)
+
+    def _compact(self) -> None:
+        """ Replace the log with the records needed to rebuild the current
+        queue, must be called holding both locks
+        """
+        records = [f"H {self.head}\n"] + [f"E {track_id}\n" for track_id in self.queue]
+        records += [f"E {track_id}\n" for _, track_id in self._staged]
+        if self.in_progress is not None:
+            records[:1] = [f"H {self.head - 1}\n", f"E {self.in_progress}\n", "D\n"]
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fo:
+            fo.writelines(records)
+            fo.flush()
+            os.fsync(fo.fileno())
+        os.replace(tmp_path, self.path)
+        directory = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+        self.syncs += 1
+        if self._fd >= 0:
+            os.close(self._fd)
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND)
+        self._records = len(records)
+        self._synced = self._written
+        self._rewrite = False
+
+    def close(self) -> None:
+        """ Close the log, first rewriting it if a failed sync left dropped
+        records in it
+        """
+        with self._sync_lock, self.lock:
+            if self._fd < 0:
+                return
+            try:
+                if self._rewrite:
+                    self._compact()
+            finally:
+                os.close(self._fd)
+                self._fd = -1
+
+    def _length(self) -> int:
+        """ Number of queued tracks, counting those waiting to be synced
+        """
+        return len(self.queue) + len(self._staged)
+
+    def _stage(self, track_ids: List[str]) -> Tuple[int, int]:
+        """ Log tracks which are known to fit, they're held back from the
+        queue until the record is synced
+        :returns: The first track's entry id, and the record's sequence number
+        """
+        first = self.head + self._length()
+        seq = self._append("".join(f"E {track_id}\n" for track_id in track_ids), len(track_ids))
+        self._staged.extend((seq, track_id) for track_id in track_ids)
+        return first, seq
+
+    def _commit(self, ticket: int) -> None:
+        """ Wait until the staged tracks' record is durable
+        :raises OSError: if the record couldn't be synced, the tracks aren't queued
+        """
+        self._wait_durable(ticket)
+
+    def deque(self, timeout: Optional[float] = 0.0,
+              cancel: Optional[threading.Event] = None) -> str:
+        """ Remove the next track_id from the queue and return it, it stays
+        in progress until `task_done` is called
+        :param timeout: Seconds to wait for a track, None to wait until one is
+            enqueued or `wakeup` is called
+        :param cancel: Once set, no track is taken; it's checked before
+            waiting, so setting it and then calling `wakeup` can't be missed
+        :raises EmptyQueueException: if the queue is still empty after waiting,
+            or `cancel` is set
+        """
+        with self.lock:
+            track_id = self._pop(timeout, cancel)
+            self.in_progress = track_id
+            seq = self._append("D\n")
+        self._wait_durable(seq)
+        return track_id
+
+    def task_done(self) -> None:
+        """ Marks the in progress track as finished, so it isn't replayed
+        """
+        with self.lock:
+            if self.in_progress is None:
+                return
+            self.in_progress = None
+            seq = self._append("C\n")
+        self._wait_durable(seq)
+
+
+__all__ = (
+    "WalQueue",
+)
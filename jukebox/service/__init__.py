@@ -4,11 +4,14 @@
 from dataclasses import dataclass
 from typing import List
 from typing import Optional
+from typing import Tuple
 
 from jukebox import queue
 from jukebox.config import Config
 from jukebox.credit import NotEnoughCredits
+from .cursor import InvalidCursorException
 from .data import Album
+from .data import NowPlaying
 from .protocol import Credits
 from .protocol import CurrentTrack
 from .protocol import Discography
@@ -16,6 +19,8 @@ from .protocol import Queue
 from .data import Charge
 from .data import Track
 from .data import Page
+from .data import PageResult
+from .data import QueueEntry
 
 
 @dataclass
@@ -40,15 +45,20 @@ class Service:
         self.credits: Credits = cred
 
     def current_track(self) -> Optional[Track]:
-        """ Retrieves the currently playing track information
+        """ Retrieves the currently playing track information, as the player
+        published it
         :returns: The current track if one is playing
         :rtype: Track|None
         """
-        track_id = self.current.current_track_id()
-        track: Optional[Track] = None
-        if track_id != "":
-            track = self.discography.get_track(track_id)
-        return track
+        playing = self.current.now_playing()
+        return None if playing is None else playing.track
+
+    def now_playing(self) -> Optional[NowPlaying]:
+        """ Retrieves the currently playing track along with how far through
+        it playback is
+        :returns: The `NowPlaying` record if a track is playing
+        """
+        return self.current.now_playing()
 
     def next_track(self) -> Optional[Track]:
         """ Retrieves the next track in the queue.
@@ -61,19 +71,52 @@ class Service:
             return None
         return self.discography.get_track(track_id)
 
-    def list_albums(self, page: Optional[Page] = None) -> List[Album]:
+    def current_and_next_tracks(self) -> Tuple[Optional[Track], Optional[Track]]:
+        """ Retrieves the currently playing and next queued tracks, only the
+        next track needs a discography lookup
+        :returns: The current and next `Track`s, either may be `None`
+        """
+        return self.current_track(), self.next_track()
+
+    def list_albums(self, page: Optional[Page] = None) -> PageResult[Album]:
         """ Get the available albums
         :returns: List of `Album`s
         """
         return self.discography.get_albums(page)
 
-    def list_album_tracks(self, album_id: str, page: Optional[Page] = None) -> List[Track]:
+    def list_album_tracks(self, album_id: str, page: Optional[Page] = None) -> PageResult[Track]:
         """ Get the list of tracks in an album
         :param album_id: ID of the album to find tracks of
         :returns: list of `Track`s
         """
         return self.discography.get_album_tracks(album_id, page)
 
+    def search(self, query: str, page: Optional[Page] = None) -> PageResult[Track]:
+        """ Find tracks by their name, album title or artist
+        :param query: Words to search for
+        :returns: Ranked list of `Track`s
+        """
+        return self.discography.search(query, page)
+
+    def list_queue(self, page: Optional[Page] = None) -> PageResult[Tuple[QueueEntry, Track]]:
+        """ Get the queued tracks in play order, resolved with a single
+        discography lookup
+        :param page: Pagination options, the cursors hold entry ids
+        :returns: List of `QueueEntry`s with their `Track`s
+        :raises InvalidCursorException: if the page's cursor is invalid
+        """
+        entries = self.queue.snapshot(page)
+        tracks = self.discography.get_tracks(entry.track_id for entry in entries)
+        return entries.with_items(zip(entries, tracks))
+
+    def queue_position(self, entry_id: int) -> int:
+        """ Where a previously enqueued track is in the queue
+        :param entry_id: Id returned by `enqueue_track`
+        :returns: The position, 1 is the next track to play
+        :raises EntryNotFoundException: if the entry isn't queued anymore
+        """
+        return self.queue.position(entry_id)
+
     def add_balance(self, amount: Charge):
         """ Add track credits
         :param amount: The amount of money that was deposited
@@ -92,11 +135,13 @@ class Service:
         """
         return self.credits.get_credits()
 
-    def enqueue_track(self, track_id: str):
+    def enqueue_track(self, track_id: str) -> int:
         """ Put the given track into the playback queue
         :param track_id: ID of the Track to play
+        :returns: The entry id, for looking up its place in the queue
         :raises NoCreditsException: If the user does not have enough funds available.
         :raises NotFoundException: If the given track id cannot be found
+        :raises QueueFullException: If the queue is full, the credit is refunded
         """
         # validate the track exists
         self.discography.get_track(track_id)
@@ -106,11 +151,35 @@ class Service:
         except NotEnoughCredits as exc:
             raise NoCreditsException("not have enough funds available to queue track") from exc
         try:
-            self.queue.enque(track_id)
+            return self.queue.enque(track_id)
         except:
             self.credits.add_credits(1)
             raise
 
+    def enqueue_tracks(self, track_ids: List[str]) -> List[int]:
+        """ Put several tracks into the playback queue at once.  Either every
+        track is queued and paid for, or none are and nothing is charged.
+        :param track_ids: IDs of the Tracks to play, in order
+        :returns: The entry ids, in the same order
+        :raises NoCreditsException: If the user can't afford every track
+        :raises NotFoundException: If any of the track ids cannot be found
+        :raises QueueFullException: If they don't all fit, the credits are refunded
+        """
+        # validate every track exists before charging for any of them
+        self.discography.get_tracks(track_ids)
+        if not track_ids:
+            return []
+
+        try:
+            self.credits.remove_credits(len(track_ids))
+        except NotEnoughCredits as exc:
+            raise NoCreditsException("not have enough funds available to queue tracks") from exc
+        try:
+            return self.queue.enque_many(track_ids)
+        except:
+            self.credits.add_credits(len(track_ids))
+            raise
+
 
 
 def from_config(config: Config, disc: Discography, que: Queue, current: CurrentTrack,
@@ -131,5 +200,9 @@ __all__ = (
     "Album",
     "Track",
     "Page",
+    "NowPlaying",
+    "PageResult",
+    "QueueEntry",
     "NoCreditsException",
+    "InvalidCursorException",
 )
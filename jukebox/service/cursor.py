@@ -0,0 +1,44 @@
+""" Opaque pagination cursors, shared by the discography and the queue
+"""
+
+import base64
+import re
+from dataclasses import dataclass
+
+# cursors hold the id of the item they point at, its number is the last part
+CURSOR_REG = re.compile(r"^k:(?:\d+-)?(\d+)$")
+
+
+@dataclass
+class InvalidCursorException(Exception):
+    """ The pagination cursor is incorrectly formatted
+    """
+    message: str
+
+
+def encode_cursor(key: str) -> str:
+    """ Build an opaque cursor pointing at the item with the given key
+    :param key: Id of the last item seen, or its position for unkeyed results
+    """
+    return base64.urlsafe_b64encode(f"k:{key}".encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """ Find the number of the item a cursor points at, the last part of its id
+    :raises InvalidCursorException: if the cursor wasn't built by `encode_cursor`
+    """
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise InvalidCursorException(f"{cursor} is an invalid cursor") from exc
+    match = CURSOR_REG.match(payload)
+    if match is None:
+        raise InvalidCursorException(f"{cursor} is an invalid cursor")
+    return int(match.group(1))
+
+
+__all__ = (
+    "InvalidCursorException",
+    "decode_cursor",
+    "encode_cursor",
+)
@@ -3,10 +3,15 @@
 
 
 from dataclasses import dataclass
+from typing import Iterable
 from typing import List
+from typing import TypeVar
 
+T = TypeVar("T")
+U = TypeVar("U")
 
-@dataclass
+
+@dataclass(slots=True)
 class Track:
     """ Song, audio track, etc
     """
@@ -15,9 +20,11 @@ class Track:
     name: str
     duration: str
     url: str
+    # duration parsed once, when the catalog is loaded
+    seconds: int
 
 
-@dataclass
+@dataclass(slots=True)
 class Album:
     """ Album data
     """
@@ -28,6 +35,39 @@ class Album:
     tracks: List[Track]
 
 
+@dataclass(frozen=True, slots=True)
+class NowPlaying:
+    """ The track a player is playing, published by the player each time a
+    track starts
+    :param track: The playing track
+    :param started: When it started, on the player's clock
+    :param elapsed: Seconds played so far
+    :param remaining: Seconds left to play
+    """
+    track: Track
+    started: float
+    elapsed: float = 0.0
+    remaining: float = 0.0
+
+    def at(self, now: float) -> "NowPlaying":
+        """ The record with its progress worked out for the time `now`
+        """
+        elapsed = min(max(now - self.started, 0.0), float(self.track.seconds))
+        return NowPlaying(self.track, self.started, elapsed, self.track.seconds - elapsed)
+
+
+@dataclass(slots=True)
+class QueueEntry:
+    """ A track waiting in the playback queue
+    :param entry_id: Unique id given to the track when it was enqueued
+    :param track_id: Id of the queued track
+    :param position: Place in the queue, 1 is the next track to play
+    """
+    entry_id: int
+    track_id: str
+    position: int
+
+
 @dataclass
 class Charge:
     """ A charge to be converted into credits
@@ -48,3 +88,24 @@ class Page:
     cursor: str
     size: int
     before: bool
+
+
+class PageResult(List[T]):
+    """ A page of items, along with the opaque cursors of the pages either side
+    :param items: The items on the page
+    :param next_cursor: Cursor for the following page, empty on the last page
+    :param prev_cursor: Cursor for the preceding page, empty on the first page
+    """
+    def __init__(self, items: Iterable[T] = (), next_cursor: str = "",
+                 prev_cursor: str = "") -> None:
+        super().__init__(items)
+        self.next_cursor: str = next_cursor
+        self.prev_cursor: str = prev_cursor
+
+    def copy(self) -> "PageResult[T]":
+        return PageResult(self, self.next_cursor, self.prev_cursor)
+
+    def with_items(self, items: Iterable[U]) -> "PageResult[U]":
+        """ A page of different items with the same cursors
+        """
+        return PageResult(items, self.next_cursor, self.prev_cursor)
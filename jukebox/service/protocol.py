@@ -1,11 +1,15 @@
 """ Interfaces for the service module
 """
 
+from typing import Iterable
 from typing import List
 from typing import Optional
 from typing import Protocol
 from .data import Album
+from .data import NowPlaying
 from .data import Page
+from .data import PageResult
+from .data import QueueEntry
 from .data import Track
 
 
@@ -38,17 +42,22 @@ class CurrentTrack(Protocol):
         """ Return the currently playing track id
         """
 
+    def now_playing(self) -> Optional[NowPlaying]:
+        """ Return the currently playing track and its progress, without any
+        discography lookup
+        """
+
 
 class Discography(Protocol):
     """ Interface for getting information about available discography
     """
-    def get_albums(self, page: Optional[Page] = None) -> List[Album]:
+    def get_albums(self, page: Optional[Page] = None) -> PageResult[Album]:
         """ Get the list of available albums
         :param page: pagination options
         :rtype page: Page
         """
 
-    def get_album_tracks(self, album_id: str, page: Optional[Page] = None) -> List[Track]:
+    def get_album_tracks(self, album_id: str, page: Optional[Page] = None) -> PageResult[Track]:
         """ Get the list of tracks for the given album
         :param album_id: Id of the album to get tracks from
         :type album_id: str
@@ -64,15 +73,45 @@ class Discography(Protocol):
         :raises NotFoundException: if the track was not found for the given id
         """
 
+    def get_tracks(self, track_ids: Iterable[str]) -> List[Track]:
+        """ Get the information about several tracks in one lookup
+        :returns: The `Track`s, in the order of `track_ids`
+        :raises InvalidTrackIdException: if a track_id is incorrectly formatted
+        :raises NotFoundException: if a track was not found for its id
+        """
+
+    def search(self, query: str, page: Optional[Page] = None) -> PageResult[Track]:
+        """ Find tracks by their name, album title or artist
+        :param query: Words to search for
+        :type query: str
+        :param page: Pagination options
+        :rtype page: Page
+        """
+
 
 
 class Queue(Protocol):
     """ Interface for adding to and looking at a queue
     """
-    def enque(self, track_url: str):
+    def enque(self, track_url: str) -> int:
         """ Returns the next track id in the queue and removes it
         """
 
+    def enque_many(self, track_ids: Iterable[str]) -> List[int]:
+        """ Adds several track ids to the queue, all or none of them
+        :raises QueueFullException: if they don't all fit in the queue
+        """
+
     def peak(self) -> str:
         """ Returns the next track id in the queue without removing it
         """
+
+    def position(self, entry_id: int) -> int:
+        """ Returns where an entry is in the queue, 1 is the next track to play
+        :raises EntryNotFoundException: if the entry isn't queued
+        """
+
+    def snapshot(self, page: Optional[Page] = None) -> PageResult[QueueEntry]:
+        """ Returns a page of the queued tracks in play order
+        :raises InvalidCursorException: if the page's cursor is invalid
+        """
@@ -14,6 +14,20 @@ from jukebox.service.data import Charge
 
 LOGGER = logging.getLogger(__name__)
 
+def started(domain, clock, timeout=1.0):
+    """ Wait for the player to start a track at the current virtual time
+    :returns: The `NowPlaying` record, None if no track starts within
+        `timeout` real seconds
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        playing = domain.now_playing()
+        if playing is not None and playing.started == clock.monotonic():
+            return playing
+        time.sleep(0.01)
+    return None
+
+
 def main():
     conf = config.Config()
     conf.parse_env()
@@ -23,7 +37,8 @@ def main():
     # create the components
     repo = discography.from_config(conf)
     que = queue.from_config(conf)
-    play = player.from_config(conf, repo, que)
+    clock = player.VirtualClock()
+    play = player.from_config(conf, repo, que, clock)
     cred = credit.from_config(conf)
     domain = service.from_config(conf, repo, que, play, cred)
 
@@ -31,16 +46,15 @@ def main():
     albums = domain.list_albums()
     tracks = domain.list_album_tracks(albums[0].album_id)
     domain.add_balance(Charge(8, "usd"))
-    for i in range(9):
-        tracks[i].duration = "0:03"
-        domain.enqueue_track(tracks[i].track_id)
-
-    for i in range(60):
-        time.sleep(1)
-        match i:
-            case 20:
-                LOGGER.info(domain.current_track())
-                LOGGER.info(domain.next_track())
+    domain.enqueue_tracks([track.track_id for track in tracks[:9]])
+
+    # play the queue through on the virtual clock, checking in halfway
+    # through each track, so the demo doesn't sleep through the songs
+    while (playing := started(domain, clock)) is not None:
+        clock.advance(playing.remaining / 2)
+        LOGGER.info(domain.now_playing())
+        LOGGER.info(domain.next_track())
+        clock.advance(playing.remaining - playing.remaining / 2)
 
     play.stop()
     return True
@@ -17,9 +17,12 @@ class TestConfig:
         assert conf.discography.url == ""
         assert conf.discography.user_name == ""
         assert conf.discography.secret == ""
+        assert conf.discography.cache_size == 0
+        assert not conf.discography.snapshot
         assert conf.queue.url == "mem://in-memory-queue"
         assert conf.queue.max_size == 200
         assert conf.player.url == "local://test-player"
+        assert conf.player.media_root == ""
         assert conf.http.port == 80
         assert conf.http.host == "127.0.0.1"
 
@@ -28,9 +31,13 @@ class TestConfig:
         os.environ["JUKEBOX_DISCOGRAPHY_URL"] = "disc-url"
         os.environ["JUKEBOX_DISCOGRAPHY_USERNAME"] = "disc-user"
         os.environ["JUKEBOX_DISCOGRAPHY_SECRET"] = "disc-secret"
+        os.environ["JUKEBOX_DISCOGRAPHY_CACHESIZE"] = "500"
+        os.environ["JUKEBOX_DISCOGRAPHY_CACHETTL"] = "2.5"
+        os.environ["JUKEBOX_DISCOGRAPHY_SNAPSHOT"] = "true"
         os.environ["JUKEBOX_QUEUE_URL"] = "queue-url"
         os.environ["JUKEBOX_QUEUE_SIZE"] = "41"
         os.environ["JUKEBOX_PLAYER_URL"] = "player-url"
+        os.environ["JUKEBOX_PLAYER_MEDIAROOT"] = "/srv/music"
         os.environ["JUKEBOX_HTTP_PORT"] = "118"
         os.environ["JUKEBOX_HTTP_HOST"] = "http-host"
 
@@ -40,8 +47,12 @@ class TestConfig:
         assert conf.discography.url == "disc-url"
         assert conf.discography.user_name == "disc-user"
         assert conf.discography.secret == "disc-secret"
+        assert conf.discography.cache_size == 500
+        assert conf.discography.cache_ttl == 2.5
+        assert conf.discography.snapshot
         assert conf.queue.url == "queue-url"
         assert conf.queue.max_size == 41
         assert conf.player.url == "player-url"
+        assert conf.player.media_root == "/srv/music"
         assert conf.http.port == 118
         assert conf.http.host == "http-host"
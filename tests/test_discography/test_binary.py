@@ -0,0 +1,78 @@
+
+from pathlib import Path
+
+import pytest
+
+from jukebox import discography
+from jukebox.config import Config
+from jukebox.discography import JsonDiscography
+from jukebox.discography.binary import BinaryDiscography
+from jukebox.discography.binary import compile_json
+from jukebox.discography.common import encode_cursor
+from jukebox.service import Page
+
+SAMPLE = Path(__file__).parents[2] / "sample_data.json"
+
+
+@pytest.fixture
+def jbx_path(tmp_path):
+    path = tmp_path / "sample.jbx"
+    compile_json(str(SAMPLE), str(path))
+    return path
+
+
+def test_from_config(jbx_path):
+    conf = Config()
+    conf.discography.url = f"file://{jbx_path}"
+    assert isinstance(discography.from_config(conf), BinaryDiscography)
+
+
+def test_compile_bad_duration(tmp_path):
+    src = tmp_path / "bad.json"
+    src.write_text('{"albums": [{"title": "t", "artist": "a", "songs": [{"title": "s", "duration": "1.25"}]}]}')
+    with pytest.raises(discography.InvalidDurationException, match="01-01"):
+        compile_json(str(src), str(tmp_path / "bad.jbx"))
+    # nothing is left behind
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["bad.json"]
+
+
+def test_compile_missing_source(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        compile_json(str(tmp_path / "missing.json"), str(tmp_path / "missing.jbx"))
+    assert list(tmp_path.iterdir()) == []
+
+
+class TestBinaryDiscography:
+    @pytest.fixture
+    def repo(self, jbx_path):
+        return BinaryDiscography(f"file://{jbx_path}")
+
+    @pytest.fixture
+    def expect(self):
+        return JsonDiscography(f"file://{SAMPLE}", snapshot=False)
+
+    def test_get_albums(self, repo, expect):
+        assert repo.get_albums() == expect.get_albums()
+        page = Page(encode_cursor("3"), 4, False)
+        assert repo.get_albums(page) == expect.get_albums(page)
+
+    def test_get_album_tracks(self, repo, expect):
+        for bad in ["a", "1"]:
+            with pytest.raises(discography.InvalidAlbumIdException):
+                repo.get_album_tracks(bad)
+        for missing in ["00", "55", "001"]:
+            with pytest.raises(discography.NotFoundException):
+                repo.get_album_tracks(missing)
+        page = Page(encode_cursor("2"), 3, False)
+        assert repo.get_album_tracks("02", page) == expect.get_album_tracks("02", page)
+
+    def test_get_track(self, repo, expect):
+        with pytest.raises(discography.InvalidTrackIdException):
+            repo.get_track("1-01")
+        with pytest.raises(discography.NotFoundException, match="99-01 album not found"):
+            repo.get_track("99-01")
+        with pytest.raises(discography.NotFoundException, match="01-50 track not found"):
+            repo.get_track("01-50")
+        with pytest.raises(discography.NotFoundException, match="01-00 track not found"):
+            repo.get_track("01-00")
+        assert repo.get_track("03-02") == expect.get_track("03-02")
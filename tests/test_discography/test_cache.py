@@ -0,0 +1,167 @@
+
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from jukebox import discography
+from jukebox.config import Config
+from jukebox.discography import JsonDiscography
+from jukebox.discography.cache import CachedDiscography
+from jukebox.service import Page
+
+SAMPLE = Path(__file__).parents[2] / "sample_data.json"
+
+
+class CountingBackend:
+    """ Wraps a discography, counting calls and optionally slowing them down
+    """
+    def __init__(self, delay: float = 0.0):
+        self.disc = JsonDiscography(f"file://{SAMPLE}", snapshot=False)
+        self.delay = delay
+        self.calls = 0
+
+    def __getattr__(self, name):
+        method = getattr(self.disc, name)
+
+        def call(*args, **kwargs):
+            self.calls += 1
+            time.sleep(self.delay)
+            return method(*args, **kwargs)
+        return call
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_from_config():
+    conf = Config()
+    conf.discography.url = f"file://{SAMPLE}"
+    conf.discography.cache_size = 10
+    disc = discography.from_config(conf)
+    assert isinstance(disc, CachedDiscography)
+    assert isinstance(disc.backend, JsonDiscography)
+
+
+class TestCachedDiscography:
+    @pytest.fixture
+    def backend(self):
+        return CountingBackend()
+
+    @pytest.fixture
+    def clock(self):
+        return Clock()
+
+    @pytest.fixture
+    def cache(self, backend, clock):
+        return CachedDiscography(backend, max_size=3, ttl=10, negative_ttl=1, clock=clock)
+
+    def test_hit(self, cache, backend):
+        assert cache.get_track("01-01") == cache.get_track("01-01")
+        assert backend.calls == 1
+        assert cache.get_albums() == backend.disc.get_albums()
+        cache.get_albums()
+        assert backend.calls == 2
+        stats = cache.stats
+        assert (stats.hits, stats.misses) == (2, 2)
+
+    def test_page_cursors(self, cache):
+        page = cache.get_albums(Page("", 2, False))
+        assert page.next_cursor != ""
+        assert cache.get_albums(Page("", 2, False)).next_cursor == page.next_cursor
+
+    def test_ttl(self, cache, backend, clock):
+        cache.get_track("01-01")
+        clock.now = 9.9
+        cache.get_track("01-01")
+        assert backend.calls == 1
+        clock.now = 10
+        cache.get_track("01-01")
+        assert backend.calls == 2
+
+    def test_lru_eviction(self, cache, backend):
+        for track_id in ["01-01", "01-02", "01-03", "01-01", "01-04"]:
+            cache.get_track(track_id)
+        assert cache.stats.evictions == 1
+        assert len(cache) == 3
+        # 01-02 was the least recently used
+        cache.get_track("01-01")
+        assert backend.calls == 4
+        cache.get_track("01-02")
+        assert backend.calls == 5
+
+    def test_negative_cache(self, cache, backend, clock):
+        for _ in range(3):
+            with pytest.raises(discography.NotFoundException, match="01-50 track not found"):
+                cache.get_track("01-50")
+        assert backend.calls == 1
+        assert cache.stats.negative_hits == 2
+        clock.now = 1
+        with pytest.raises(discography.NotFoundException):
+            cache.get_track("01-50")
+        assert backend.calls == 2
+
+    def test_invalid_ids_not_cached(self, cache, backend):
+        for _ in range(2):
+            with pytest.raises(discography.InvalidTrackIdException):
+                cache.get_track("1-1")
+        assert backend.calls == 2
+
+    def test_get_tracks(self, cache, backend):
+        cache.get_track("01-01")
+        tracks = cache.get_tracks(["01-01", "01-02", "01-01"])
+        assert [t.track_id for t in tracks] == ["01-01", "01-02", "01-01"]
+        assert backend.calls == 2
+        cache.get_track("01-02")
+        assert backend.calls == 2
+
+    def test_coalesce_misses(self):
+        backend = CountingBackend(delay=0.2)
+        cache = CachedDiscography(backend)
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(cache.get_track("02-01")))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert backend.calls == 1
+        assert len(results) == 8
+        assert cache.stats.coalesced == 7
+
+    def test_get_tracks_negative_cache(self, cache, backend):
+        with pytest.raises(discography.NotFoundException):
+            cache.get_tracks(["01-01", "01-50"])
+        # the failed batch is retried one track at a time
+        assert backend.calls == 3
+        with pytest.raises(discography.NotFoundException):
+            cache.get_tracks(["01-01", "01-50"])
+        assert backend.calls == 3
+        assert cache.stats.negative_hits == 1
+
+    def test_get_tracks_coalesces_with_get_track(self):
+        backend = CountingBackend(delay=0.2)
+        cache = CachedDiscography(backend)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_track("02-01")))]
+        threads += [
+            threading.Thread(target=lambda: results.extend(cache.get_tracks(["02-01", "02-02"])))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+            time.sleep(0.02)
+        for thread in threads:
+            thread.join()
+        # one call for 02-01 and one batch for 02-02, the rest wait on them
+        assert backend.calls == 2
+        assert len(results) == 9
+        assert cache.stats.coalesced == 7
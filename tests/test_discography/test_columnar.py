@@ -0,0 +1,56 @@
+
+from pathlib import Path
+
+import pytest
+
+from jukebox import discography
+from jukebox.config import Config
+from jukebox.discography import JsonDiscography
+from jukebox.discography.columnar import ColumnarDiscography
+from jukebox.discography.common import encode_cursor
+from jukebox.service import Page
+
+SAMPLE = Path(__file__).parents[2] / "sample_data.json"
+
+
+def test_from_config():
+    conf = Config()
+    conf.discography.url = f"mem://{SAMPLE}"
+    assert isinstance(discography.from_config(conf), ColumnarDiscography)
+
+
+class TestColumnarDiscography:
+    @pytest.fixture
+    def repo(self):
+        return ColumnarDiscography(f"mem://{SAMPLE}")
+
+    @pytest.fixture
+    def expect(self):
+        return JsonDiscography(f"file://{SAMPLE}", snapshot=False)
+
+    def test_get_albums(self, repo, expect):
+        assert repo.get_albums() == expect.get_albums()
+        page = Page(encode_cursor("3"), 4, False)
+        assert repo.get_albums(page) == expect.get_albums(page)
+
+    def test_interned_artists(self, repo):
+        albums = repo.get_albums()
+        assert len(repo._artists) == len({a.artist for a in albums})
+        assert repo.track_count == sum(len(a.tracks) for a in albums)
+
+    def test_get_album_tracks(self, repo, expect):
+        with pytest.raises(discography.InvalidAlbumIdException):
+            repo.get_album_tracks("a")
+        with pytest.raises(discography.NotFoundException):
+            repo.get_album_tracks("55")
+        page = Page(encode_cursor("2"), 3, False)
+        assert repo.get_album_tracks("02", page) == expect.get_album_tracks("02", page)
+
+    def test_get_track(self, repo, expect):
+        with pytest.raises(discography.InvalidTrackIdException):
+            repo.get_track("1-01")
+        with pytest.raises(discography.NotFoundException, match="99-01 album not found"):
+            repo.get_track("99-01")
+        with pytest.raises(discography.NotFoundException, match="01-50 track not found"):
+            repo.get_track("01-50")
+        assert repo.get_track("03-02") == expect.get_track("03-02")
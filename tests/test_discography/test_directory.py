@@ -0,0 +1,184 @@
+
+import os
+import wave
+
+import pytest
+
+from jukebox import discography
+from jukebox.config import Config
+from jukebox.discography import DirectoryDiscography
+from jukebox.discography import InvalidTrackIdException
+from jukebox.discography import NotFoundException
+from jukebox.discography.directory import INDEX_NAME
+from jukebox.discography.directory import parse_track_name
+from jukebox.service import Page
+
+
+def write_wav(path, seconds, rate=100):
+    with wave.open(str(path), "wb") as fo:
+        fo.setnchannels(1)
+        fo.setsampwidth(1)
+        fo.setframerate(rate)
+        fo.writeframes(b"\x80" * (seconds * rate))
+
+
+@pytest.fixture
+def library(tmp_path):
+    first = tmp_path / "Beatles - Abbey Road"
+    first.mkdir()
+    write_wav(first / "02 Something.wav", 3)
+    write_wav(first / "01 - Come Together.wav", 2)
+    (first / "cover.jpg").write_bytes(b"")
+    second = tmp_path / "Queen - Jazz"
+    second.mkdir()
+    (second / "01 Mustapha.mp3").write_bytes(b"ID3")
+    (tmp_path / "Empty").mkdir()
+    return tmp_path
+
+
+def test_from_config(library):
+    conf = Config()
+    conf.discography.url = f"dir://{library}"
+    assert isinstance(discography.from_config(conf), DirectoryDiscography)
+
+
+@pytest.mark.parametrize("file_name,expect", [
+    ("01 Come Together.wav", (1, "Come Together")),
+    ("07 - Name.mp3", (7, "Name")),
+    ("12.Name.flac", (12, "Name")),
+    ("Untitled.wav", (100, "Untitled")),
+    ("1999.wav", (100, "1999")),
+])
+def test_parse_track_name(file_name, expect):
+    assert parse_track_name(file_name) == expect
+
+
+class TestDirectoryDiscography:
+    def test_scan(self, library):
+        repo = DirectoryDiscography(f"dir://{library}")
+        albums = repo.get_albums()
+        assert [(a.album_id, a.artist, a.title) for a in albums] == [
+            ("01", "Beatles", "Abbey Road"),
+            ("02", "Queen", "Jazz"),
+        ]
+        tracks = repo.get_album_tracks("01")
+        assert [(t.track_id, t.name, t.duration, t.seconds) for t in tracks] == [
+            ("01-01", "Come Together", "0:02", 2),
+            ("01-02", "Something", "0:03", 3),
+        ]
+        assert tracks[0].url == f"file://{library}/Beatles - Abbey Road/01 - Come Together.wav"
+        # the mp3 has no frames to read a duration from
+        assert repo.get_track("02-01").seconds == 0
+        assert repo.last_scan.files == 3
+        assert repo.last_scan.probed == 3
+
+    def test_lookups(self, library):
+        repo = DirectoryDiscography(f"dir://{library}")
+        assert [t.track_id for t in repo.get_tracks(["02-01", "01-02"])] == ["02-01", "01-02"]
+        with pytest.raises(InvalidTrackIdException):
+            repo.get_track("1-1")
+        with pytest.raises(NotFoundException):
+            repo.get_track("01-03")
+        with pytest.raises(NotFoundException):
+            repo.get_album_tracks("03")
+        assert [t.track_id for t in repo.search("something")] == ["01-02"]
+        page = repo.get_albums(Page("", 1, False))
+        assert [a.album_id for a in page] == ["01"]
+        assert [a.album_id for a in repo.get_albums(Page(page.next_cursor, 1, False))] == ["02"]
+
+    def test_incremental_rescan(self, library):
+        repo = DirectoryDiscography(f"dir://{library}")
+        assert (library / INDEX_NAME).exists()
+        report = repo.rescan()
+        assert (report.files, report.probed, report.removed) == (3, 0, 0)
+        # a new process reuses the index as well
+        assert DirectoryDiscography(f"dir://{library}").last_scan.probed == 0
+
+        album = library / "Beatles - Abbey Road"
+        write_wav(album / "02 Something.wav", 5)
+        stat = os.stat(album / "02 Something.wav")
+        os.utime(album / "02 Something.wav", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        os.remove(library / "Queen - Jazz" / "01 Mustapha.mp3")
+        report = repo.rescan()
+        assert (report.files, report.probed, report.removed) == (2, 1, 1)
+        assert repo.get_track("01-02").seconds == 5
+        assert [a.album_id for a in repo.get_albums()] == ["01"]
+
+    def test_parallel_scan(self, library):
+        repo = DirectoryDiscography(f"dir://{library}", workers=2, parallel_after=1)
+        assert [t.seconds for t in repo.get_album_tracks("01")] == [2, 3]
+
+    def test_unreadable_index(self, library):
+        (library / INDEX_NAME).write_text("{not json")
+        repo = DirectoryDiscography(f"dir://{library}")
+        assert repo.last_scan.probed == 3
+
+    def test_unreadable_durations_warn_per_format(self, library, caplog):
+        (library / "Queen - Jazz" / "02 Bicycle Race.mp3").write_bytes(b"")
+        (library / "Queen - Jazz" / "03 Jealousy.ogg").write_bytes(b"")
+        DirectoryDiscography(f"dir://{library}")
+        warnings = [r.getMessage() for r in caplog.records if "duration" in r.getMessage()]
+        assert len(warnings) == 2
+        assert "2 .mp3 file(s)" in warnings[0]
+        assert "1 .ogg file(s)" in warnings[1]
+
+    def test_ids_are_stable(self, library):
+        repo = DirectoryDiscography(f"dir://{library}")
+        write_wav(library / "Beatles - Abbey Road" / "00 Intro.wav", 1)
+        (library / "ABBA - Gold").mkdir()
+        write_wav(library / "ABBA - Gold" / "01 Waterloo.wav", 1)
+        repo.rescan()
+        assert [(a.album_id, a.title) for a in repo.get_albums()] == [
+            ("01", "Abbey Road"),
+            ("02", "Jazz"),
+            ("03", "Gold"),
+        ]
+        assert [(t.track_id, t.name) for t in repo.get_album_tracks("01")] == [
+            ("01-01", "Come Together"),
+            ("01-02", "Something"),
+            ("01-03", "Intro"),
+        ]
+
+        # removed ids aren't given out again
+        os.remove(library / "Queen - Jazz" / "01 Mustapha.mp3")
+        os.remove(library / "Beatles - Abbey Road" / "02 Something.wav")
+        repo.rescan()
+        (library / "Queen - News").mkdir()
+        write_wav(library / "Queen - News" / "01 We Will Rock You.wav", 1)
+        write_wav(library / "Beatles - Abbey Road" / "17 Her Majesty.wav", 1)
+        repo.rescan()
+        assert [a.album_id for a in repo.get_albums()] == ["01", "03", "04"]
+        assert [t.track_id for t in repo.get_album_tracks("01")] == ["01-01", "01-03", "01-04"]
+        with pytest.raises(NotFoundException, match="album not found"):
+            repo.get_track("02-01")
+        with pytest.raises(NotFoundException, match="track not found"):
+            repo.get_track("01-02")
+        # and a new process sees the same ids
+        again = DirectoryDiscography(f"dir://{library}")
+        assert again.get_track("04-01").name == "We Will Rock You"
+
+    def test_pages_across_removed_ids(self, library):
+        repo = DirectoryDiscography(f"dir://{library}")
+        (library / "ABBA - Gold").mkdir()
+        write_wav(library / "ABBA - Gold" / "01 Waterloo.wav", 1)
+        repo.rescan()
+        before_removal = repo.get_albums(Page("", 2, False))
+        os.remove(library / "Queen - Jazz" / "01 Mustapha.mp3")
+        repo.rescan()
+        first = repo.get_albums(Page("", 1, False))
+        assert [a.album_id for a in first] == ["01"]
+        second = repo.get_albums(Page(first.next_cursor, 1, False))
+        assert [a.album_id for a in second] == ["03"]
+        assert second.next_cursor == ""
+        assert [a.album_id for a in repo.get_albums(Page(second.prev_cursor, 1, True))] == ["01"]
+        # a cursor pointing at an album which has since been removed still works
+        stale = before_removal.next_cursor
+        assert [a.album_id for a in repo.get_albums(Page(stale, 1, False))] == ["03"]
+        assert [a.album_id for a in repo.get_albums(Page(stale, 1, True))] == ["01"]
+        assert [a.album_id for a in repo.get_albums(Page("", 5, True))] == ["01", "03"]
+
+    def test_old_index_is_rebuilt(self, library):
+        (library / INDEX_NAME).write_text('{"version": 1, "files": {}}')
+        repo = DirectoryDiscography(f"dir://{library}")
+        assert repo.last_scan.probed == 3
+        assert [a.album_id for a in repo.get_albums()] == ["01", "02"]
@@ -1,9 +1,16 @@
 
+import json
+import threading
+
 import pytest
 
 from jukebox import discography
 from jukebox.config import Config
 from jukebox.discography import JsonDiscography
+from jukebox.discography.common import format_duration
+from jukebox.discography.common import parse_duration
+from jukebox.discography.common import encode_cursor
+from jukebox.service import Page
 
 class TestFromConfig:
     def test_config_error(self):
@@ -25,6 +32,14 @@ class TestFromConfig:
         assert disc.url == f"file://{data_path}"
         assert len(disc.get_albums()) == 0
 
+    def test_invalid_duration(self, tmp_path):
+        data_path = tmp_path / "test.json"
+        data_path.write_text(
+            '{"albums":[{"title": "t", "artist": "a", "songs": [{"title": "s", "duration": "1.25"}]}]}'
+        )
+        with pytest.raises(discography.InvalidDurationException, match="01-01"):
+            JsonDiscography(f"file://{data_path}")
+
 class TestJsonDiscography:
     @pytest.fixture
     def repo(self, tmp_path):
@@ -84,7 +99,7 @@ class TestJsonDiscography:
     "songs": [
       {
         "title": "Pigs on the Wing, Part 1",
-        "duration": "1.25"
+        "duration": "1:25"
       },
       {
         "title": "Dogs",
@@ -111,6 +126,40 @@ class TestJsonDiscography:
         tracks = repo.get_album_tracks("01")
         assert len(tracks) == 6
 
+    def test_pagination(self, repo):
+        albums = repo.get_albums(Page(encode_cursor("01"), 1, False))
+        assert [a.album_id for a in albums] == ["02"]
+        albums = repo.get_albums(Page("", 5, False))
+        assert [a.album_id for a in albums] == ["01", "02", "03"]
+        assert repo.get_albums(Page(encode_cursor("10"), 5, False)) == []
+
+        tracks = repo.get_album_tracks("01", Page(encode_cursor("2"), 2, False))
+        assert [t.track_id for t in tracks] == ["01-03", "01-04"]
+        tracks = repo.get_album_tracks("01", Page(encode_cursor("4"), 2, True))
+        assert [t.track_id for t in tracks] == ["01-02", "01-03"]
+
+        with pytest.raises(discography.InvalidCursorException):
+            repo.get_albums(Page("2", 1, False))
+        with pytest.raises(discography.InvalidCursorException):
+            repo.get_albums(Page(encode_cursor("x"), 1, False))
+
+    def test_cursors(self, repo):
+        first = repo.get_albums(Page("", 2, False))
+        assert [a.album_id for a in first] == ["01", "02"]
+        assert first.prev_cursor == ""
+        second = repo.get_albums(Page(first.next_cursor, 2, False))
+        assert [a.album_id for a in second] == ["03"]
+        assert second.next_cursor == ""
+        back = repo.get_albums(Page(second.prev_cursor, 2, True))
+        assert [a.album_id for a in back] == ["01", "02"]
+        assert back.prev_cursor == ""
+        assert back.next_cursor == first.next_cursor
+
+        last = repo.get_album_tracks("01", Page("", 4, True))
+        assert [t.track_id for t in last] == ["01-03", "01-04", "01-05", "01-06"]
+        before = repo.get_album_tracks("01", Page(last.prev_cursor, 4, True))
+        assert [t.track_id for t in before] == ["01-01", "01-02"]
+
     def test_get_track(self, repo):
         bad = ["a", "10", "1-", "1-01", "1-1"]
         for b in bad:
@@ -121,4 +170,82 @@ class TestJsonDiscography:
 
         with pytest.raises(discography.NotFoundException, match="01-50 track not found"):
             repo.get_track("01-50")
-        repo.get_track("01-03")
+        with pytest.raises(discography.NotFoundException, match="01-00 track not found"):
+            repo.get_track("01-00")
+        assert repo.get_track("01-03").seconds == 296
+        assert repo.get_track("02-01").seconds == 516
+
+
+def test_parse_duration():
+    assert parse_duration("0:00") == 0
+    assert parse_duration("4:56") == 296
+    assert parse_duration("17:05") == 1025
+    assert parse_duration("1:02:03") == 3723
+    for bad in ["", "1.25", "1:5", "1:60", "a:bc", "-1:00"]:
+        with pytest.raises(discography.InvalidDurationException):
+            parse_duration(bad)
+    assert format_duration(1025) == "17:05"
+    assert format_duration(3723) == "1:02:03"
+
+
+class TestReload:
+    @staticmethod
+    def write(path, albums):
+        path.write_text(json.dumps({"albums": [
+            {"title": title, "artist": "a", "songs": [{"title": s, "duration": "1:00"} for s in songs]}
+            for title, songs in albums
+        ]}))
+
+    def test_reload(self, tmp_path):
+        path = tmp_path / "test.json"
+        self.write(path, [("one", ["a", "b"]), ("two", ["c"]), ("three", ["d"])])
+        repo = JsonDiscography(f"file://{path}")
+        first = repo.get_albums()[0]
+
+        self.write(path, [("one", ["a", "b"]), ("two", ["c", "e"])])
+        report = repo.reload()
+        assert report.added == []
+        assert report.removed == ["03"]
+        assert report.changed == ["02"]
+        assert report.old_tracks == 4
+        assert report.new_tracks == 4
+        # the unchanged album is shared, only the changed one is duplicated
+        assert report.overlap_tracks == 6
+        assert repo.get_albums()[0] is first
+        assert repo.get_track("02-02").name == "e"
+        with pytest.raises(discography.NotFoundException):
+            repo.get_track("03-01")
+        assert [t.track_id for t in repo.search("e")] == ["02-02"]
+
+    def test_readers_never_block(self, tmp_path):
+        path = tmp_path / "test.json"
+        self.write(path, [(f"album {n}", ["x", "y"]) for n in range(200)])
+        repo = JsonDiscography(f"file://{path}")
+        stop = threading.Event()
+        errors = []
+
+        def read():
+            while not stop.is_set():
+                try:
+                    assert len(repo.get_albums()) == 200
+                    repo.get_track("150-02")
+                except Exception as exc:  # pylint: disable=broad-except
+                    errors.append(exc)
+
+        reader = threading.Thread(target=read)
+        reader.start()
+        for _ in range(5):
+            repo.reload_in_background().join()
+        stop.set()
+        reader.join()
+        assert errors == []
+
+    def test_cursor_survives_reload(self, tmp_path):
+        path = tmp_path / "test.json"
+        self.write(path, [(f"album {n}", ["x"]) for n in range(5)])
+        repo = JsonDiscography(f"file://{path}")
+        first = repo.get_albums(Page("", 2, False))
+        self.write(path, [(f"album {n}", ["x"]) for n in range(6)])
+        repo.reload()
+        second = repo.get_albums(Page(first.next_cursor, 2, False))
+        assert [a.album_id for a in second] == ["03", "04"]
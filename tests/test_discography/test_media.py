@@ -0,0 +1,102 @@
+
+import struct
+import wave
+
+import pytest
+
+from jukebox.discography.media import probe
+
+
+def flac(seconds, rate=44100):
+    samples = seconds * rate
+    # sample rate, 2 channels, 16 bits per sample, then the sample count
+    packed = (rate << 44) | (1 << 41) | (15 << 36) | samples
+    info = struct.pack(">HH", 4096, 4096) + b"\0" * 6 + packed.to_bytes(8, "big") + b"\0" * 16
+    return b"fLaC" + bytes([0x80, 0, 0, len(info)]) + info
+
+
+def atom(kind, data):
+    return struct.pack(">I4s", 8 + len(data), kind) + data
+
+
+def mp4(seconds, version=0, scale=1000):
+    if version == 1:
+        header = struct.pack(">B3xQQIQ", 1, 0, 0, scale, seconds * scale)
+    else:
+        header = struct.pack(">B3xIIII", 0, 0, 0, scale, seconds * scale)
+    moov = atom(b"moov", atom(b"trak", b"") + atom(b"mvhd", header + b"\0" * 80))
+    # the movie header can come after the media data
+    return atom(b"ftyp", b"M4A \0\0\0\0") + atom(b"mdat", b"\0" * 64) + moov
+
+
+def mp3_frame(xing_frames=None):
+    # MPEG 1 layer III, 128kbit/s, 44.1kHz, stereo: 417 bytes a frame
+    frame = bytearray(b"\xff\xfb\x90\x00" + b"\0" * 413)
+    if xing_frames is not None:
+        frame[36:48] = b"Xing" + struct.pack(">II", 1, xing_frames)
+    return bytes(frame)
+
+
+def id3():
+    # a 200 byte tag, its size stored 7 bits to a byte
+    return b"ID3\x04\x00\x00\x00\x00\x01\x48" + b"\0" * 200
+
+
+def ogg_page(granule, packet=b""):
+    return (b"OggS\0\0" + struct.pack("<q", granule) + b"\0" * 12
+            + bytes([1, len(packet)]) + packet)
+
+
+def vorbis(seconds, rate=44100):
+    ident = b"\x01vorbis" + struct.pack("<IBI", 0, 2, rate) + b"\0" * 16
+    return ogg_page(0, ident) + ogg_page(seconds * rate // 2) + ogg_page(seconds * rate)
+
+
+def opus(seconds, pre_skip=312):
+    head = b"OpusHead" + struct.pack("<BBHI", 1, 2, pre_skip, 44100) + b"\0" * 3
+    return ogg_page(0, head) + ogg_page(seconds * 48000 + pre_skip)
+
+
+@pytest.mark.parametrize("name,data,seconds", [
+    ("a.flac", flac(183), 183),
+    ("a.m4a", mp4(241), 241),
+    ("a.mp4", mp4(241, version=1, scale=44100), 241),
+    # 16kB/s of constant bit rate frames
+    ("a.mp3", id3() + mp3_frame() * 157, 4),
+    # Xing frame counts are 1152 samples each
+    ("a.mp3", mp3_frame(xing_frames=10000) + mp3_frame(), 261),
+    ("a.ogg", vorbis(95), 95),
+    ("a.opus", opus(30), 30),
+])
+def test_probe(tmp_path, name, data, seconds):
+    path = tmp_path / name
+    path.write_bytes(data)
+    assert probe(str(path)) == seconds
+
+
+def test_probe_wav(tmp_path):
+    path = tmp_path / "a.wav"
+    with wave.open(str(path), "wb") as fo:
+        fo.setnchannels(1)
+        fo.setsampwidth(1)
+        fo.setframerate(100)
+        fo.writeframes(b"\x80" * 300)
+    assert probe(str(path)) == 3
+
+
+@pytest.mark.parametrize("name,data", [
+    ("a.flac", b"fLaC"),
+    ("a.m4a", atom(b"ftyp", b"")),
+    ("a.mp3", id3()),
+    ("a.ogg", b"OggS"),
+    ("a.wav", b"RIFF"),
+    ("a.wma", b"\0" * 100),
+])
+def test_probe_unreadable(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    assert probe(str(path)) == 0
+
+
+def test_probe_missing(tmp_path):
+    assert probe(str(tmp_path / "a.flac")) == 0
@@ -0,0 +1,153 @@
+
+from pathlib import Path
+
+import pytest
+
+from jukebox import discography
+from jukebox.discography import JsonDiscography
+from jukebox.discography.binary import BinaryDiscography
+from jukebox.discography.binary import compile_json
+from jukebox.discography.columnar import ColumnarDiscography
+from jukebox.discography.search import LazySearchIndex
+from jukebox.discography.search import SearchIndex
+from jukebox.discography.search import tokenize
+from jukebox.discography.sql import SqlDiscography
+from jukebox.discography.sql import import_json
+from jukebox.discography.common import encode_cursor
+from jukebox.service import Page
+
+SAMPLE = Path(__file__).parents[2] / "sample_data.json"
+
+
+def test_tokenize():
+    assert tokenize("I Still Haven't Found") == ["i", "still", "haven", "t", "found"]
+    assert tokenize("  ") == []
+
+
+class TestSearchIndex:
+    @pytest.fixture
+    def index(self):
+        index = SearchIndex()
+        index.add("01-01", "The Grudge", "Lateralus", "Tool")
+        index.add("01-02", "Lateralus", "Lateralus", "Tool")
+        index.add("02-01", "Dogs", "Animals", "Pink Floyd")
+        index.add("02-02", "Toolbox", "Animals", "Pink Floyd")
+        index.finish()
+        return index
+
+    def test_exact(self, index):
+        assert index.search("grudge") == ["01-01"]
+        assert index.search("DOGS") == ["02-01"]
+        assert index.search("") == []
+        assert index.search("missing") == []
+
+    def test_all_words_match(self, index):
+        assert index.search("pink dogs") == ["02-01"]
+        assert index.search("tool dogs") == []
+
+    def test_prefix(self, index):
+        assert index.search("floy") == ["02-01", "02-02"]
+        assert index.search("gru") == ["01-01"]
+        # only the word being typed is matched as a prefix
+        assert index.search("floy ") == []
+        assert index.search("pin floyd") == []
+
+    def test_ranking(self, index):
+        # a name match outranks an album title match
+        assert index.search("lateralus") == ["01-02", "01-01"]
+        # exact matches outrank prefix matches of the same field
+        index.add("03-01", "Grudges", "Other", "Someone")
+        index.finish()
+        assert index.search("grudge") == ["01-01", "03-01"]
+
+    def test_unfinished(self, index):
+        index.add("03-01", "Toolshed", "Other", "Someone")
+        # still correct, and searching doesn't change the index
+        assert index.search("tools") == ["03-01"]
+        assert index._vocabulary is None
+        index.finish()
+        assert index.search("tools") == ["03-01"]
+
+    def test_pages(self):
+        index = SearchIndex()
+        for number in range(1, 41):
+            # a few ties, which are ranked by their place in the catalog
+            index.add(f"01-{number:02d}", "Song" if number % 3 else "Other", "Song", "Band")
+        index.finish()
+        ranked = index.search("song")
+        assert len(ranked) == 40
+        assert ranked[:3] == ["01-01", "01-02", "01-04"]
+        first = index.search("song", Page("", 5, False))
+        assert first == ranked[:5]
+        assert first.prev_cursor == ""
+        middle = index.search("song", Page(first.next_cursor, 5, False))
+        assert middle == ranked[5:10]
+        back = index.search("song", Page(middle.prev_cursor, 5, True))
+        assert back == ranked[:5]
+        last = index.search("song", Page("", 5, True))
+        assert last == ranked[35:]
+        assert last.next_cursor == ""
+        assert index.search("song", Page(last.prev_cursor, 30, True)) == ranked[5:35]
+
+    def test_rare_word_narrows_common_one(self):
+        index = SearchIndex()
+        for number in range(1, 100):
+            index.add(f"01-{number:02d}", "Common", "Album", "Band")
+        index.add("02-01", "Common Rare", "Album", "Band")
+        index.add("02-02", "Rare", "Album", "Band")
+        index.finish()
+        assert index.search("rare common") == ["02-01"]
+        assert index.search("common rare") == ["02-01"]
+
+
+def test_lazy_index():
+    built = []
+
+    def albums():
+        built.append(1)
+        return JsonDiscography(f"file://{SAMPLE}", snapshot=False).get_albums()
+    index = LazySearchIndex(albums)
+    assert not built
+    assert index.search("joshua")[0] == "01-01"
+    index.search("joshua")
+    assert built == [1]
+    # an index saved with the wrong shape is rebuilt from the albums
+    assert LazySearchIndex(albums, ("wrong",)).search("joshua")[0] == "01-01"
+
+
+@pytest.fixture(params=["json", "columnar", "binary", "sql"])
+def repo(request, tmp_path):
+    match request.param:
+        case "json":
+            return JsonDiscography(f"file://{SAMPLE}", snapshot=False)
+        case "columnar":
+            return ColumnarDiscography(f"mem://{SAMPLE}")
+        case "binary":
+            path = tmp_path / "sample.jbx"
+            compile_json(str(SAMPLE), str(path))
+            return BinaryDiscography(f"file://{path}")
+        case "sql":
+            path = tmp_path / "sample.sql"
+            import_json(str(SAMPLE), str(path))
+            return SqlDiscography(f"file://{path}")
+
+
+def test_backend_search(repo):
+    tracks = repo.search("joshua")
+    assert len(tracks) == 11
+    assert tracks[0].track_id == "01-01"
+    assert [t.name for t in repo.search("streets name")] == ["Where The Streets Have No Name"]
+    page = repo.search("joshua", Page(encode_cursor("10"), 5, False))
+    assert [t.track_id for t in page] == ["01-11"]
+
+
+def test_get_tracks(repo):
+    ids = ["02-01", "01-03", "02-01", "15-02"]
+    assert repo.get_tracks(ids) == [repo.get_track(track_id) for track_id in ids]
+    assert repo.get_tracks([]) == []
+    with pytest.raises(discography.InvalidTrackIdException):
+        repo.get_tracks(["01-01", "1-1"])
+    with pytest.raises(discography.NotFoundException, match="99-01 album not found"):
+        repo.get_tracks(["01-01", "99-01"])
+    with pytest.raises(discography.NotFoundException, match="01-50 track not found"):
+        repo.get_tracks(["01-50", "01-01"])
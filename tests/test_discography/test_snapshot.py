@@ -0,0 +1,86 @@
+
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+from jukebox.discography import JsonDiscography
+from jukebox.discography import snapshot
+from jukebox.discography.snapshot import load_snapshot
+from jukebox.discography.snapshot import snapshot_path
+from jukebox.discography.snapshot import write_snapshot
+
+SAMPLE = Path(__file__).parents[2] / "sample_data.json"
+
+
+@pytest.fixture
+def json_path(tmp_path):
+    path = tmp_path / "catalog.json"
+    shutil.copy(SAMPLE, path)
+    return path
+
+
+def _touch(path, offset=10**9):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + offset))
+
+
+class TestSnapshot:
+    def test_round_trip(self, json_path):
+        assert load_snapshot(str(json_path)) == (None, None)
+        assert write_snapshot(str(json_path), {"albums": 1})
+        value, built_from = load_snapshot(str(json_path))
+        assert value == {"albums": 1}
+        assert built_from == snapshot.fingerprint(str(json_path))
+
+    def test_changed_source(self, json_path):
+        write_snapshot(str(json_path), "old")
+        _touch(json_path)
+        assert load_snapshot(str(json_path)) == (None, None)
+
+    def test_same_size_and_mtime(self, json_path):
+        write_snapshot(str(json_path), "old")
+        stat = os.stat(json_path)
+        data = json_path.read_bytes()
+        json_path.write_bytes(data.replace(b"Beatles", b"Beetles", 1))
+        os.utime(json_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        value, built_from = load_snapshot(str(json_path))
+        assert value is None
+        # the hash was computed, so it's handed back to save rehashing
+        assert built_from == snapshot.fingerprint(str(json_path))
+
+    def test_corrupt_snapshot(self, json_path):
+        write_snapshot(str(json_path), "old")
+        path = snapshot_path(str(json_path))
+        with open(path, "r+b") as fo:
+            fo.truncate(os.path.getsize(path) - 2)
+        assert load_snapshot(str(json_path))[0] is None
+
+    def test_unwritable_directory(self, json_path, monkeypatch):
+        monkeypatch.setattr(snapshot, "snapshot_path", lambda source: f"{source}/missing/x")
+        assert not write_snapshot(str(json_path), "value")
+
+
+class TestJsonDiscographySnapshot:
+    def test_loads_snapshot(self, json_path):
+        built = JsonDiscography(f"file://{json_path}", snapshot=True)
+        assert os.path.exists(snapshot_path(str(json_path)))
+        loaded = JsonDiscography(f"file://{json_path}", snapshot=True)
+        assert loaded.get_albums() == built.get_albums()
+        assert loaded.search("help") == built.search("help")
+        assert loaded.get_track("01-01") == built.get_track("01-01")
+
+    def test_rebuilds_when_changed(self, json_path):
+        JsonDiscography(f"file://{json_path}", snapshot=True)
+        json_path.write_text('{"albums":[{"artist":"A","title":"T","songs":[]}]}')
+        _touch(json_path)
+        repo = JsonDiscography(f"file://{json_path}", snapshot=True)
+        assert [a.artist for a in repo.get_albums()] == ["A"]
+        # and the new snapshot is used next time
+        loaded = JsonDiscography(f"file://{json_path}", snapshot=True)
+        assert [a.artist for a in loaded.get_albums()] == ["A"]
+
+    def test_off_by_default(self, json_path):
+        JsonDiscography(f"file://{json_path}")
+        assert not os.path.exists(snapshot_path(str(json_path)))
@@ -0,0 +1,123 @@
+
+import os
+import threading
+from pathlib import Path
+
+import pytest
+
+from jukebox import discography
+from jukebox.config import Config
+from jukebox.discography import JsonDiscography
+from jukebox.discography.sql import ConnectionPool
+from jukebox.discography.sql import SqlDiscography
+from jukebox.discography.sql import import_json
+from jukebox.discography.common import encode_cursor
+from jukebox.service import Page
+
+SAMPLE = Path(__file__).parents[2] / "sample_data.json"
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "sample.sql"
+    assert import_json(str(SAMPLE), str(path)) == (15, 224)
+    return path
+
+
+def test_from_config(db_path):
+    conf = Config()
+    conf.discography.url = f"file://{db_path}"
+    assert isinstance(discography.from_config(conf), SqlDiscography)
+
+    conf.discography.url = "file://missing.sql"
+    with pytest.raises(FileNotFoundError):
+        discography.from_config(conf)
+
+
+def test_import_is_atomic(tmp_path):
+    src = tmp_path / "bad.json"
+    src.write_text('{"albums": [{"title": "t", "artist": "a", "songs": [{"title": "s", "duration": "1.25"}]}]}')
+    with pytest.raises(discography.InvalidDurationException):
+        import_json(str(src), str(tmp_path / "bad.sql"))
+    assert list(tmp_path.iterdir()) == [src]
+
+
+def test_import_syncs_before_replacing(tmp_path, monkeypatch):
+    db_path = tmp_path / "sample.sql"
+    db_path.write_text("old")
+    synced = []
+    fsync = os.fsync
+
+    def sync(fd):
+        # the temporary file is synced while the old database is still in place
+        synced.append(db_path.read_bytes() == b"old")
+        fsync(fd)
+    monkeypatch.setattr(os, "fsync", sync)
+    import_json(str(SAMPLE), str(db_path))
+    assert synced == [True]
+
+    def fail(fd):
+        raise OSError("disk on fire")
+    monkeypatch.setattr(os, "fsync", fail)
+    with pytest.raises(OSError):
+        import_json(str(SAMPLE), str(tmp_path / "other.sql"))
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["sample.sql"]
+
+
+def test_connection_pool(db_path):
+    pool = ConnectionPool(str(db_path), size=2)
+    seen = set()
+
+    def work():
+        for _ in range(20):
+            with pool.connection() as conn:
+                seen.add(id(conn))
+                conn.execute("SELECT count(*) FROM tracks").fetchone()
+
+    threads = [threading.Thread(target=work) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(seen) <= 2
+    pool.close()
+
+
+class TestSqlDiscography:
+    @pytest.fixture
+    def repo(self, db_path):
+        return SqlDiscography(f"file://{db_path}")
+
+    @pytest.fixture
+    def expect(self):
+        return JsonDiscography(f"file://{SAMPLE}", snapshot=False)
+
+    def test_get_albums(self, repo, expect):
+        assert repo.get_albums() == expect.get_albums()
+        pages = [
+            Page(encode_cursor("3"), 4, False),
+            Page(encode_cursor("3"), 2, True),
+            Page(encode_cursor("14"), 5, False),
+            Page("", 4, True),
+        ]
+        for page in pages:
+            assert repo.get_albums(page) == expect.get_albums(page)
+
+    def test_get_album_tracks(self, repo, expect):
+        with pytest.raises(discography.InvalidAlbumIdException):
+            repo.get_album_tracks("a")
+        for missing in ["55", "001"]:
+            with pytest.raises(discography.NotFoundException):
+                repo.get_album_tracks(missing)
+        assert repo.get_album_tracks("02") == expect.get_album_tracks("02")
+        page = Page(encode_cursor("2"), 3, False)
+        assert repo.get_album_tracks("02", page) == expect.get_album_tracks("02", page)
+
+    def test_get_track(self, repo, expect):
+        with pytest.raises(discography.InvalidTrackIdException):
+            repo.get_track("1-01")
+        with pytest.raises(discography.NotFoundException, match="99-01 album not found"):
+            repo.get_track("99-01")
+        with pytest.raises(discography.NotFoundException, match="01-50 track not found"):
+            repo.get_track("01-50")
+        assert repo.get_track("03-02") == expect.get_track("03-02")
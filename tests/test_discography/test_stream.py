@@ -0,0 +1,71 @@
+
+import io
+import json
+from pathlib import Path
+
+import pytest
+
+from jukebox.discography import stream
+from jukebox.discography.stream import iter_albums
+
+SAMPLE = Path(__file__).parents[2] / "sample_data.json"
+
+
+class TestIterAlbums:
+    def test_empty(self):
+        assert list(iter_albums(io.StringIO("{}"))) == []
+        assert list(iter_albums(io.StringIO('{"albums": []}'))) == []
+
+    def test_small_chunks(self):
+        with open(SAMPLE, "r", encoding="utf-8") as fo:
+            expect = json.load(fo)["albums"]
+        with open(SAMPLE, "r", encoding="utf-8") as fo:
+            got = list(iter_albums(fo, chunk_size=7))
+        assert got == expect
+
+    def test_other_keys(self):
+        content = '{"version": 12345, "albums": [{"title": "a"}, {"title": "b"}], "extra": {"x": [1]}}'
+        got = list(iter_albums(io.StringIO(content), chunk_size=3))
+        assert got == [{"title": "a"}, {"title": "b"}]
+
+    def test_malformed(self):
+        with pytest.raises(json.JSONDecodeError):
+            list(iter_albums(io.StringIO('{"albums": [{"title": "a"}')))
+        with pytest.raises(json.JSONDecodeError):
+            list(iter_albums(io.StringIO('["albums"]')))
+
+    def test_malformed_fails_without_reading_on(self):
+        class CountingStream(io.StringIO):
+            reads = 0
+
+            def read(self, size=-1):
+                self.reads += 1
+                return super().read(size)
+
+        stream = CountingStream('{"albums": [{"title": x}, ' + '{"title": "a"}, ' * 10_000 + "]}")
+        with pytest.raises(json.JSONDecodeError):
+            list(iter_albums(stream, chunk_size=16))
+        assert stream.reads <= 2
+
+    @pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 7])
+    def test_values_split_across_chunks(self, chunk_size):
+        albums = [
+            {"title": "x" * 1000, "artist": "éè \\ \"quoted\"", "year": 1234567},
+            {"title": "", "songs": [True, False, None, -1.5e3]},
+        ]
+        content = json.dumps({"albums": albums}, ensure_ascii=True)
+        assert list(iter_albums(io.StringIO(content), chunk_size=chunk_size)) == albums
+
+    def test_long_value_is_parsed_a_few_times(self, monkeypatch):
+        calls = []
+        decoder = stream._DECODER
+
+        class CountingDecoder:
+            def raw_decode(self, s, idx=0):
+                calls.append(idx)
+                return decoder.raw_decode(s, idx)
+
+        monkeypatch.setattr(stream, "_DECODER", CountingDecoder())
+        content = json.dumps({"albums": [{"title": "x" * 1_000_000}]})
+        assert len(list(iter_albums(io.StringIO(content), chunk_size=64))) == 1
+        assert len(calls) < 50
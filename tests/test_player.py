@@ -1,10 +1,15 @@
 
+import subprocess
+import time
 from dataclasses import dataclass
+from dataclasses import field
 from typing import List
 
 import pytest
 
+from jukebox import discography
 from jukebox import player
+from jukebox import queue
 from jukebox.config import Config
 from jukebox.service import Track
 
@@ -14,7 +19,27 @@ class Finder:
     tracks: List[Track]
 
     def get_track(self, track_id: str) -> Track:
-        return [t for t in self.tracks if t.track_id == track_id][0]
+        for track in self.tracks:
+            if track.track_id == track_id:
+                return track
+        raise discography.NotFoundException(f"{track_id} track not found")
+
+
+@dataclass
+class CountingFinder(Finder):
+    calls: List[str] = field(default_factory=list)
+
+    def get_track(self, track_id: str) -> Track:
+        self.calls.append(track_id)
+        return super().get_track(track_id)
+
+
+class SlowQueue(queue.ListQueue):
+    """ Gets to waiting for a track late, so a stop can come before the wait
+    """
+    def deque(self, timeout=0.0, cancel=None):
+        time.sleep(0.2)
+        return super().deque(timeout, cancel)
 
 
 class TestFromConfig:
@@ -24,6 +49,23 @@ class TestFromConfig:
         with pytest.raises(player.ConfigurationException):
             player.from_config(conf, Finder(tracks=[]))
 
+    def test_proc_needs_a_queue(self):
+        conf = Config()
+        conf.player.url = "proc://cat > /dev/null"
+        with pytest.raises(player.ConfigurationException):
+            player.from_config(conf, Finder(tracks=[]))
+
+    def test_proc_media_root(self, tmp_path):
+        conf = Config()
+        conf.player.url = "proc://cat > /dev/null"
+        conf.player.media_root = str(tmp_path)
+        play = player.from_config(conf, Finder(tracks=[]), queue.ListQueue())
+        try:
+            assert isinstance(play, player.SubprocessPlayer)
+            assert play.media_root == str(tmp_path)
+        finally:
+            play.stop()
+
 
 class TestTestPlayer:
     # I'm skipping some tests for this player because of dealing with the threading
@@ -32,4 +74,343 @@ class TestTestPlayer:
     def test_current_track_id(self):
         player = player.TestPlayer()
         assert player.current_track_id is None
-    
\ No newline at end of file
+    
+
+    def test_plays_enqueued_track(self):
+        que = queue.ListQueue()
+        track = Track("01-01", "Track", "0:03", "file://01/01.mp4", 3)
+        play = player.TestPlayer(que, Finder(tracks=[track]))
+        play.start()
+        que.enque("01-01")
+        deadline = time.monotonic() + 1
+        while play.current_track_id() != "01-01" and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert play.current_track_id() == "01-01"
+        playing = play.now_playing()
+        assert playing.track == track
+        assert 0 <= playing.elapsed < 1
+        assert playing.elapsed + playing.remaining == 3
+        play.stop()
+        assert play.now_playing() is None
+
+    def test_stop_interrupts_wait(self):
+        play = player.TestPlayer(queue.ListQueue(), Finder(tracks=[]))
+        play.start()
+        time.sleep(0.05)
+        start = time.monotonic()
+        play.stop()
+        assert time.monotonic() - start < 0.5
+        assert play.task is None
+
+    def test_skip(self):
+        que = queue.ListQueue()
+        tracks = [
+            Track("01-01", "One", "5:00", "file://01/01.mp4", 300),
+            Track("01-02", "Two", "0:01", "file://01/02.mp4", 1),
+        ]
+        play = player.TestPlayer(que, Finder(tracks=tracks))
+        play.start()
+        que.enque_many(["01-01", "01-02"])
+        deadline = time.monotonic() + 1
+        while play.current_track_id() != "01-01" and time.monotonic() < deadline:
+            time.sleep(0.01)
+        play.skip()
+        deadline = time.monotonic() + 1
+        while play.current_track_id() != "01-02" and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert play.current_track_id() == "01-02"
+        # the one second track ends on time rather than on the next poll
+        start = time.monotonic()
+        while play.current_track_id() != "" and time.monotonic() - start < 2:
+            time.sleep(0.01)
+        assert time.monotonic() - start < 1.2
+        play.stop()
+
+    def test_stop_before_wait(self):
+        play = player.TestPlayer(SlowQueue(), Finder(tracks=[]))
+        play.start()
+        start = time.monotonic()
+        play.stop()
+        assert time.monotonic() - start < 0.2 + 0.5
+        assert play.task is None
+
+    def test_unknown_track_is_skipped(self):
+        que = queue.ListQueue()
+        track = Track("01-01", "One", "5:00", "file://01/01.mp4", 300)
+        play = player.TestPlayer(que, Finder(tracks=[track]))
+        play.start()
+        que.enque_many(["09-09", "01-01"])
+        assert _wait_for(lambda: play.current_track_id() == "01-01")
+        assert play.task.is_alive()
+        play.stop()
+
+    def test_stop_interrupts_track(self):
+        que = queue.ListQueue()
+        track = Track("01-01", "One", "5:00", "file://01/01.mp4", 300)
+        play = player.TestPlayer(que, Finder(tracks=[track]))
+        play.start()
+        que.enque("01-01")
+        time.sleep(0.05)
+        start = time.monotonic()
+        play.stop()
+        assert time.monotonic() - start < 0.5
+
+    def test_prefetch(self):
+        que = queue.ListQueue()
+        tracks = [Track(f"01-{n:02d}", "Track", "5:00", f"file://01/{n:02d}.mp4", 300)
+                  for n in range(1, 4)]
+        finder = CountingFinder(tracks=tracks)
+        play = player.TestPlayer(que, finder)
+        play.start()
+        que.enque("01-01")
+        assert _wait_for(lambda: play.current_track_id() == "01-01")
+        # enqueued while 01-01 plays, so it's looked up straight away
+        que.enque("01-02")
+        assert _wait_for(lambda: finder.calls.count("01-02") == 1)
+        play.skip()
+        assert _wait_for(lambda: play.current_track_id() == "01-02")
+        assert finder.calls.count("01-02") == 1
+
+        # the front of the queue changed, so the prefetch is redone
+        que.enque("01-03")
+        assert _wait_for(lambda: finder.calls.count("01-03") == 1)
+        que.deque()
+        que.enque("01-01")
+        assert _wait_for(lambda: finder.calls.count("01-01") == 2)
+        play.skip()
+        assert _wait_for(lambda: play.current_track_id() == "01-01")
+        play.stop()
+        metrics = play.metrics
+        assert metrics.transitions == 3
+        assert metrics.prefetch_hits == 2
+        assert metrics.hit_rate == pytest.approx(2 / 3)
+
+    def test_media_loader(self, tmp_path):
+        media = tmp_path / "01.mp4"
+        media.write_bytes(b"x" * 100)
+        loader = player.FileMediaLoader(max_bytes=10)
+        assert loader.load(f"file://{media}") == b"x" * 10
+        assert loader.load(f"file://{tmp_path}/missing.mp4") == b""
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+class TestPlayerPool:
+    @pytest.fixture
+    def pool(self):
+        pool = player.PlayerPool()
+        pool.start()
+        yield pool
+        pool.stop()
+
+    def test_plays_every_queue(self, pool):
+        tracks = [Track(f"01-{n:02d}", "Track", "0:00", f"file://01/{n:02d}.mp4", 0)
+                  for n in range(1, 4)]
+        queues = [queue.ListQueue() for _ in range(100)]
+        players = [pool.add(que, Finder(tracks=tracks)) for que in queues]
+        for play in players:
+            play.start()
+        for que in queues:
+            que.enque_many(["01-01", "01-02", "01-03"])
+        assert _wait_for(lambda: all(len(que.queue) == 0 for que in queues))
+        assert _wait_for(lambda: all(play.current_track_id() == "" for play in players))
+
+    def test_skip(self, pool):
+        tracks = [Track("01-01", "One", "5:00", "file://01/01.mp4", 300),
+                  Track("01-02", "Two", "5:00", "file://01/02.mp4", 300)]
+        que = queue.ListQueue()
+        play = pool.add(que, Finder(tracks=tracks))
+        play.start()
+        que.enque_many(["01-01", "01-02"])
+        assert _wait_for(lambda: play.current_track_id() == "01-01")
+        play.skip()
+        assert _wait_for(lambda: play.current_track_id() == "01-02")
+        play.skip()
+        assert _wait_for(lambda: play.current_track_id() == "")
+
+    def test_stop_player(self, pool):
+        track = Track("01-01", "One", "0:00", "file://01/01.mp4", 0)
+        que = queue.ListQueue()
+        play = pool.add(que, Finder(tracks=[track]))
+        que.enque("01-01")
+        time.sleep(0.05)
+        # not started, so nothing is played
+        assert len(que.queue) == 1
+        play.start()
+        assert _wait_for(lambda: len(que.queue) == 0)
+        play.stop()
+        que.enque("01-01")
+        time.sleep(0.05)
+        assert len(que.queue) == 1
+
+
+class TestVirtualClock:
+    def test_advance(self):
+        clock = player.VirtualClock()
+        clock.advance(1.5)
+        assert clock.monotonic() == 1.5
+        with pytest.raises(ValueError):
+            clock.advance(-1)
+
+    def test_test_player(self):
+        clock = player.VirtualClock(100.0)
+        tracks = [Track(f"01-{n:02d}", "Track", "5:00", f"file://01/{n:02d}.mp4", 300)
+                  for n in range(1, 3)]
+        que = queue.ListQueue()
+        play = player.TestPlayer(que, Finder(tracks=tracks), clock=clock)
+        play.start()
+        que.enque_many(["01-01", "01-02"])
+        assert _wait_for(lambda: play.current_track_id() == "01-01")
+        clock.advance(120)
+        now = play.now_playing()
+        assert (now.started, now.elapsed, now.remaining) == (100.0, 120.0, 180.0)
+        # real time passing doesn't end the track, only the clock does
+        time.sleep(0.05)
+        assert play.current_track_id() == "01-01"
+        clock.advance(180)
+        assert _wait_for(lambda: play.current_track_id() == "01-02")
+        assert play.now_playing().started == 400.0
+        play.stop()
+
+    def test_simulated_pool(self):
+        clock = player.VirtualClock()
+        pool = player.PlayerPool(clock)
+        tracks = [Track(f"01-{n:02d}", "Track", "5:00", f"file://01/{n:02d}.mp4", 300)
+                  for n in range(1, 4)]
+        que = queue.ListQueue()
+        play = pool.add(que, Finder(tracks=tracks))
+        play.start()
+        assert pool.run_pending() == 1
+        assert pool.next_deadline() is None
+
+        que.enque_many(["01-01", "01-02", "01-03"])
+        pool.run_pending()
+        assert play.current_track_id() == "01-01"
+        assert pool.next_deadline() == 300
+        clock.advance(299)
+        pool.run_pending()
+        assert play.current_track_id() == "01-01"
+        playing = play.now_playing()
+        assert playing.track.track_id == "01-01"
+        assert (playing.started, playing.elapsed, playing.remaining) == (0, 299, 1)
+        clock.advance(1)
+        pool.run_pending()
+        assert play.current_track_id() == "01-02"
+        play.skip()
+        pool.run_pending()
+        assert play.current_track_id() == "01-03"
+        clock.advance(300)
+        pool.run_pending()
+        assert play.current_track_id() == ""
+        assert play.now_playing() is None
+
+
+class TestSubprocessPlayer:
+    @pytest.fixture
+    def tracks(self, tmp_path):
+        tracks = []
+        for n in range(1, 4):
+            (tmp_path / "01").mkdir(exist_ok=True)
+            (tmp_path / "01" / f"{n:02d}.mp4").write_bytes(bytes([n]) * (n * 300_000))
+            tracks.append(Track(f"01-{n:02d}", "Track", "0:01", f"file://01/{n:02d}.mp4", 1))
+        return tracks
+
+    @pytest.mark.parametrize("zero_copy", [True, False])
+    def test_streams_media_to_sink(self, tmp_path, tracks, zero_copy):
+        out = tmp_path / "out"
+        que = queue.ListQueue()
+        play = player.SubprocessPlayer(que, Finder(tracks=tracks), f"cat > {out}",
+                                       media_root=str(tmp_path), chunk_size=1 << 16,
+                                       zero_copy=zero_copy)
+        play.start()
+        que.enque_many(["01-01", "01-02", "01-03"])
+        assert _wait_for(lambda: play.metrics.tracks == 3)
+        play.stop()
+        assert out.read_bytes() == b"".join(
+            (tmp_path / "01" / f"{n:02d}.mp4").read_bytes() for n in range(1, 4)
+        )
+        # one sink for every track
+        assert play.metrics.restarts == 1
+        assert play.metrics.bytes == 1_800_000
+
+    def test_missing_media_is_skipped(self, tmp_path, tracks):
+        que = queue.ListQueue()
+        missing = Track("02-01", "Missing", "0:01", "file://02/01.mp4", 1)
+        play = player.SubprocessPlayer(que, Finder(tracks=tracks + [missing]), "cat > /dev/null",
+                                       media_root=str(tmp_path))
+        play.start()
+        que.enque_many(["02-01", "01-01"])
+        assert _wait_for(lambda: play.metrics.tracks == 1)
+        assert len(que.queue) == 0
+        play.stop()
+
+    def test_unreadable_media_is_skipped(self, tmp_path, tracks):
+        que = queue.ListQueue()
+        # a directory where the media should be can't be opened to stream
+        folder = Track("01-00", "Folder", "0:01", "file://01", 1)
+        play = player.SubprocessPlayer(que, Finder(tracks=tracks + [folder]), "cat > /dev/null",
+                                       media_root=str(tmp_path))
+        play.start()
+        que.enque_many(["01-00", "01-01"])
+        assert _wait_for(lambda: play.metrics.tracks == 1)
+        assert play.task.is_alive()
+        play.stop()
+
+    def test_sink_failing_to_start_is_skipped(self, tmp_path, tracks, monkeypatch):
+        que = queue.ListQueue()
+        play = player.SubprocessPlayer(que, Finder(tracks=tracks), "cat > /dev/null",
+                                       media_root=str(tmp_path))
+        popen = subprocess.Popen
+        failures = [PermissionError("not allowed")]
+
+        def start(*args, **kwargs):
+            if failures:
+                raise failures.pop()
+            return popen(*args, **kwargs)
+        monkeypatch.setattr(subprocess, "Popen", start)
+        play.start()
+        que.enque_many(["01-01", "01-02"])
+        assert _wait_for(lambda: play.metrics.tracks == 1)
+        assert play.task.is_alive()
+        play.stop()
+
+    def test_unknown_track_is_skipped(self, tmp_path, tracks):
+        que = queue.ListQueue()
+        play = player.SubprocessPlayer(que, Finder(tracks=tracks), "cat > /dev/null",
+                                       media_root=str(tmp_path))
+        play.start()
+        que.enque_many(["09-09", "01-01"])
+        assert _wait_for(lambda: play.metrics.tracks == 1)
+        assert play.task.is_alive()
+        play.stop()
+
+    def test_restarts_exited_sink(self, tmp_path, tracks):
+        que = queue.ListQueue()
+        play = player.SubprocessPlayer(que, Finder(tracks=tracks), "true",
+                                       media_root=str(tmp_path), chunk_size=1 << 12)
+        play.start()
+        que.enque_many(["01-01", "01-02"])
+        assert _wait_for(lambda: len(que.queue) == 0 and play.current_track_id() == "")
+        play.stop()
+        assert play.metrics.restarts >= 2
+
+    def test_stop_before_wait(self):
+        play = player.SubprocessPlayer(SlowQueue(), Finder(tracks=[]), "cat > /dev/null")
+        play.start()
+        start = time.monotonic()
+        play.stop()
+        assert time.monotonic() - start < 0.2 + 0.5
+
+    def test_stop_without_tracks(self):
+        play = player.SubprocessPlayer(queue.ListQueue(), Finder(tracks=[]), "cat > /dev/null")
+        play.start()
+        time.sleep(0.05)
+        start = time.monotonic()
+        play.stop()
+        assert time.monotonic() - start < 0.5
+        assert play.process is None
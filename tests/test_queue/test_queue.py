@@ -0,0 +1,176 @@
+import threading
+import time
+
+import pytest
+
+from jukebox.config import Config
+from jukebox import discography
+from jukebox import queue
+from jukebox.service import Page
+from jukebox.service import QueueEntry
+from jukebox.service.cursor import encode_cursor
+
+
+class TestFromConfig:
+    def test_unknown_config(self):
+        conf = Config()
+        conf.queue.url = "unknown://thing"
+        with pytest.raises(queue.ConfigurationException):
+            queue.from_config(conf)
+
+    def test_list_queue(self):
+        conf = Config()
+        conf.queue.url = "mem://in-memory-queue"
+        conf.queue.max_size = 5
+        que = queue.from_config(conf)
+        assert isinstance(que, queue.ListQueue)
+        assert que.max_size == 5
+
+
+class TestListQueue:
+    @pytest.fixture
+    def que(self):
+        return queue.ListQueue()
+
+    def test_enque(self, que):
+        track_id = "01-01"
+        que.enque(track_id)
+        assert len(que.queue) == 1
+
+    def test_deque(self, que):
+        with pytest.raises(queue.EmptyQueueException):
+            que.deque()
+
+        que.enque("01-01")
+        que.enque("01-02")
+        que.enque("02-03")
+        assert que.deque() == "01-01"
+        assert que.deque() == "01-02"
+        assert que.deque() == "02-03"
+
+    def test_peak(self, que):
+        with pytest.raises(queue.EmptyQueueException):
+            que.peak()
+        
+        que.enque("01-01")
+        que.enque("02-01")
+        assert que.peak() == "01-01"
+        assert que.peak() == "01-01"
+
+    def test_max_size(self):
+        que = queue.ListQueue(max_size=2)
+        que.enque("01-01")
+        que.enque("01-02")
+        with pytest.raises(queue.QueueFullException):
+            que.enque("01-03")
+        assert que.deque() == "01-01"
+        que.enque("01-03")
+        assert list(que.queue) == ["01-02", "01-03"]
+
+    def test_deque_timeout(self, que):
+        start = time.monotonic()
+        with pytest.raises(queue.EmptyQueueException):
+            que.deque(timeout=0.05)
+        assert time.monotonic() - start >= 0.05
+
+    def test_deque_waits_for_enque(self, que):
+        timer = threading.Timer(0.05, que.enque, ("01-01",))
+        timer.start()
+        assert que.deque(timeout=5) == "01-01"
+        timer.join()
+
+    def test_wakeup(self, que):
+        timer = threading.Timer(0.05, que.wakeup)
+        timer.start()
+        with pytest.raises(queue.EmptyQueueException):
+            que.deque(timeout=None)
+        timer.join()
+
+    def test_cancel_before_wait(self, que):
+        # a cancel that comes before the wait starts isn't missed
+        cancel = threading.Event()
+        cancel.set()
+        que.wakeup()
+        que.enque("01-01")
+        with pytest.raises(queue.EmptyQueueException):
+            que.deque(timeout=None, cancel=cancel)
+        assert que.peak() == "01-01"
+
+    def test_entry_ids(self, que):
+        assert que.enque("01-01") == 1
+        assert que.enque("01-02") == 2
+        assert que.enque("01-03") == 3
+        assert que.position(2) == 2
+        que.deque()
+        assert que.position(2) == 1
+        assert que.position(3) == 2
+        with pytest.raises(queue.EntryNotFoundException):
+            que.position(1)
+        with pytest.raises(queue.EntryNotFoundException):
+            que.position(4)
+
+    def test_snapshot(self, que):
+        for number in range(1, 8):
+            que.enque(f"01-{number:02d}")
+        que.deque()
+        assert que.snapshot() == [
+            QueueEntry(number, f"01-{number:02d}", number - 1) for number in range(2, 8)
+        ]
+
+        first = que.snapshot(Page("", 4, False))
+        assert [entry.entry_id for entry in first] == [2, 3, 4, 5]
+        assert first.prev_cursor == ""
+        # cursors are entry ids, so they still work once the queue has moved on
+        que.deque()
+        second = que.snapshot(Page(first.next_cursor, 4, False))
+        assert [entry.entry_id for entry in second] == [6, 7]
+        assert [entry.position for entry in second] == [4, 5]
+        assert second.next_cursor == ""
+        back = que.snapshot(Page(second.prev_cursor, 4, True))
+        assert [entry.entry_id for entry in back] == [3, 4, 5]
+        assert back.prev_cursor == ""
+        last = que.snapshot(Page("", 2, True))
+        assert [entry.entry_id for entry in last] == [6, 7]
+
+    def test_snapshot_after_many_deques(self, que):
+        # enough dequeues that the dequeued entries are dropped from storage
+        for number in range(3000):
+            que.enque(f"{number // 100:02d}-{number % 100:02d}")
+        for _ in range(2500):
+            que.deque()
+        page = que.snapshot(Page(encode_cursor("2749"), 3, False))
+        assert page == [
+            QueueEntry(2750, "27-49", 250),
+            QueueEntry(2751, "27-50", 251),
+            QueueEntry(2752, "27-51", 252),
+        ]
+        assert que.peak() == "25-00"
+        assert que.position(3000) == 500
+
+    def test_entries(self):
+        entries = queue.memory.Entries(["01-01", "01-02"])
+        entries.appendleft("01-00")
+        entries.extend(["01-03", "01-04"])
+        assert entries.popleft() == "01-00"
+        entries.appendleft("00-01")
+        assert list(entries) == ["00-01", "01-01", "01-02", "01-03", "01-04"]
+        assert entries[4] == "01-04"
+        assert entries.window(1, 3) == ["01-01", "01-02"]
+        with pytest.raises(IndexError):
+            entries[5]  # pylint: disable=pointless-statement
+
+    def test_snapshot_invalid_cursor(self, que):
+        with pytest.raises(queue.InvalidCursorException):
+            que.snapshot(Page("abc", 4, False))
+        # cursors are opaque, a bare entry id isn't one
+        que.enque("01-01")
+        with pytest.raises(discography.InvalidCursorException):
+            que.snapshot(Page("1", 4, False))
+
+    def test_enque_many(self):
+        que = queue.ListQueue(max_size=4)
+        que.enque("01-01")
+        assert que.enque_many(["01-02", "01-03"]) == [2, 3]
+        with pytest.raises(queue.QueueFullException):
+            que.enque_many(["02-01", "02-02"])
+        assert list(que.queue) == ["01-01", "01-02", "01-03"]
@@ -0,0 +1,117 @@
+import multiprocessing
+import os
+import threading
+
+import pytest
+
+from jukebox.config import Config
+from jukebox import queue
+from jukebox.service import Page
+
+
+@pytest.fixture
+def url():
+    return f"shm://jukebox-test-{os.getpid()}"
+
+
+@pytest.fixture
+def que(url):
+    que = queue.ShmQueue(url, max_size=4)
+    yield que
+    que.unlink()
+    que.close()
+
+
+def _enque(url, track_ids):
+    que = queue.ShmQueue(url)
+    que.enque_many(track_ids)
+    que.close()
+
+
+class TestFromConfig:
+    def test_shm_queue(self, url):
+        conf = Config()
+        conf.queue.url = url
+        que = queue.from_config(conf)
+        assert isinstance(que, queue.ShmQueue)
+        assert que.max_size == conf.queue.max_size
+        que.unlink()
+        que.close()
+
+
+class TestShmQueue:
+    def test_deque(self, que):
+        with pytest.raises(queue.EmptyQueueException):
+            que.deque()
+        assert que.enque("01-01") == 1
+        assert que.enque("123-02") == 2
+        assert que.peak() == "01-01"
+        assert que.deque() == "01-01"
+        assert que.deque() == "123-02"
+        assert len(que) == 0
+
+    def test_invalid_track_id(self, que):
+        with pytest.raises(ValueError):
+            que.enque("1-1")
+
+    def test_wraps_around(self, que):
+        for number in range(1, 11):
+            que.enque(f"01-{number:02d}")
+            assert que.deque() == f"01-{number:02d}"
+
+    def test_max_size(self, que):
+        que.enque_many(["01-01", "01-02", "01-03"])
+        with pytest.raises(queue.QueueFullException):
+            que.enque_many(["01-04", "01-05"])
+        que.enque("01-04")
+        with pytest.raises(queue.QueueFullException):
+            que.enque("01-05")
+
+    def test_positions(self, que):
+        que.enque_many(["01-01", "01-02", "01-03", "01-04"])
+        que.deque()
+        assert que.position(3) == 2
+        with pytest.raises(queue.EntryNotFoundException):
+            que.position(1)
+        page = que.snapshot(Page("", 2, False))
+        assert [(entry.entry_id, entry.track_id) for entry in page] == [(2, "01-02"), (3, "01-03")]
+        page = que.snapshot(Page(page.next_cursor, 2, False))
+        assert [entry.position for entry in page] == [3]
+        assert page.next_cursor == ""
+        with pytest.raises(queue.InvalidCursorException):
+            que.snapshot(Page("3", 2, False))
+
+    def test_shared_between_processes(self, url, que):
+        process = multiprocessing.get_context("spawn").Process(
+            target=_enque, args=(url, ["02-01", "02-02"])
+        )
+        process.start()
+        assert que.deque(timeout=10) == "02-01"
+        process.join()
+        assert que.deque() == "02-02"
+
+    def test_wakeup(self, que):
+        timer = threading.Timer(0.05, que.wakeup)
+        timer.start()
+        with pytest.raises(queue.EmptyQueueException):
+            que.deque(timeout=None)
+        timer.join()
+
+    def test_cancel_before_wait(self, que):
+        # a cancel that comes before the wait starts isn't missed
+        cancel = threading.Event()
+        cancel.set()
+        que.wakeup()
+        que.enque("01-01")
+        with pytest.raises(queue.EmptyQueueException):
+            que.deque(timeout=None, cancel=cancel)
+        assert que.peak() == "01-01"
+
+    def test_idle_wait_backs_off(self, que, monkeypatch):
+        checks = []
+        pop = que._pop
+        monkeypatch.setattr(que, "_pop", lambda: checks.append(1) or pop())
+        with pytest.raises(queue.EmptyQueueException):
+            que.deque(timeout=0.5)
+        # polling every millisecond would have checked about 500 times
+        assert len(checks) < 30
@@ -0,0 +1,148 @@
+import errno
+import os
+import threading
+
+import pytest
+
+from jukebox.config import Config
+from jukebox import queue
+
+
+@pytest.fixture
+def url(tmp_path):
+    return f"file://{tmp_path}/queue.log"
+
+
+class TestFromConfig:
+    def test_wal_queue(self, url):
+        conf = Config()
+        conf.queue.url = url
+        que = queue.from_config(conf)
+        assert isinstance(que, queue.WalQueue)
+        que.close()
+
+
+class TestWalQueue:
+    def test_replay(self, url):
+        que = queue.WalQueue(url)
+        que.enque("01-01")
+        que.enque("01-02")
+        que.enque("02-01")
+        assert que.deque() == "01-01"
+        que.task_done()
+        assert que.deque() == "01-02"
+        que.close()
+
+        # 01-02 never finished playing, so it goes back to the front
+        que = queue.WalQueue(url)
+        assert list(que.queue) == ["01-02", "02-01"]
+        assert que.deque() == "01-02"
+        que.task_done()
+        que.close()
+
+        que = queue.WalQueue(url)
+        assert list(que.queue) == ["02-01"]
+        assert que.position(3) == 1
+        assert que.enque("02-02") == 4
+        que.close()
+
+    def test_enque_many(self, url):
+        que = queue.WalQueue(url, max_size=3)
+        que.enque("01-01")
+        assert que.enque_many(["01-02", "01-03"]) == [2, 3]
+        with pytest.raises(queue.QueueFullException):
+            que.enque_many(["02-01"])
+        que.close()
+        assert list(queue.WalQueue(url).queue) == ["01-01", "01-02", "01-03"]
+
+    def test_incomplete_record(self, url, tmp_path):
+        (tmp_path / "queue.log").write_text("E 01-01\nE 01-02\nD\nE 02-0")
+        que = queue.WalQueue(url)
+        assert list(que.queue) == ["01-01", "01-02"]
+        que.close()
+
+    def test_corrupt_record(self, url, tmp_path):
+        (tmp_path / "queue.log").write_text("E 01-01\nX\n")
+        with pytest.raises(queue.CorruptLogException):
+            queue.WalQueue(url)
+
+    def test_compaction(self, url, tmp_path):
+        que = queue.WalQueue(url, compact_after=10)
+        for _ in range(20):
+            que.enque("01-01")
+            que.deque()
+            que.task_done()
+        que.enque("02-02")
+        assert len((tmp_path / "queue.log").read_text().splitlines()) <= 10
+        que.close()
+        que = queue.WalQueue(url)
+        assert list(que.queue) == ["02-02"]
+        que.close()
+
+    def test_max_size(self, url):
+        que = queue.WalQueue(url, max_size=1)
+        que.enque("01-01")
+        with pytest.raises(queue.QueueFullException):
+            que.enque("01-02")
+        que.close()
+        assert list(queue.WalQueue(url).queue) == ["01-01"]
+
+    def test_concurrent_enque(self, url):
+        que = queue.WalQueue(url)
+        threads = [
+            threading.Thread(target=lambda n=n: [que.enque(f"{n:02d}-01") for _ in range(50)])
+            for n in range(1, 9)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(que.queue) == 400
+        assert que.syncs <= 401
+        que.close()
+        assert sorted(queue.WalQueue(url).queue) == sorted(que.queue)
+
+    def test_sync_failure_drops_tracks(self, url, monkeypatch):
+        que = queue.WalQueue(url)
+        que.enque("01-01")
+        fsync = os.fsync
+        failures = [OSError(errno.EIO, "disk on fire")]
+
+        def sync(fd):
+            if failures:
+                raise failures.pop()
+            fsync(fd)
+        monkeypatch.setattr(os, "fsync", sync)
+        with pytest.raises(OSError):
+            que.enque_many(["01-02", "01-03"])
+        assert list(que.queue) == ["01-01"]
+        assert que.snapshot() == [queue.QueueEntry(1, "01-01", 1)]
+        que.close()
+        # the dropped records don't come back when the log is replayed
+        que = queue.WalQueue(url)
+        assert list(que.queue) == ["01-01"]
+        assert que.enque("01-02") == 2
+        que.close()
+
+    def test_tracks_wait_for_sync(self, url, monkeypatch):
+        que = queue.WalQueue(url)
+        fsync = os.fsync
+        syncing = threading.Event()
+        release = threading.Event()
+
+        def sync(fd):
+            syncing.set()
+            release.wait(5)
+            fsync(fd)
+        monkeypatch.setattr(os, "fsync", sync)
+        enqueuing = threading.Thread(target=que.enque, args=("01-01",))
+        enqueuing.start()
+        assert syncing.wait(5)
+        # logged but not yet durable, so it can't be played or listed
+        with pytest.raises(queue.EmptyQueueException):
+            que.deque()
+        assert que.snapshot() == []
+        release.set()
+        enqueuing.join()
+        assert que.deque() == "01-01"
+        que.close()
@@ -2,14 +2,18 @@
 import pytest
 
 from typing import List
+from typing import Optional
 
 from jukebox import discography
+from jukebox import queue
 from jukebox import service
 from jukebox.config import Config
 from jukebox.credit import InMemory
 from jukebox.discography import JsonDiscography
 from jukebox.queue import ListQueue
 from jukebox.service import Charge
+from jukebox.service import NowPlaying
+from jukebox.discography.common import encode_cursor
 from jukebox.service import Page
 from jukebox.service import Service
 from jukebox.service import Track
@@ -73,7 +77,7 @@ def mock_disc(tmp_path):
     "songs": [
       {
         "title": "Pigs on the Wing, Part 1",
-        "duration": "1.25"
+        "duration": "1:25"
       },
       {
         "title": "Dogs",
@@ -90,8 +94,9 @@ def mock_disc(tmp_path):
 class MockCurrent:
     """ testing current track getter
     """
-    def __init__(self, que: List[str]):
+    def __init__(self, que: List[str], disc):
         self.queue = que
+        self.disc = disc
 
     def current_track_id(self) -> str:
         try:
@@ -99,11 +104,16 @@ class MockCurrent:
         except IndexError:
             return ""
 
+    def now_playing(self) -> Optional[NowPlaying]:
+        if not self.queue:
+            return None
+        return NowPlaying(self.disc.get_track(self.queue[0]), 0.0).at(30.0)
+
 
 def test_from_config(mock_disc):
     conf = Config()
     que = ListQueue()
-    cur = MockCurrent(que.queue)
+    cur = MockCurrent(que.queue, mock_disc)
     cred = InMemory()
     service.from_config(conf, mock_disc, que, cur, cred)
 
@@ -112,7 +122,7 @@ class TestService:
     @pytest.fixture(autouse=True)
     def setup_method(self, request, mock_disc):
         que = ListQueue()
-        cur = MockCurrent(que.queue)
+        cur = MockCurrent(que.queue, mock_disc)
         cred = InMemory()
         self.serv = Service(mock_disc, que, cur, cred)
 
@@ -126,10 +136,20 @@ class TestService:
             "01-02",
             "I Still Haven't Found What I'm Looking For",
             "4:37",
-            "file://01/02.mp4"
+            "file://01/02.mp4",
+            277
         )
         assert expect == got
 
+    def test_now_playing(self):
+        assert self.serv.now_playing() is None
+        self.serv.add_balance(Charge(1.0, "usd"))
+        self.serv.enqueue_track("01-02")
+        playing = self.serv.now_playing()
+        assert playing.track.track_id == "01-02"
+        assert playing.elapsed == 30.0
+        assert playing.remaining == 247.0
+
     def test_next_track(self):
         assert self.serv.next_track() is None
         self.serv.add_balance(Charge(1.0, "usd"))
@@ -140,13 +160,28 @@ class TestService:
             "01-02",
             "I Still Haven't Found What I'm Looking For",
             "4:37",
-            "file://01/02.mp4"
+            "file://01/02.mp4",
+            277
         )
         assert expect == got
 
+    def test_current_and_next_tracks(self):
+        assert self.serv.current_and_next_tracks() == (None, None)
+        self.serv.add_balance(Charge(1.0, "usd"))
+        self.serv.enqueue_track("01-02")
+        self.serv.enqueue_track("02-01")
+        current, upcoming = self.serv.current_and_next_tracks()
+        assert current.track_id == "01-02"
+        assert upcoming.track_id == "01-02"
+
+        self.serv.queue.deque()
+        current, upcoming = self.serv.current_and_next_tracks()
+        assert current.track_id == "02-01"
+        assert upcoming.track_id == "02-01"
+
     def test_list_albums(self):
         assert len(self.serv.list_albums()) == 3
-        page = Page("02", 1, False)
+        page = Page(encode_cursor("02"), 1, False)
         albums = self.serv.list_albums(page)
         assert len(albums) == 1
         assert albums[0].album_id == "03"
@@ -155,10 +190,20 @@ class TestService:
         albums = self.serv.list_albums(page)
         assert len(albums) == 1
         assert albums[0].album_id == "01"
+        assert albums.prev_cursor == ""
+
+        albums = self.serv.list_albums(Page(albums.next_cursor, 1, False))
+        assert albums[0].album_id == "02"
 
     def test_list_album_tracks(self):
         assert len(self.serv.list_album_tracks("02")) == 3
 
+    def test_search(self):
+        tracks = self.serv.search("tool")
+        assert [t.track_id for t in tracks] == ["02-01", "02-02", "02-03"]
+        assert self.serv.search("dogs")[0].name == "Dogs"
+        assert self.serv.search("tool", Page(encode_cursor("1"), 1, False))[0].track_id == "02-02"
+
     def test_add_balance(self):
         assert self.serv.get_balance() == 0
         self.serv.add_balance(Charge(8.0, "usd"))
@@ -174,3 +219,48 @@ class TestService:
 
         self.serv.enqueue_track("02-01")
         assert self.serv.queue.peak() == "02-01"
+
+    def test_enqueue_tracks(self):
+        self.serv.add_balance(Charge(1.0, "usd"))
+        # one bad id means nothing is charged or queued
+        with pytest.raises(discography.NotFoundException):
+            self.serv.enqueue_tracks(["02-01", "05-20"])
+        with pytest.raises(service.NoCreditsException):
+            self.serv.enqueue_tracks(["02-01", "02-02", "02-03", "01-01"])
+        assert self.serv.get_balance() == 3
+        assert len(self.serv.queue.queue) == 0
+
+        assert self.serv.enqueue_tracks(["02-01", "02-02"]) == [1, 2]
+        assert self.serv.get_balance() == 1
+        assert list(self.serv.queue.queue) == ["02-01", "02-02"]
+
+    def test_enqueue_tracks_queue_full(self):
+        self.serv.queue.max_size = 2
+        self.serv.add_balance(Charge(1.0, "usd"))
+        with pytest.raises(queue.QueueFullException):
+            self.serv.enqueue_tracks(["02-01", "02-02", "02-03"])
+        assert self.serv.get_balance() == 3
+        assert len(self.serv.queue.queue) == 0
+
+    def test_list_queue(self):
+        self.serv.add_balance(Charge(1.0, "usd"))
+        first = self.serv.enqueue_track("02-01")
+        second = self.serv.enqueue_track("01-03")
+        assert self.serv.queue_position(second) == 2
+        listing = self.serv.list_queue(Page("", 1, False))
+        assert [(entry.entry_id, track.track_id) for entry, track in listing] == [
+            (first, "02-01")
+        ]
+        listing = self.serv.list_queue(Page(listing.next_cursor, 1, False))
+        assert [(entry.position, track.name) for entry, track in listing] == [
+            (2, "With Or Without You")
+        ]
+
+    def test_enqueue_track_queue_full(self):
+        self.serv.queue.max_size = 1
+        self.serv.add_balance(Charge(1.0, "usd"))
+        self.serv.enqueue_track("02-01")
+        assert self.serv.get_balance() == 2
+        with pytest.raises(queue.QueueFullException):
+            self.serv.enqueue_track("02-02")
+        assert self.serv.get_balance() == 2